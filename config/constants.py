@@ -1,7 +1,41 @@
-
 # Configuration constants
-MAX_WORKERS = 5
+MAX_WORKERS = 5  # Initial number of concurrent requests; adapts between CONCURRENCY_MIN and CONCURRENCY_MAX
+CONCURRENCY_MIN = 1
+CONCURRENCY_MAX = 50
+CONCURRENCY_INCREASE = 1.0  # Window growth per window of healthy responses
+CONCURRENCY_DECREASE = 0.5  # Window factor applied on a 429 or 5xx
+DEFAULT_RETRY_AFTER = 5  # Seconds to pause after a 429 without a Retry-After header
+RETRY_MAX_ATTEMPTS = 5  # Attempts per request, including the first
+RETRY_BASE_DELAY = 1.0  # Backoff ceiling in seconds after the first failure; doubles per attempt
+RETRY_MAX_DELAY = 60  # Largest backoff ceiling in seconds
 RATE_LIMIT_REQUESTS = 1000  # Maximum requests per minute
-REQUEST_DELAY = 0.5  # Delay between requests in seconds
-TOKEN_REFRESH_RATE = 60  # Refresh tokens every 60 seconds
-CHECKPOINT_INTERVAL = 100  # Save checkpoint every 100 processed posts
+REQUEST_DELAY = 0.5  # Delay between requests in seconds in older releases; no longer used, requests are spaced by RATE_LIMIT_REQUESTS
+TOKEN_REFRESH_RATE = 60  # Window in seconds for RATE_LIMIT_REQUESTS; tokens refill continuously
+RATE_LIMIT_BURST = 10  # Requests allowed back-to-back before the steady rate applies
+ENDPOINT_RATE_LIMITS = {  # Per-endpoint requests per minute, on top of RATE_LIMIT_REQUESTS
+    'post': 400,
+    'comments': 400,
+    'more_replies': 600,
+    'feed': 200,
+}
+URL_QUEUE_SIZE = 100  # Post URLs waiting for a scrape worker; discovery pauses when full
+CRAWL_MAX_ATTEMPTS = 3  # Runs that may retry a post that failed before giving up on it
+LEASE_BATCH_SIZE = 25  # URLs a worker of a shared crawl leases at a time (--worker-id)
+LEASE_DURATION = 300  # Seconds before a worker's leased URLs can be taken by another worker
+LEASE_BUSY_TIMEOUT = 30  # Seconds to wait for another worker's write lock on the crawl state
+CHECKPOINT_FLUSH_INTERVAL = 5  # Seconds between flushes (and fsyncs) of the JSONL checkpoint
+CHECKPOINT_INTERVAL = 100  # Posts per checkpoint save in older releases; no longer used, as every post is checkpointed
+PARSER_BACKEND = 'selectolax'  # HTML parser: 'html.parser' (pure Python), 'lxml' or 'selectolax'
+PARSE_WORKERS = 0  # Parser worker processes; 0 parses inline on the event loop
+PARSE_QUEUE_SIZE = 32  # Maximum documents waiting for a parser worker
+CACHE_TTL = 7 * 24 * 3600  # Seconds a cached response stays fresh
+CACHE_ENDPOINT_TTLS = {  # Shorter TTLs for pages that change quickly
+    'feed': 600,
+}
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # Oldest cached responses are evicted beyond this size
+ARCHIVE_SEGMENT_BYTES = 256 * 1024 ** 2  # Raw-HTML archive segments roll over past this size
+PARQUET_ROW_GROUP_SIZE = 50_000  # Rows per Parquet row group in export_parquet.py
+POST_STORE_BATCH_SIZE = 500  # Posts written per transaction by ingest_posts.py
+MORE_REPLIES_WORKERS = 10  # "More replies" pages fetched at once, across all posts
+MORE_REPLIES_BUDGET = 50  # "More replies" pages one post may request
+MORE_REPLIES_MAX_DEPTH = 15  # Replies deeper than this are not fetched
@@ -1,9 +1,31 @@
+import os
 from pathlib import Path
 
 # Project root is one level up from config directory
 PROJECT_ROOT = Path(__file__).parent.parent
 
-# Data directories
-DATA_DIR = PROJECT_ROOT / "data"
+# Data directories; SCRAPER_DATA_DIR moves them, e.g. for benchmarks
+DATA_DIR = Path(os.environ.get("SCRAPER_DATA_DIR", PROJECT_ROOT / "data"))
 RAW_DATA_DIR = DATA_DIR / "raw"
 PARTIAL_DATA_DIR = DATA_DIR / "partial"
+
+# Requests that failed permanently, replayed with scrape_posts.py --replay-dead-letters
+DEAD_LETTER_FILE = PARTIAL_DATA_DIR / "dead_letter.jsonl"
+
+# Comment subtrees whose "more replies" pages were not fetched (budget, depth or failure)
+TRUNCATED_REPLIES_FILE = PARTIAL_DATA_DIR / "truncated_replies.jsonl"
+
+# Per-URL crawl status, used to resume interrupted crawls
+CRAWL_STATE_DB = DATA_DIR / "crawl_state.sqlite"
+
+# Cached response bodies, used to re-run extraction without hitting Reddit
+RESPONSE_CACHE_DIR = DATA_DIR / "cache"
+
+# Append-only archive of raw response bodies, re-parsed with reparse_archive.py
+ARCHIVE_DIR = DATA_DIR / "archive"
+
+# Columnar posts and comments tables, written by export_parquet.py
+PARQUET_DIR = DATA_DIR / "parquet"
+
+# Posts and comments with a full-text index, written by ingest_posts.py
+POST_STORE_DB = DATA_DIR / "posts.sqlite"
@@ -1,7 +1,15 @@
 from urllib.parse import urlencode
+import os
 import uuid
 
+# Origin of every request; point it at a local mock server (testing/mock_server.py)
+# to run the scraper without touching Reddit
+REDDIT_BASE_URL = os.environ.get("REDDIT_BASE_URL", "https://www.reddit.com")
+
 valid_sort_options = {'hot', 'new', 'top', 'rising'}
+valid_time_filters = ('HOUR', 'DAY', 'WEEK', 'MONTH', 'YEAR', 'ALL')
+# Sort orders whose results depend on the time filter
+time_filtered_sorts = {'top'}
 
 def generate_navigation_session_id():
     """Generate a new navigation session ID."""
@@ -34,7 +42,7 @@ def get_reddit_feed_url(
         raise ValueError(f"sort_by must be one of {valid_sort_options}")
 
     # Base URL components
-    base_url = "https://www.reddit.com/svc/shreddit/community-more-posts"
+    base_url = f"{REDDIT_BASE_URL}/svc/shreddit/community-more-posts"
     
     # Query parameters
     params = {
@@ -65,3 +73,52 @@ def get_top_posts_url(subreddit: str, **kwargs) -> str:
 def get_rising_posts_url(subreddit: str, **kwargs) -> str:
     """Get URL for rising posts in a subreddit."""
     return get_reddit_feed_url(subreddit, sort_by='rising', **kwargs)
+
+
+def get_comments_url(subreddit: str, post_id: str) -> str:
+    """
+    Generate the URL of a post's comment-tree partial.
+
+    Subreddit names are case-insensitive; the name is lowercased so the URL,
+    and its response cache and archive entries, don't depend on how a
+    permalink spelled it.
+
+    Args:
+        subreddit (str): Name of the subreddit the post belongs to
+        post_id (str): Post ID, e.g. 't3_abc123'
+
+    Returns:
+        str: URL of the partial holding the post's comments
+    """
+    return f"{REDDIT_BASE_URL}/svc/shreddit/comments/r/{subreddit.lower()}/{post_id}?render-mode=partial&is_lit_ssr=false"
+
+
+def get_discovery_feed_urls(
+    subreddit: str,
+    time_filters=valid_time_filters,
+    feed_length: int = 25
+) -> list:
+    """
+    Generate the first-page URL of every feed used for post discovery.
+
+    Sorts in `time_filtered_sorts` get one feed per time filter; the others
+    ignore the filter and get a single feed.
+
+    Args:
+        subreddit (str): Name of the subreddit
+        time_filters (iterable): Time filters for the time-filtered sorts
+        feed_length (int): Number of posts per page
+
+    Returns:
+        list: (feed name, URL) tuples, e.g. ('top/WEEK', 'https://...')
+    """
+    feeds = []
+    for sort_by in sorted(valid_sort_options):
+        if sort_by in time_filtered_sorts:
+            for time_filter in time_filters:
+                url = get_reddit_feed_url(subreddit, sort_by=sort_by, feed_length=feed_length, time_filter=time_filter)
+                feeds.append((f"{sort_by}/{time_filter}", url))
+        else:
+            url = get_reddit_feed_url(subreddit, sort_by=sort_by, feed_length=feed_length, time_filter="ALL")
+            feeds.append((sort_by, url))
+    return feeds
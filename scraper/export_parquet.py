@@ -0,0 +1,43 @@
+import argparse
+from itertools import chain
+from pathlib import Path
+import sys
+
+from tqdm import tqdm
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config.constants import PARQUET_ROW_GROUP_SIZE
+from config.paths import PARQUET_DIR
+from scraper.src.export import export_parquet, iter_posts, pa
+
+
+def main(inputs, output_dir=PARQUET_DIR, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """
+    Exports scraped posts to posts.parquet and comments.parquet.
+
+    Args:
+        inputs (list): posts_data_*.json or checkpoint_*.jsonl files; the first
+            copy of a post wins.
+        output_dir (str or Path, optional): Output directory. Defaults to PARQUET_DIR.
+        row_group_size (int, optional): Rows per row group. Defaults to PARQUET_ROW_GROUP_SIZE.
+    """
+    if pa is None:
+        print("Parquet export needs pyarrow: pip install pyarrow")
+        sys.exit(1)
+    posts = tqdm(chain.from_iterable(iter_posts(path) for path in inputs), desc="Exporting Posts", unit="post")
+    post_count, comment_count = export_parquet(posts, output_dir, row_group_size)
+    print(f"{post_count} posts and {comment_count} comments written to {output_dir}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Export scraped posts and flattened comments to Parquet")
+    arg_parser.add_argument('inputs', nargs='+', help="posts_data_*.json or checkpoint_*.jsonl files")
+    arg_parser.add_argument('--output-dir', default=str(PARQUET_DIR),
+                            help="Directory for posts.parquet and comments.parquet")
+    arg_parser.add_argument('--row-group-size', type=int, default=PARQUET_ROW_GROUP_SIZE,
+                            help="Rows per Parquet row group")
+    args = arg_parser.parse_args()
+    main(args.inputs, output_dir=args.output_dir, row_group_size=args.row_group_size)
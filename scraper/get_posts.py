@@ -1,26 +1,39 @@
-import requests
-from config.headers import REDDIT_HEADERS
-from config.urls import get_reddit_feed_url, valid_sort_options
-from scraper.src.posts import get_reddit_posts
+import argparse
+import asyncio
+from pathlib import Path
+import sys
+
+import aiohttp
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config.constants import RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE
+from scraper.src.cache import ResponseCache
+from scraper.src.client import RedditClient
+from scraper.src.concurrency import AdaptiveConcurrency
+from scraper.src.posts import discover_posts
+from scraper.src.session import RateLimiter
+
+
+async def main(num_posts, subreddits=("ChronicPain",), use_cache=False):
+    rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE)
+    async with aiohttp.ClientSession() as session:
+        cache = ResponseCache() if use_cache else None
+        client = RedditClient(session, rate_limiter, AdaptiveConcurrency(), cache=cache)
+        return await discover_posts(client, subreddit=list(subreddits), num_posts=num_posts)
+
 
 if __name__ == "__main__":
-    session = requests.Session()
-    session.headers.update(REDDIT_HEADERS)
-    NUM_POSTS = 3000
-    posts_per_sort = NUM_POSTS // len(valid_sort_options)
-
-    new_posts = []
-    for sort_option in valid_sort_options:
-        feed_url = get_reddit_feed_url(
-            subreddit="ChronicPain",
-            sort_by=sort_option,
-            time_filter="ALL",
-            feed_length=25
-        )
-        print(f"Fetching {sort_option} posts from: {feed_url}")
-        
-        posts = get_reddit_posts(feed_url, num_posts=posts_per_sort, session=session)
-        new_posts.extend(posts)
-        print(f"Found {len(posts)} posts using {sort_option} sort")
-
-    print(f"\nTotal unique posts collected: {len(new_posts)}")
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description="Discover post URLs and add them to data/reddit_posts.json")
+    arg_parser.add_argument('--subreddit', nargs='+', default=["ChronicPain"],
+                            help="Subreddits to discover posts in, concurrently through one client")
+    arg_parser.add_argument('--num-posts', type=int, default=3000, help="New posts to find per subreddit")
+    arg_parser.add_argument('--cache', action='store_true',
+                            help="Serve fresh feed pages from the response cache and store fetched ones")
+    args = arg_parser.parse_args()
+
+    new_posts = asyncio.run(main(args.num_posts, args.subreddit, use_cache=args.cache))
+
+    print(f"\nTotal unique posts collected: {len(new_posts)}")
@@ -0,0 +1,45 @@
+import argparse
+from itertools import chain
+from pathlib import Path
+import sys
+
+from tqdm import tqdm
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config.constants import POST_STORE_BATCH_SIZE
+from config.paths import POST_STORE_DB
+from scraper.src.export import iter_posts
+from scraper.src.post_store import PostStore
+
+
+def main(inputs, db=POST_STORE_DB, batch_size=POST_STORE_BATCH_SIZE):
+    """
+    Ingests scraped posts into the searchable post store.
+
+    Args:
+        inputs (list): posts_data_*.json or checkpoint_*.jsonl files.
+        db (str or Path, optional): Database file. Defaults to POST_STORE_DB.
+        batch_size (int, optional): Posts per transaction. Defaults to POST_STORE_BATCH_SIZE.
+    """
+    store = PostStore(db)
+    try:
+        with tqdm(desc="Ingesting Posts", unit="post") as progress:
+            stats = store.ingest(chain.from_iterable(iter_posts(path) for path in inputs), batch_size, progress)
+        counts = store.counts()
+    finally:
+        store.close()
+    print(f"{stats['added']} posts added, {stats['updated']} updated, {stats['unchanged']} unchanged, "
+          f"{stats['comments']} comments written; {db} holds {counts['posts']} posts "
+          f"and {counts['comments']} comments")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Ingest scraped posts into a SQLite store with full-text search")
+    arg_parser.add_argument('inputs', nargs='+', help="posts_data_*.json or checkpoint_*.jsonl files")
+    arg_parser.add_argument('--db', default=str(POST_STORE_DB), help="Database file")
+    arg_parser.add_argument('--batch-size', type=int, default=POST_STORE_BATCH_SIZE, help="Posts per transaction")
+    args = arg_parser.parse_args()
+    main(args.inputs, db=args.db, batch_size=args.batch_size)
@@ -0,0 +1,92 @@
+import argparse
+from datetime import datetime
+from pathlib import Path
+import sys
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config.paths import CRAWL_STATE_DB
+from scraper.src.crawl_state import CrawlState
+from scraper.src.sink import read_jsonl, write_json_array
+
+
+def shard_paths(state_path):
+    """
+    Lists the checkpoint shards holding the done posts of a crawl, oldest first.
+
+    Args:
+        state_path (str or Path): Crawl state database shared by the workers.
+
+    Returns:
+        list: Paths of the shards that exist on this machine.
+    """
+    state = CrawlState(state_path)
+    try:
+        outputs = state.done_outputs()
+    finally:
+        state.close()
+    paths = [Path(output) for output in outputs if Path(output).exists()]
+    missing = len(outputs) - len(paths)
+    if missing:
+        print(f"{missing} shards listed in {state_path} are not on this machine; pass them as arguments")
+    return sorted(paths, key=lambda path: path.stat().st_mtime)
+
+
+def iter_merged_posts(paths):
+    """
+    Streams the posts of several shards, once per post_id.
+
+    A post scraped by more than one worker (for instance after its lease
+    expired while the first worker was still on it) is taken from the shard
+    given last, and within a shard from the copy written last. Only one post
+    is held in memory at a time.
+
+    Args:
+        paths (list): JSON Lines shards, oldest first.
+
+    Yields:
+        dict: Each post, in shard order.
+    """
+    # First pass finds where the last copy of each post is, the second yields it
+    last_copy = {}
+    for shard, path in enumerate(paths):
+        for number, post in enumerate(read_jsonl(path)):
+            if post.get('post_id'):
+                last_copy[post['post_id']] = (shard, number)
+    keep = set(last_copy.values())
+    for shard, path in enumerate(paths):
+        for number, post in enumerate(read_jsonl(path)):
+            if (shard, number) in keep:
+                yield post
+
+
+def main(paths=None, state_path=CRAWL_STATE_DB, output=None):
+    """
+    Merges the checkpoint shards of a multi-worker crawl into one posts_data file.
+
+    Args:
+        paths (list, optional): Shards to merge, oldest first. Defaults to the
+            shards recorded in the crawl state.
+        state_path (str or Path, optional): Crawl state database. Defaults to CRAWL_STATE_DB.
+        output (str, optional): Output file. Defaults to posts_data_YYYYMMDD_HHMMSS.json.
+    """
+    paths = [Path(path) for path in paths] if paths else shard_paths(state_path)
+    if not paths:
+        print("No shards to merge")
+        return
+    output = output or f"posts_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    saved = write_json_array(output, iter_merged_posts(paths))
+    print(f"{saved} posts from {len(paths)} shards saved to {output}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Merge the checkpoint shards of a multi-worker crawl, "
+                                                     "keeping one copy of each post")
+    arg_parser.add_argument('shards', nargs='*',
+                            help="Shard files, oldest first (defaults to those recorded in the crawl state)")
+    arg_parser.add_argument('--state', default=str(CRAWL_STATE_DB), help="Crawl state database")
+    arg_parser.add_argument('--output', default=None, help="Output file")
+    args = arg_parser.parse_args()
+    main(paths=args.shards, state_path=args.state, output=args.output)
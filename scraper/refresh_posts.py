@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import json
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import sys
+
+import aiohttp
+from tqdm import tqdm
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config.constants import CONCURRENCY_MAX, RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE, PARSE_WORKERS
+from config.urls import get_discovery_feed_urls
+from scraper.src.client import RedditClient
+from scraper.src.comment_tree import walk_comments
+from scraper.src.concurrency import AdaptiveConcurrency
+from scraper.src.fair_share import FairShareQueue
+from scraper.src.parse_pool import ParsePool
+from scraper.src.posts import load_existing_urls
+from scraper.src.refresh import (
+    COMMENTS, FAILED, METADATA, UNCHANGED,
+    collect_feed_posts, load_snapshot, merge_comment_trees, same_count
+)
+from scraper.src.retry import FetchError, RetryPolicy
+from scraper.src.session import RateLimiter
+from scraper.src.utils import extract_post_id, extract_subreddit
+from scraper.scrape_posts import BASE_URL, extract_comments, scrape_worker
+
+
+async def refresh_post(client, parser, stored, post_url, summary=None):
+    """
+    Brings one stored post up to date with as few requests as possible.
+
+    A post listed in a feed with the stored comment count only gets its score
+    updated, without any request. Otherwise the post page is fetched; the
+    comment tree is re-fetched and merged only if the comment count changed.
+    If the page or the comments can't be fetched, the stored post is kept as
+    it was.
+
+    Args:
+        client (RedditClient): Client used for requests.
+        parser (ParsePool): Parser for the fetched pages.
+        stored (dict): The post from the snapshot.
+        post_url (str): Relative permalink of the post.
+        summary (dict, optional): The post's feed listing, if it was seen in a feed.
+
+    Returns:
+        tuple: (refreshed post, outcome, number of new comments)
+    """
+    if summary is not None and same_count(summary['comment_count'], stored['comment_count']):
+        return dict(stored, score=summary['score']), UNCHANGED, 0
+
+    post_id = stored['post_id']
+    try:
+        html = await client.fetch(f"{BASE_URL}{post_url}", 'post', post_id)
+    except FetchError as e:
+        print(f"Keeping the stored copy of {post_id}: {e}")
+        return stored, FAILED, 0
+    fresh = await parser.parse_post(html, post_id)
+    if not fresh:
+        return stored, FAILED, 0
+
+    if same_count(fresh['comment_count'], stored['comment_count']):
+        fresh['comments'] = stored['comments']
+        return fresh, METADATA, 0
+
+    comments = await extract_comments(client, post_id, parser, subreddit=extract_subreddit(post_url) or "ChronicPain")
+    if comments is None:
+        # Keeping the stored comment count means the next refresh tries the thread again
+        return stored, FAILED, 0
+    stored_ids = {comment['thing_id'] for comment in walk_comments(stored['comments'])}
+    new_comments = sum(1 for comment in walk_comments(comments) if comment['thing_id'] not in stored_ids)
+    fresh['comments'], _ = merge_comment_trees(stored['comments'], comments)
+    return fresh, COMMENTS, new_comments
+
+
+async def main(snapshot, subreddit="ChronicPain", feed_pages=40, use_feeds=True, parse_workers=PARSE_WORKERS):
+    """
+    Refreshes a stored scrape, re-fetching only the threads that changed.
+
+    Args:
+        snapshot (str): posts_data_*.json or checkpoint_*.jsonl file to refresh.
+        subreddit (str, optional): Subreddit the posts belong to. Defaults to "ChronicPain".
+        feed_pages (int, optional): Feed pages read per feed to find current counts. Defaults to 40.
+        use_feeds (bool, optional): Read counts from the feeds first. Defaults to True.
+        parse_workers (int, optional): Parser worker processes. Defaults to PARSE_WORKERS.
+    """
+    posts = load_snapshot(snapshot)
+    print(f"Refreshing {len(posts)} posts from {snapshot}")
+
+    # Permalinks by post id; posts missing from the URL file use the short form
+    post_urls = {extract_post_id(url): url for url in load_existing_urls('data/reddit_posts.json')}
+
+    rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE)
+    controller = AdaptiveConcurrency()
+    parser = ParsePool(workers=parse_workers)
+    outcomes = Counter()
+    new_comments = 0
+
+    async with aiohttp.ClientSession() as session:
+        # No response cache: a refresh needs the current pages
+        client = RedditClient(session, rate_limiter, controller, RetryPolicy())
+
+        summaries = {}
+        if use_feeds:
+            feeds = get_discovery_feed_urls(subreddit)
+            summaries = await collect_feed_posts(client, parser, feeds, {post['post_id'] for post in posts}, feed_pages)
+            listed = sum(1 for post in posts if post['post_id'] in summaries)
+            print(f"{listed} of {len(posts)} posts listed in feeds ({client.requests} requests)")
+
+        for summary in summaries.values():
+            post_urls.setdefault(extract_post_id(summary['url']), summary['url'])
+
+        progress = tqdm(total=len(posts), desc="Refreshing Posts")
+        # Posts by permalink, in snapshot order
+        by_url = {post_urls.get(post['post_id']) or f"/r/{subreddit}/comments/{post['post_id'][3:]}/": post
+                  for post in posts}
+        results = {}
+
+        async def refresh(post_url):
+            post = by_url[post_url]
+            results[post_url] = await refresh_post(client, parser, post, post_url, summaries.get(post['post_id']))
+            queue.task_done(post_url)
+            progress.update(1)
+
+        # The same bounded queue and worker pool as scrape_posts.py, so only
+        # CONCURRENCY_MAX posts are in progress at a time
+        queue = FairShareQueue()
+        workers = [asyncio.create_task(scrape_worker(queue, None, refresh)) for _ in range(CONCURRENCY_MAX)]
+        try:
+            for post_url in by_url:
+                await queue.put(post_url)
+            await queue.close()
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            progress.close()
+
+        refreshed = []
+        for post_url, post in by_url.items():
+            # A post whose refresh raised is kept as stored
+            post, outcome, added = results.get(post_url, (post, FAILED, 0))
+            refreshed.append(post)
+            outcomes[outcome] += 1
+            new_comments += added
+
+    parser.close()
+
+    print(f"\n{outcomes[UNCHANGED]} unchanged, {outcomes[METADATA]} metadata only, "
+          f"{outcomes[COMMENTS]} threads re-fetched ({new_comments} new comments), {outcomes[FAILED]} failed")
+    print(f"{client.requests} requests in total")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_filename = f"posts_data_{timestamp}.json"
+    try:
+        with open(output_filename, 'w', encoding='utf-8') as f:
+            json.dump(refreshed, f, indent=2, ensure_ascii=False)
+        print(f"\nPosts saved to {output_filename}")
+    except IOError as e:
+        print(f"Error writing to JSON file: {e}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Refresh a stored scrape, re-fetching only changed threads")
+    arg_parser.add_argument('snapshot', help="posts_data_*.json or checkpoint_*.jsonl file to refresh")
+    arg_parser.add_argument('--subreddit', default="ChronicPain", help="Subreddit the posts belong to")
+    arg_parser.add_argument('--feed-pages', type=int, default=40,
+                            help="Feed pages read per feed to find current comment counts")
+    arg_parser.add_argument('--no-feeds', action='store_true',
+                            help="Skip the feeds and check every post with a post page fetch")
+    arg_parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS,
+                            help="Parser worker processes (0 parses on the event loop)")
+    args = arg_parser.parse_args()
+    asyncio.run(main(args.snapshot, subreddit=args.subreddit, feed_pages=args.feed_pages,
+                     use_feeds=not args.no_feeds, parse_workers=args.parse_workers))
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import sys
+
+from tqdm import tqdm
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config.paths import ARCHIVE_DIR
+from scraper.src.archive import ArchiveClient, ArchiveReader, archive_size
+from scraper.src.parse_pool import ParsePool
+from scraper.scrape_posts import scrape_post
+
+# The archive reader of a worker process, opened once by `init_worker`
+_reader = None
+
+
+async def reparse_posts(reader, post_urls, single_request=False):
+    """
+    Re-extracts posts from an archive with the current scraping code.
+
+    Args:
+        reader (ArchiveReader): Open archive.
+        post_urls (list): Absolute post URLs archived with the 'post' endpoint.
+        single_request (bool, optional): Read comments from the post pages, for
+            archives of a crawl run with --single-request. Defaults to False.
+
+    Returns:
+        tuple: (list of post dictionaries, number of pages missing from the archive)
+    """
+    client = ArchiveClient(reader)
+    parser = ParsePool(workers=0)
+    posts = []
+    for url in post_urls:
+        post_data = await scrape_post(client, url, parser, single_request=single_request)
+        if post_data:
+            posts.append(post_data)
+    return posts, client.misses
+
+
+def init_worker(archive_path):
+    """Worker process initializer: reads the archive index once for all the chunks the process gets."""
+    global _reader
+    _reader = ArchiveReader(archive_path)
+
+
+def reparse_chunk(post_urls, single_request=False):
+    """Worker process entry point: re-extracts one chunk of posts."""
+    return asyncio.run(reparse_posts(_reader, post_urls, single_request))
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def main(archive_path=ARCHIVE_DIR, workers=None, chunk_size=20, single_request=False):
+    """
+    Regenerates a posts_data file from an archive, in parallel across cores.
+
+    Args:
+        archive_path (str or Path, optional): Archive directory. Defaults to ARCHIVE_DIR.
+        workers (int, optional): Worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Posts handed to a worker at a time. Defaults to 20.
+        single_request (bool, optional): Read comments from the post pages, as a crawl
+            with --single-request did. Defaults to False.
+    """
+    reader = ArchiveReader(archive_path)
+    post_urls = [entry['url'] for entry in reader.entries_for('post')]
+    print(f"Archive {archive_path}: {len(reader.entries)} pages, {len(post_urls)} posts, "
+          f"{archive_size(archive_path) / 1e6:.1f} MB compressed")
+    if not post_urls:
+        return
+
+    workers = workers or os.cpu_count() or 1
+    processed_posts = []
+    missing = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(archive_path,)) as executor:
+        chunks = chunked(post_urls, chunk_size)
+        results = executor.map(reparse_chunk, chunks, [single_request] * len(chunks))
+        with tqdm(total=len(post_urls), desc="Re-parsing Posts") as progress:
+            for chunk, (posts, misses) in zip(chunks, results):
+                processed_posts.extend(posts)
+                missing += misses
+                progress.update(len(chunk))
+
+    if missing:
+        print(f"{missing} pages were not in the archive; their posts may be incomplete")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_filename = f"posts_data_{timestamp}.json"
+    try:
+        with open(output_filename, 'w', encoding='utf-8') as f:
+            json.dump(processed_posts, f, indent=2, ensure_ascii=False)
+        print(f"\n{len(processed_posts)} posts saved to {output_filename}")
+    except IOError as e:
+        print(f"Error writing to JSON file: {e}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Regenerate posts_data from archived raw HTML")
+    arg_parser.add_argument('--archive', default=str(ARCHIVE_DIR), help="Archive directory")
+    arg_parser.add_argument('--workers', type=int, default=None,
+                            help="Worker processes (defaults to the number of CPUs)")
+    arg_parser.add_argument('--chunk-size', type=int, default=20, help="Posts per worker task")
+    arg_parser.add_argument('--single-request', action='store_true',
+                            help="The archive comes from a crawl run with --single-request")
+    args = arg_parser.parse_args()
+    main(archive_path=args.archive, workers=args.workers, chunk_size=args.chunk_size,
+         single_request=args.single_request)
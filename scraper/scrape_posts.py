@@ -1,11 +1,10 @@
+import argparse
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
 from tqdm import tqdm
 import json
+from collections import deque
 from datetime import datetime
-import random
-import os
 from pathlib import Path
 import sys
 
@@ -13,268 +12,514 @@ import sys
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.append(str(PROJECT_ROOT))
 
-from config.constants import MAX_WORKERS, RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE, CHECKPOINT_INTERVAL
-from config.headers import REDDIT_HEADERS
-from config.paths import RAW_DATA_DIR, PARTIAL_DATA_DIR
+from config.constants import (
+    CONCURRENCY_MAX, RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE, PARSE_WORKERS, CRAWL_MAX_ATTEMPTS,
+    LEASE_BATCH_SIZE, LEASE_DURATION
+)
+from config.urls import REDDIT_BASE_URL, get_comments_url
+from config.paths import RAW_DATA_DIR, PARTIAL_DATA_DIR, DEAD_LETTER_FILE, CRAWL_STATE_DB, TRUNCATED_REPLIES_FILE
 from scraper.src.session import RateLimiter
-from scraper.src.utils import extract_post_id, print_comment_tree
+from scraper.src.archive import HtmlArchive
+from scraper.src.cache import ResponseCache
+from scraper.src.client import RedditClient
+from scraper.src.concurrency import AdaptiveConcurrency
+from scraper.src.dead_letter import DeadLetterQueue, take_dead_letters
+from scraper.src.retry import FetchError, RetryPolicy
+from scraper.src.sink import JsonlWriter, read_jsonl, write_json_array
+from scraper.src.crawl_state import CrawlState, DONE, FAILED, IN_FLIGHT
+from scraper.src import tracing
+from scraper.src.expansion import MoreRepliesQueue
+from scraper.src.fair_share import FairShareQueue, parse_subreddit_weights
+from scraper.src.metrics import CrawlMetrics, start_metrics_server
+from scraper.src.parse_pool import ParsePool
+from scraper.src.posts import discover_posts
+from scraper.src.utils import extract_post_id, extract_subreddit, print_comment_tree
 
 # Create directories if they don't exist
 RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
 PARTIAL_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+BASE_URL = REDDIT_BASE_URL
+PREVIEW_POSTS = 5  # Posts printed at the end of a run
 
-async def scrape_post(session, url, semaphore, rate_limiter):
-    """Updated scrape_post function with rate limiting"""
-    async with semaphore:
-        await rate_limiter.acquire()  # Wait for rate limiter
+
+async def scrape_post(client, url, parser=None, expander=None, single_request=False, errors=None):
+    """
+    Scrape a post page and its comments through the shared client.
+
+    With single_request, the comment tree embedded in the post page is used
+    instead of fetching the comment partial, which saves a request per post;
+    the partial is only fetched when the page has no usable tree.
+
+    If the comments can't be fetched, the post comes back with empty comments
+    and 'comments_missing' set, so it isn't mistaken for a post without comments.
+    The FetchError is appended to errors, when given.
+    """
+    parser = parser or ParsePool(workers=0)
+    post_id = extract_post_id(url)
+    with tracing.post_span(post_id, url=url):
         try:
-            async with session.get(url, headers=REDDIT_HEADERS, timeout=60) as response:
-                response.raise_for_status()
-                html = await response.text()
-
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # Find the main post content
-            post_container = soup.find('shreddit-post')
-            if not post_container:
-                return None
-
-            post_id = extract_post_id(url)
-
-            # Extract post data
-            post_data = {
-                'title': post_container.get('post-title', ''),
-                'author': post_container.get('author', ''),
-                'created_timestamp': post_container.get('created-timestamp', ''),
-                'score': post_container.get('score', 0),
-                'upvote_ratio': post_container.get('upvote-ratio', 0),
-                'content': '',
-                'post_id': post_id,
-                'comments': [],
-                'image_url': post_container.get('content-href', ''),
-                'comment_count': post_container.get('comment-count', 0)
-            }
-
-            # Get post content
-            content_elem = post_container.find('div', {'slot': 'text-body'})
-            if content_elem:
-                post_data['content'] = content_elem.get_text(strip=True)
-
-            # Extract comments if we have a valid post_id
-            if post_id:
-                post_data['comments'] = await extract_comments(session, post_id, rate_limiter)
-
-            return post_data
-
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            if isinstance(e, aiohttp.ClientResponseError) and e.status == 429:
-                print(f"Rate limited while scraping {url}. Retrying with exponential backoff...")
-                await asyncio.sleep(random.uniform(2, 10))  # Wait for a random time before retrying
-                return await scrape_post(session, url, semaphore, rate_limiter)  # Retry the request
-            else:
-                print(f"An error occurred while scraping {url}: {e}")
-                return None
-
-async def process_comment(comment_elem, session, depth=0, parent_id=None, rate_limiter=None):
-    """Process individual comment elements."""
-    if comment_elem is None:
-        return None
-
-    thing_id = comment_elem.get('thingid')
-    author = comment_elem.get('author')
-    text_elem = comment_elem.find('div', id=lambda x: x and x.endswith('-post-rtjson-content'))
-    text = text_elem.get_text(strip=True) if text_elem else "Comment Text Missing"
-
-    action_row = comment_elem.find('shreddit-comment-action-row')
-    comment_action_id = action_row.get('comment-id') if action_row else None
-
-    more_replies = comment_elem.find('a', {'slot': "more-comments-permalink"})
-    more_replies_link = more_replies.get('href') if more_replies else None
-
-    comment = {
-        'thing_id': thing_id,
-        'depth': int(comment_elem.get('depth', 0)),
-        'parent_id': parent_id,
-        'author': author,
-        'text': text,
-        'action_id': comment_action_id,
-        'more_replies': more_replies_link,
-        'replies': []
-    }
-
-    # Process child comments - Updated to handle nested comments better
-    child_comments = []
-    
-    # First check direct children with slot='children'
-    children_slot = comment_elem.find('div', {'slot': 'children'})
-    if children_slot:
-        # Use recursive=True to get all nested comments
-        child_comments.extend(children_slot.find_all('shreddit-comment', recursive=True))
-    
-    # Also check for comments that are direct descendants
-    child_comments.extend(comment_elem.find_all('shreddit-comment', recursive=True))
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    child_comments = [x for x in child_comments if not (x.get('thingid') in seen or seen.add(x.get('thingid')))]
-
-    # Process child comments
-    child_tasks = []
-    for child_elem in child_comments:
-        # Only process comments that are one level deeper than current
-        if int(child_elem.get('depth', 0)) == depth + 1:
-            child_tasks.append(process_comment(
-                child_elem, 
-                session, 
-                depth + 1, 
-                thing_id, 
-                rate_limiter
-            ))
-    
-    if child_tasks:
-        child_comments = await asyncio.gather(*child_tasks)
-        comment['replies'].extend(c for c in child_comments if c is not None)
-
-    # Fetch additional replies if they exist
-    if more_replies_link:
-        additional_replies = await fetch_more_replies(session, more_replies_link, rate_limiter)
-        for reply in additional_replies:
-            reply['parent_id'] = thing_id
-            reply['depth'] = depth + 1
-            comment['replies'].append(reply)
-
-    return comment
-
-async def fetch_more_replies(session, more_replies_url, rate_limiter):
-    """Asynchronously fetch additional comment replies."""
-    full_url = f"https://www.reddit.com{more_replies_url}?render-mode=partial&is_lit_ssr=false"
-    
-    try:
-        await rate_limiter.acquire()  # Add rate limiting
-        async with session.get(full_url, headers=REDDIT_HEADERS, timeout=60) as response:
-            response.raise_for_status()
-            html = await response.text()
-        
-        soup = BeautifulSoup(html, 'html.parser')
-        comment_trees = soup.find_all('shreddit-comment-tree')
-        
-        comments = []
-        for tree in comment_trees:
-            comment_elements = tree.find_all('shreddit-comment', recursive=False)
-            for comment_elem in comment_elements:
-                comment = await process_comment(comment_elem, session, rate_limiter=rate_limiter)
-                if comment:
-                    comments.append(comment)
-        
+            html = await client.fetch(url, 'post', post_id)
+        except FetchError as e:
+            print(f"An error occurred while scraping {url}: {e}")
+            return None
+
+        comments = None
+        if single_request:
+            post_data, comments = await parser.parse_post_page(html, post_id)
+        else:
+            post_data = await parser.parse_post(html, post_id)
+        if not post_data:
+            return None
+
+        # Extract comments if we have a valid post_id
+        if post_id and comments is not None:
+            await expand_more_replies(client, comments, parser, expander, post_id)
+            post_data['comments'] = comments
+        elif post_id:
+            subreddit = extract_subreddit(url) or "ChronicPain"
+            comments = await extract_comments(client, post_id, parser, expander, subreddit, errors)
+            if comments is None:
+                post_data['comments_missing'] = True
+            post_data['comments'] = comments or []
+
+        return post_data
+
+async def expand_more_replies(client, comments, parser=None, expander=None, post_id=None):
+    """
+    Fetch the "more replies" pages linked from a comment tree and attach them.
+
+    Without a shared expander, a private MoreRepliesQueue is used for this tree.
+    """
+    with tracing.span("expand_more_replies"):
+        if expander is not None:
+            await expander.expand(comments, post_id)
+            return
+        async with MoreRepliesQueue(client, parser) as expander:
+            await expander.expand(comments, post_id)
+
+async def extract_comments(client, post_id, parser=None, expander=None, subreddit="ChronicPain", errors=None):
+    """
+    Asynchronously extract all comments for a post in a subreddit.
+
+    Args:
+        errors (list, optional): Collects the FetchError if the comments could not be fetched.
+
+    Returns:
+        list: The comment tree, or None if the comments could not be fetched.
+    """
+    parser = parser or ParsePool(workers=0)
+    comments_url = get_comments_url(subreddit, post_id)
+
+    with tracing.span("extract_comments"):
+        try:
+            html = await client.fetch(comments_url, 'comments', post_id)
+        except FetchError as e:
+            print(f"Error fetching comments: {e}")
+            if errors is not None:
+                errors.append(e)
+            return None
+
+        comments = await parser.parse_comments(html)
+        await expand_more_replies(client, comments, parser, expander, post_id)
         return comments
-        
-    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-        print(f"Error fetching more replies: {e}")
-    return []
-
-async def extract_comments(session, post_id, rate_limiter):
-    """Asynchronously extract all comments for a post."""
-    comments_url = f"https://www.reddit.com/svc/shreddit/comments/r/chronicpain/{post_id}?render-mode=partial&is_lit_ssr=false"
-    
-    try:
-        await rate_limiter.acquire()  # Add rate limiting
-        async with session.get(comments_url, headers=REDDIT_HEADERS, timeout=60) as response:
-            response.raise_for_status()
-            html = await response.text()
-    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-        print(f"Error fetching comments: {e}")
-        return []
-
-    soup = BeautifulSoup(html, 'html.parser')
-    comment_tree = soup.find('shreddit-comment-tree')
-    comments = []
-
-    if comment_tree:
-        top_level_comments = comment_tree.find_all('shreddit-comment', attrs={'depth': '0'}, recursive=False)
-        tasks = [asyncio.create_task(process_comment(
-            comment_elem, 
-            session=session, 
-            rate_limiter=rate_limiter
-        )) for comment_elem in top_level_comments]
-        comments = await asyncio.gather(*tasks)
-        comments = [c for c in comments if c is not None]  # Filter out None values
-    
-    return comments
-
-async def main():
-    """Updated main function with rate limiter"""
-    BASE_URL = "https://www.reddit.com"
-    
-    with open('data/reddit_posts.json', 'r') as file:
-        reddit_posts = json.load(file)
-
-    rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE)
-    
-    async with aiohttp.ClientSession() as session:
-        semaphore = asyncio.Semaphore(MAX_WORKERS)
-        tasks = []
-        for post_url in reddit_posts:
-            full_url = f"{BASE_URL}{post_url}"
-            tasks.append(scrape_post(session, full_url, semaphore, rate_limiter))
-        
-        print(f"Total tasks: {len(tasks)}")
 
-        processed_posts = []
-        checkpoint_counter = 0
-        
-        # Initialize tqdm progress bar for fetching more replies
-        more_replies_progress = tqdm(total=0, desc="Fetching more replies", unit="reply")
+def dead_letter_urls(entries, reddit_posts):
+    """
+    Picks the post URLs to re-scrape for a set of dead-letter entries.
+
+    Any failure, including a single "more replies" page, causes the whole post
+    to be scraped again so its comment tree comes out complete.
+
+    Args:
+        entries (list): Entries from the dead-letter file.
+        reddit_posts (list): Relative post URLs from data/reddit_posts.json.
+
+    Returns:
+        list: Relative post URLs, without duplicates.
+    """
+    failed_ids = {entry['post_id'] for entry in entries if entry.get('post_id')}
+    urls = [url for url in reddit_posts if extract_post_id(url) in failed_ids]
+    known_ids = {extract_post_id(url) for url in urls}
+    for entry in entries:
+        if entry['endpoint'] == 'post' and entry.get('post_id') not in known_ids:
+            urls.append(entry['url'].replace(BASE_URL, '', 1))
+            known_ids.add(entry.get('post_id'))
+    return urls
+
+def iter_checkpointed_posts(state, post_urls):
+    """
+    Streams the checkpointed posts of a crawl back from the checkpoint files.
+
+    Only one post is held in memory at a time. When a checkpoint file holds a
+    post more than once, the copy written last is the one returned.
+
+    Args:
+        state (CrawlState): The crawl state.
+        post_urls (list): Relative post URLs of the crawl.
+
+    Yields:
+        dict: Each done post, grouped by checkpoint file.
+    """
+    wanted = {extract_post_id(url) for url in post_urls}
+    emitted = set()
+    for output, urls in state.done_outputs().items():
+        ids = {extract_post_id(url) for url in urls} & wanted - emitted
+        if not ids or not Path(output).exists():
+            continue
+        # First pass finds the last copy of each post, the second yields it
+        last_copy = {}
+        for number, post in enumerate(read_jsonl(output)):
+            if post.get('post_id') in ids:
+                last_copy[post['post_id']] = number
+        keep = set(last_copy.values())
+        for number, post in enumerate(read_jsonl(output)):
+            if number in keep:
+                yield post
+        emitted.update(last_copy)
+
+async def scrape_worker(queue, state, handle):
+    """
+    Takes post URLs off the queue and hands them to handle until it gets None.
+
+    A URL that handle fails on is marked failed and the worker moves on to the next.
+
+    Args:
+        queue (FairShareQueue): Relative post URLs; None once closed and drained.
+        state (CrawlState): Crawl state the failures are recorded in, or None.
+        handle (callable): Coroutine function scraping one relative post URL.
+    """
+    while True:
+        post_url = await queue.get()
+        if post_url is None:
+            return
+        try:
+            await handle(post_url)
+        except Exception as e:
+            print(f"Error scraping {post_url}: {e!r}")
+            queue.task_done(post_url)
+            if state is not None:
+                state.mark_failed(post_url, repr(e))
+
+async def enqueue_discovered(queue, state, client, parser, reddit_posts, progress, subreddit, num_posts):
+    """
+    Runs post discovery and feeds new URLs to the scrape workers as they are found.
+
+    A feed waits while its subreddit's queue is full, so discovery never runs
+    further ahead of scraping than the queue allows.
+
+    Args:
+        queue (FairShareQueue): Queue the scrape workers consume.
+        state (CrawlState): Crawl state; URLs already done are not queued.
+        client (RedditClient): Client shared with the scrape workers.
+        parser (ParsePool): Parser shared with the scrape workers.
+        reddit_posts (list): Receives every discovered URL.
+        progress (tqdm): Progress bar whose total grows with each queued URL.
+        subreddit (str or list): Subreddit, or subreddits, to discover posts in.
+        num_posts (int): Number of new posts to discover per subreddit.
+    """
+    async def offer(post_url):
+        reddit_posts.append(post_url)
+        state.add_urls([post_url])
+        if state.todo([post_url], CRAWL_MAX_ATTEMPTS):
+            progress.total += 1
+            progress.refresh()
+            await queue.put(post_url)
+
+    await discover_posts(client, subreddit=subreddit, num_posts=num_posts, parser=parser, on_new_url=offer)
+
+async def enqueue_leased(queue, state, worker_id, on_wait=None):
+    """
+    Feeds the scrape workers with URLs leased from a crawl state shared by several workers.
+
+    A batch of LEASE_BATCH_SIZE URLs is leased whenever the queue runs low.
+    When nothing is left to lease but other workers still hold live leases,
+    it waits for them to finish or expire, so the URLs of a worker that died
+    are picked up. Workers wait for each other's leases, so each one must
+    keep reporting its finished URLs meanwhile; on_wait is called for that.
+
+    Args:
+        queue (FairShareQueue): Queue the scrape workers consume.
+        state (CrawlState): The shared crawl state.
+        worker_id (str): Name this worker leases under.
+        on_wait (callable, optional): Called whenever it waits.
+
+    Returns:
+        int: Number of URLs leased.
+    """
+    leased = 0
+    while True:
+        if queue.qsize() >= LEASE_BATCH_SIZE:
+            await asyncio.sleep(0.1)
+            continue
+        batch = state.lease(worker_id, LEASE_BATCH_SIZE, LEASE_DURATION, CRAWL_MAX_ATTEMPTS)
+        if not batch:
+            if on_wait is not None:
+                on_wait()
+            if state.leased_elsewhere(worker_id) is None:
+                return leased
+            await asyncio.sleep(1)
+            continue
+        leased += len(batch)
+        for post_url in batch:
+            await queue.put(post_url)
+
+async def renew_leases(state, worker_id, interval=LEASE_DURATION / 3):
+    """Keeps this worker's leases alive until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        state.renew(worker_id, LEASE_DURATION)
+
+async def main(parse_workers=PARSE_WORKERS, replay_dead_letters=False, fresh=False,
+               discover=False, subreddit="ChronicPain", num_posts=3000, use_cache=False, offline=False,
+               archive=False, rate_limit=None, on_request=None, metrics_port=None, trace=False,
+               weights=None, worker_id=None, state_path=CRAWL_STATE_DB, state_journal='WAL',
+               single_request=False):
+    """
+    Scrapes posts and their comments through one shared client.
+
+    `subreddit` may be a list, to discover several subreddits in one crawl.
+    Posts of different subreddits share the request budget by weighted fair
+    share (see FairShareQueue); `weights` maps subreddit names to their weight.
+
+    With a `worker_id`, this process is one of several workers sharing the
+    crawl state at `state_path`: URLs are leased from it in batches (see
+    CrawlState.lease), the posts go to this worker's own checkpoint shard,
+    and the shards are combined afterwards with merge_shards.py. Workers on
+    different machines need `state_journal='DELETE'` (see CrawlState).
+
+    With `single_request`, posts take their comments from the post page when
+    it embeds them (see scrape_post).
+
+    With `use_cache`, responses are stored in the response cache and pages
+    younger than CACHE_TTL are served from it instead of being fetched.
+    """
+    if worker_id is not None and (discover or offline):
+        raise ValueError("Workers of a shared crawl scrape data/reddit_posts.json; discover the posts first")
+    # Offline runs re-extract every post from the response cache and leave the
+    # crawl state of the real crawl alone
+    state = CrawlState(':memory:' if offline else state_path, journal_mode=state_journal)
+    if fresh:
+        state.reset()
+
+    if discover:
+        # URLs are discovered while scraping; see enqueue_discovered
+        reddit_posts = []
+    else:
+        with open('data/reddit_posts.json', 'r') as file:
+            reddit_posts = json.load(file)
+        state.add_urls(reddit_posts)
+
+    if replay_dead_letters:
+        entries = take_dead_letters(DEAD_LETTER_FILE)
+        reddit_posts = dead_letter_urls(entries, reddit_posts)
+        state.requeue(reddit_posts)
+        print(f"Replaying {len(entries)} dead-letter entries ({len(reddit_posts)} posts)")
+
+    # Leaves alone the URLs leased by live workers of a shared crawl
+    recovered = state.recover()
+    todo = state.todo(reddit_posts, CRAWL_MAX_ATTEMPTS)
+    counts = state.counts()
+    print(f"Crawl state: {counts[DONE]} done, {counts[FAILED]} failed, {len(todo)} to scrape"
+          f" ({recovered} recovered from an interrupted run)")
+    if worker_id is not None:
+        print(f"Worker {worker_id}: leasing URLs from {state_path}, {counts[IN_FLIGHT]} leased by other workers")
+
+    if rate_limit is None:
+        rate_limiter = RateLimiter(RATE_LIMIT_REQUESTS, TOKEN_REFRESH_RATE)
+    else:
+        # An explicit limit replaces the per-endpoint limits as well
+        rate_limiter = RateLimiter(rate_limit, 60, endpoint_limits={})
+    controller = AdaptiveConcurrency()
+    metrics = CrawlMetrics()
+    metrics.watch_controller(controller)
+    parser = ParsePool(workers=parse_workers, metrics=metrics)
+    metrics_server = None
+    trace_filename = None
+    run_name = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if worker_id is not None:
+        run_name = f"{worker_id}_{run_name}"
+    metrics_filename = PARTIAL_DATA_DIR / f"metrics_{run_name}.json"
+    if trace:
+        trace_filename = PARTIAL_DATA_DIR / f"trace_{run_name}.json"
+        tracing.start_tracing(trace_filename)
+    if metrics_port is not None:
+        metrics_server = await start_metrics_server(metrics, metrics_port)
+        print(f"Metrics at http://127.0.0.1:{metrics_port}/metrics")
+
+    try:
+        # Posts waiting for a worker, per subreddit; the controller decides how many requests are in flight
+        queue = FairShareQueue(weights)
+        metrics.watch_queue('scraper_url_queue_depth', "Post URLs waiting for a scrape worker", queue)
+
+        async with aiohttp.ClientSession() as session:
+            dead_letters = DeadLetterQueue(DEAD_LETTER_FILE)
+            cache = ResponseCache() if use_cache or offline else None
+            html_archive = HtmlArchive() if archive else None
+            client = RedditClient(session, rate_limiter, controller, RetryPolicy(), dead_letters,
+                                  cache=cache, offline=offline, archive=html_archive, on_request=on_request,
+                                  metrics=metrics, fair_share=queue)
+
+            # Only a few posts stay in memory, for the preview; the rest live in the checkpoint
+            preview_posts = []
+            scraped = 0
+            date_str = datetime.now().strftime("%Y%m%d")
+            if offline:
+                checkpoint_name = f"checkpoint_offline_{date_str}.jsonl"
+            elif worker_id is not None:
+                # This worker's output shard
+                checkpoint_name = f"checkpoint_{worker_id}_{date_str}.jsonl"
+            else:
+                checkpoint_name = f"checkpoint_{date_str}.jsonl"
+            checkpoint_filename = PARTIAL_DATA_DIR / checkpoint_name
+            checkpoint = JsonlWriter(checkpoint_filename)
+            # URLs whose posts are queued for the checkpoint, in write order; they are
+            # marked done once the writer has synced them.
+            awaiting_sync = deque()
+            marked = 0
         
-        for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Scraping Posts"):
-            post_data = await task
-            if post_data:
-                # Update the count of fetched replies
-                for comment in post_data['comments']:
-                    more_replies_progress.total += len(comment.get('replies', []))
-                    more_replies_progress.update(len(comment.get('replies', [])))
-                
-                processed_posts.append(post_data)
-                checkpoint_counter += 1
-
-                if checkpoint_counter >= CHECKPOINT_INTERVAL:
-                    date_str = datetime.now().strftime("%Y%m%d")
-                    checkpoint_filename = f"data/partial/checkpoint_{date_str}.json"
-                    try:
-                        # Load existing checkpoint if it exists
-                        existing_posts = []
-                        if os.path.exists(checkpoint_filename):
-                            with open(checkpoint_filename, 'r', encoding='utf-8') as f:
-                                existing_posts = json.load(f)
-                        
-                        # Combine existing and new posts
-                        all_posts = existing_posts + processed_posts
-                        
-                        with open(checkpoint_filename, 'w', encoding='utf-8') as f:
-                            json.dump(all_posts, f, indent=2, ensure_ascii=False)
-                        print(f"\nCheckpoint saved to {checkpoint_filename}")
-                    except IOError as e:
-                        print(f"Error writing to checkpoint file: {e}")
-
-                    checkpoint_counter = 0  # Reset counter only
+            # Counts "more replies" pages as they are fetched
+            more_replies_progress = tqdm(desc="Fetching more replies", unit="page")
+            # A worker's share of the crawl isn't known in advance
+            posts_progress = tqdm(total=None if worker_id is not None else len(todo), desc="Scraping Posts")
+
+            async def handle(post_url):
+                nonlocal scraped
+                if worker_id is None:
+                    # Leasing already marked the URL in flight
+                    state.mark_in_flight(post_url)
+                errors = []
+                post_data = await scrape_post(client, f"{BASE_URL}{post_url}", parser, expander, single_request, errors)
+                queue.task_done(post_url)
+                posts_progress.update(1)
+                posts_progress.set_postfix(controller.stats(), refresh=False)
+                more_replies_progress.update(expander.fetched - more_replies_progress.n)
+                if post_data and post_data.get('comments_missing') and not (
+                        any(e.permanent for e in errors) or state.attempts(post_url) >= CRAWL_MAX_ATTEMPTS):
+                    # Left for a resumed crawl or --replay-dead-letters to scrape again
+                    state.mark_failed(post_url, "comments could not be fetched")
+                elif post_data:
+                    # Includes posts whose comments will never be fetched, so their metadata is kept
+                    scraped += 1
+                    if len(preview_posts) < PREVIEW_POSTS:
+                        preview_posts.append(post_data)
+                    checkpoint.write(post_data)
+                    awaiting_sync.append(post_url)
+                else:
+                    state.mark_failed(post_url, "no post data")
+                mark_synced()
+
+            def mark_synced():
+                nonlocal marked
+                # One transaction per checkpoint flush rather than one per post
+                synced = [awaiting_sync.popleft() for _ in range(min(checkpoint.synced - marked, len(awaiting_sync)))]
+                if synced:
+                    state.mark_done_many(synced, checkpoint_filename)
+                    marked += len(synced)
+
+            # "More replies" pages of every post go through one budgeted queue
+            truncated_report = JsonlWriter(TRUNCATED_REPLIES_FILE)
+            expander = MoreRepliesQueue(client, parser, report=truncated_report)
+
+            async def enqueue(post_urls):
+                for post_url in post_urls:
+                    await queue.put(post_url)
+
+            async with expander:
+                workers = [asyncio.create_task(scrape_worker(queue, state, handle)) for _ in range(CONCURRENCY_MAX)]
+                renewer = asyncio.create_task(renew_leases(state, worker_id)) if worker_id is not None else None
+                try:
+                    if worker_id is not None:
+                        await enqueue_leased(queue, state, worker_id, on_wait=mark_synced)
+                    elif discover:
+                        await enqueue_discovered(queue, state, client, parser, reddit_posts, posts_progress, subreddit, num_posts)
+                    else:
+                        # One producer per subreddit, so a full queue only holds back its own subreddit
+                        by_subreddit = {}
+                        for post_url in todo:
+                            by_subreddit.setdefault((extract_subreddit(post_url) or '').lower(), []).append(post_url)
+                        await asyncio.gather(*(enqueue(urls) for urls in by_subreddit.values()))
+                    # Leases are kept alive until the workers have finished the URLs already queued
+                    await queue.close()
+                    await asyncio.gather(*workers)
+                finally:
+                    # On an error or Ctrl-C the workers stop at once; the posts they
+                    # were scraping stay in flight and are recovered by the next run
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+                    if renewer is not None:
+                        renewer.cancel()
+                    checkpoint.close()
+                    if checkpoint.error is None:
+                        state.mark_done_many(awaiting_sync, checkpoint_filename)
+                        awaiting_sync.clear()
+                    if worker_id is not None:
+                        state.release(worker_id)
+                    truncated_report.close()
         
-        # Close the progress bar for fetching more replies
-        more_replies_progress.close()
-
-    # Save remaining results after processing all tasks
-    if processed_posts:
+            # Close the progress bars
+            posts_progress.close()
+            more_replies_progress.close()
+            print(f"\n{checkpoint.written} posts checkpointed to {checkpoint_filename}")
+            print(f"More replies: {expander.stats()}")
+            subreddit_stats = queue.stats()
+            if len(subreddit_stats) > 1:
+                for name, stats in subreddit_stats.items():
+                    print(f"r/{name}: {stats['posts']} posts, {stats['requests']} requests, "
+                          f"last post done after {stats['finished_after']:.1f}s")
+            if truncated_report.written:
+                print(f"{truncated_report.written} comment subtrees were not fully expanded; see {TRUNCATED_REPLIES_FILE}")
+            if cache is not None:
+                print(f"Response cache: {cache.stats()}")
+            if html_archive is not None:
+                html_archive.close()
+                print(f"{html_archive.count} responses archived to {html_archive.path}")
+
+    finally:
+        # Also on a crash or Ctrl-C, when the metrics and trace matter most
+        parser.close()
+        if metrics_server is not None:
+            await metrics_server.cleanup()
+        if trace_filename is not None:
+            tracing.stop_tracing()
+            print(f"Trace written to {trace_filename}; open it in ui.perfetto.dev or chrome://tracing")
+        metrics.write_summary(metrics_filename)
+
+    if dead_letters.count:
+        print(f"\n{dead_letters.count} requests failed permanently and were written to {DEAD_LETTER_FILE}")
+        print("Re-scrape the affected posts with: python scraper/scrape_posts.py --replay-dead-letters")
+
+    # Save all posts of the crawl, streamed from the checkpoints. Replays only
+    # cover the replayed posts; workers of a shared crawl leave their shard
+    # for merge_shards.py.
+    if worker_id is not None:
+        counts = state.counts()
+        print(f"\nWorker {worker_id} scraped {scraped} posts; crawl state: {counts[DONE]} done, "
+              f"{counts[FAILED]} failed, {counts[IN_FLIGHT]} leased")
+        print("Once every worker has finished, merge the shards with: python scraper/merge_shards.py")
+    else:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_filename = f"posts_data_{timestamp}.json"
         try:
-            with open(output_filename, 'w', encoding='utf-8') as f:
-                json.dump(processed_posts, f, indent=2, ensure_ascii=False)
-            print(f"\nPosts saved to {output_filename}")
+            saved = write_json_array(output_filename, iter_checkpointed_posts(state, reddit_posts))
+            if saved:
+                print(f"\n{saved} posts saved to {output_filename} ({scraped} scraped in this run)")
+            else:
+                Path(output_filename).unlink()
         except IOError as e:
             print(f"Error writing to JSON file: {e}")
+    state.close()
+
+    split = metrics.time_split()
+    print(f"Per request: {split['network_per_request']:.3f}s network, "
+          f"{split['rate_limiter_per_request']:.3f}s rate limiter, {split['slot_wait_per_request']:.3f}s "
+          f"waiting for a slot; {split['parse_share_of_run']:.0%} of the run parsing "
+          f"(bound by {split['bound_by']}). Metrics written to {metrics_filename}")
 
     # Updated preview section
     print("\nScraped Posts Preview:")
-    for post in processed_posts:
+    for post in preview_posts:
         print(f"\nTitle: {post['title']}")
         print(f"Author: {post['author']}")
         print(f"Content preview: {post['content'][:100]}...")
@@ -287,4 +532,57 @@ async def main():
         print("-" * 50)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    arg_parser = argparse.ArgumentParser(description="Scrape posts and comments for the URLs in data/reddit_posts.json")
+    arg_parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS,
+                            help="Parse HTML in this many worker processes (0 parses inline)")
+    arg_parser.add_argument('--replay-dead-letters', action='store_true',
+                            help="Only re-scrape the posts with requests in the dead-letter file")
+    arg_parser.add_argument('--fresh', action='store_true',
+                            help="Forget the saved crawl state and scrape every URL again")
+    arg_parser.add_argument('--discover', action='store_true',
+                            help="Discover post URLs and scrape them as they are found, instead of "
+                                 "reading data/reddit_posts.json")
+    arg_parser.add_argument('--cache', action='store_true',
+                            help="Store responses in the response cache and serve pages younger "
+                                 "than CACHE_TTL from it, for a later --offline run")
+    arg_parser.add_argument('--offline', action='store_true',
+                            help="Serve every page from the response cache and make no requests")
+    arg_parser.add_argument('--archive', action='store_true',
+                            help="Archive every fetched response body under data/archive "
+                                 "for re-parsing with reparse_archive.py")
+    arg_parser.add_argument('--rate-limit', type=int, default=None,
+                            help="Requests per minute, replacing RATE_LIMIT_REQUESTS and the "
+                                 "per-endpoint limits (e.g. for a local mock server)")
+    arg_parser.add_argument('--metrics-port', type=int, default=None,
+                            help="Serve crawl metrics on http://127.0.0.1:PORT/metrics (Prometheus) "
+                                 "and /metrics.json while scraping")
+    arg_parser.add_argument('--trace', action='store_true',
+                            help="Write a Chrome trace of every post's fetches, waits and parsing "
+                                 "to data/partial/trace_*.json")
+    arg_parser.add_argument('--subreddit', nargs='+', default=["ChronicPain"], metavar="NAME[:WEIGHT]",
+                            help="Subreddits to discover posts in, in one crawl; an optional weight "
+                                 "sets a subreddit's share of the request budget (default 1)")
+    arg_parser.add_argument('--num-posts', type=int, default=3000,
+                            help="Number of new posts to discover per subreddit")
+    arg_parser.add_argument('--worker-id', default=None,
+                            help="Run as one of several workers sharing the crawl state: lease URLs in "
+                                 "batches and write this worker's posts to its own checkpoint shard")
+    arg_parser.add_argument('--state', default=str(CRAWL_STATE_DB),
+                            help="Crawl state database, e.g. on a volume shared by the workers")
+    arg_parser.add_argument('--state-journal', default='WAL', choices=['WAL', 'DELETE'],
+                            help="SQLite journal mode of the crawl state; WAL only works for workers on "
+                                 "one host, so use DELETE when workers on several machines share it")
+    arg_parser.add_argument('--single-request', action='store_true',
+                            help="Take each post's comments from the comment tree embedded in its post "
+                                 "page, fetching the comment partial only when the page has none")
+    args = arg_parser.parse_args()
+    if args.worker_id is not None and (args.discover or args.offline):
+        arg_parser.error("--worker-id scrapes data/reddit_posts.json; it can't be combined with "
+                         "--discover or --offline")
+    subreddit_weights = parse_subreddit_weights(args.subreddit)
+    asyncio.run(main(parse_workers=args.parse_workers, replay_dead_letters=args.replay_dead_letters,
+                     fresh=args.fresh, discover=args.discover, subreddit=list(subreddit_weights), weights=subreddit_weights,
+                     num_posts=args.num_posts, use_cache=args.cache, offline=args.offline,
+                     archive=args.archive, rate_limit=args.rate_limit, metrics_port=args.metrics_port,
+                     trace=args.trace, worker_id=args.worker_id, state_path=args.state,
+                     state_journal=args.state_journal, single_request=args.single_request))
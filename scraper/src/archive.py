@@ -0,0 +1,182 @@
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+
+from config.constants import ARCHIVE_SEGMENT_BYTES
+from config.paths import ARCHIVE_DIR
+from scraper.src.cache import normalize_url
+from scraper.src.retry import FetchError
+from scraper.src.sink import read_jsonl
+
+INDEX_FILE = "index.jsonl"
+
+
+def _segment_name(number):
+    return f"segment_{number:05d}.gz"
+
+
+class HtmlArchive:
+    """
+    Append-only archive of raw response bodies.
+
+    Bodies are appended to segment files as independent gzip members, so a
+    single body can be decompressed from its offset without reading the rest of
+    the segment. Every body gets a line in index.jsonl with its URL, endpoint,
+    post id, fetch time, segment, offset and compressed length; the line is
+    written after the body is flushed, so the index never points past the data.
+    Each archive opened starts a new segment, and segments roll over once they
+    pass segment_bytes.
+    """
+    def __init__(self, path=ARCHIVE_DIR, segment_bytes=ARCHIVE_SEGMENT_BYTES, compresslevel=6):
+        """
+        Args:
+            path (str or Path, optional): Archive directory. Defaults to ARCHIVE_DIR.
+            segment_bytes (int, optional): Size after which a new segment is started.
+                Defaults to ARCHIVE_SEGMENT_BYTES.
+            compresslevel (int, optional): gzip compression level. Defaults to 6.
+        """
+        self.path = Path(path)
+        self.segment_bytes = segment_bytes
+        self.compresslevel = compresslevel
+        self.count = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        numbers = [int(p.stem.split('_')[1]) for p in self.path.glob('segment_*.gz')]
+        self.segment_number = max(numbers, default=-1)
+        self.segment = None
+        self.index = open(self.path / INDEX_FILE, 'a', encoding='utf-8')
+        self._next_segment()
+
+    def _next_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+        self.segment_number += 1
+        self.segment = open(self.path / _segment_name(self.segment_number), 'ab')
+
+    def add(self, url, endpoint, post_id, body):
+        """
+        Archives a response body.
+
+        Args:
+            url (str): The URL the body was fetched from.
+            endpoint (str): 'post', 'comments', 'more_replies' or 'feed'.
+            post_id (str): The post the page belongs to (e.g. 't3_abc123'), if known.
+            body (str): The response body.
+        """
+        data = gzip.compress(body.encode('utf-8'), compresslevel=self.compresslevel)
+        offset = self.segment.tell()
+        self.segment.write(data)
+        self.segment.flush()
+        entry = {
+            'url': url,
+            'endpoint': endpoint,
+            'post_id': post_id,
+            'fetched_at': time.time(),
+            'segment': _segment_name(self.segment_number),
+            'offset': offset,
+            'length': len(data),
+        }
+        self.index.write(json.dumps(entry) + "\n")
+        self.index.flush()
+        self.count += 1
+        if offset + len(data) >= self.segment_bytes:
+            self._next_segment()
+
+    def close(self):
+        self.segment.close()
+        self.index.close()
+
+
+class ArchiveReader:
+    """
+    Reads bodies back from an HtmlArchive.
+
+    When a URL was archived more than once, the latest copy wins. URLs are
+    matched in normalized form (see `normalize_url`).
+    """
+    def __init__(self, path=ARCHIVE_DIR):
+        """
+        Args:
+            path (str or Path, optional): Archive directory. Defaults to ARCHIVE_DIR.
+        """
+        self.path = Path(path)
+        self.entries = {}
+        for entry in read_jsonl(self.path / INDEX_FILE):
+            key = normalize_url(entry['url'])
+            previous = self.entries.get(key)
+            if previous is None or entry['fetched_at'] >= previous['fetched_at']:
+                self.entries[key] = entry
+        self._segments = {}
+
+    def find(self, url):
+        """Returns the index entry for a URL, or None if it isn't archived."""
+        return self.entries.get(normalize_url(url))
+
+    def entries_for(self, endpoint):
+        """
+        Lists the latest entry of every archived URL of one endpoint.
+
+        Args:
+            endpoint (str): 'post', 'comments', 'more_replies' or 'feed'.
+
+        Returns:
+            list: Index entries, oldest fetch first.
+        """
+        entries = [entry for entry in self.entries.values() if entry['endpoint'] == endpoint]
+        return sorted(entries, key=lambda entry: entry['fetched_at'])
+
+    def read(self, entry):
+        """
+        Decompresses the body an index entry points at.
+
+        Args:
+            entry (dict): Entry from the index.
+
+        Returns:
+            str: The archived body.
+        """
+        segment = self._segments.get(entry['segment'])
+        if segment is None:
+            segment = self._segments[entry['segment']] = open(self.path / entry['segment'], 'rb')
+        segment.seek(entry['offset'])
+        return gzip.decompress(segment.read(entry['length'])).decode('utf-8')
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments = {}
+
+
+class ArchiveClient:
+    """
+    Stand-in for RedditClient that serves pages from an archive.
+
+    Lets `scrape_post` and the comment expansion code run unchanged against a
+    historical crawl, without any network access.
+    """
+    def __init__(self, reader):
+        """
+        Args:
+            reader (ArchiveReader): The archive to serve pages from.
+        """
+        self.reader = reader
+        self.misses = 0
+
+    async def fetch(self, url, endpoint, post_id=None):
+        """
+        Returns the archived body of a URL.
+
+        Raises:
+            FetchError: When the URL is not in the archive.
+        """
+        entry = self.reader.find(url)
+        if entry is None:
+            self.misses += 1
+            raise FetchError(url, endpoint, "Not in the archive", 0)
+        return self.reader.read(entry)
+
+
+def archive_size(path=ARCHIVE_DIR):
+    """Returns the total size in bytes of an archive's segments."""
+    return sum(os.path.getsize(p) for p in Path(path).glob('segment_*.gz'))
@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config.constants import CACHE_TTL, CACHE_ENDPOINT_TTLS, CACHE_MAX_BYTES
+from config.paths import RESPONSE_CACHE_DIR
+
+# Query parameters that change between requests for the same page
+VOLATILE_PARAMS = {'navigationSessionId'}
+
+
+def normalize_url(url):
+    """
+    Reduces a URL to the form used as its cache key.
+
+    The scheme and host are lowercased, the fragment and volatile parameters
+    (such as the random navigationSessionId of feed URLs) are dropped and the
+    remaining query parameters are sorted.
+
+    Args:
+        url (str): Absolute URL.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url)
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in VOLATILE_PARAMS
+    )
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(query), ''))
+
+
+def cache_key(url):
+    """Returns the SHA-256 hex digest of a URL's normalized form."""
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk cache of response bodies, keyed by normalized URL.
+
+    Each body is stored gzipped in its own file, named after the hash of the
+    normalized URL; the file's modification time is the time it was fetched.
+    Entries older than their endpoint's TTL are treated as missing (unless
+    stale entries are explicitly allowed, as in offline mode), and when the
+    cache grows past max_bytes the oldest entries are deleted.
+
+    The methods do blocking file I/O and may be called from several threads
+    at once, so the client runs them off the event loop.
+    """
+    def __init__(self, path=RESPONSE_CACHE_DIR, ttl=CACHE_TTL, endpoint_ttls=None,
+                 max_bytes=CACHE_MAX_BYTES, clock=time.time):
+        """
+        Args:
+            path (str or Path, optional): Cache directory. Defaults to RESPONSE_CACHE_DIR.
+            ttl (float, optional): Seconds an entry stays fresh. Defaults to CACHE_TTL.
+            endpoint_ttls (dict, optional): TTLs for specific endpoints, overriding ttl.
+                Defaults to CACHE_ENDPOINT_TTLS.
+            max_bytes (int, optional): Size the cache is kept under. Defaults to CACHE_MAX_BYTES.
+            clock (callable, optional): Returns the current time. Defaults to time.time.
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.endpoint_ttls = CACHE_ENDPOINT_TTLS if endpoint_ttls is None else endpoint_ttls
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.lock = threading.Lock()  # Guards the counters and size
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        return self.path.glob('*/*.gz')
+
+    def _entry_path(self, url):
+        key = cache_key(url)
+        return self.path / key[:2] / f"{key}.gz"
+
+    def get(self, url, endpoint=None, allow_stale=False):
+        """
+        Looks up the cached body of a URL.
+
+        Args:
+            url (str): Absolute URL.
+            endpoint (str, optional): Endpoint the URL belongs to, selecting its TTL.
+            allow_stale (bool, optional): Return entries past their TTL too. Defaults to False.
+
+        Returns:
+            str: The cached body, or None on a miss.
+        """
+        entry = self._entry_path(url)
+        try:
+            fetched_at = entry.stat().st_mtime
+            ttl = self.endpoint_ttls.get(endpoint, self.ttl)
+            if not allow_stale and self.clock() - fetched_at > ttl:
+                body = None
+            else:
+                with gzip.open(entry, 'rt', encoding='utf-8') as f:
+                    body = f.read()
+        except (OSError, EOFError):
+            body = None
+        with self.lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body
+
+    def put(self, url, body):
+        """
+        Stores the body of a URL, replacing any older entry.
+
+        Args:
+            url (str): Absolute URL.
+            body (str): Response body.
+        """
+        entry = self._entry_path(url)
+        entry.parent.mkdir(exist_ok=True)
+        old_size = entry.stat().st_size if entry.exists() else 0
+        # Per thread, so concurrent stores of one URL don't write the same file
+        tmp = entry.with_suffix(f'.{threading.get_ident()}.tmp')
+        with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=5) as f:
+            f.write(body)
+        os.replace(tmp, entry)
+        with self.lock:
+            self.size += entry.stat().st_size - old_size
+            self.stores += 1
+            full = self.size > self.max_bytes
+        if full:
+            self.evict()
+
+    def evict(self, target=None):
+        """
+        Deletes the oldest entries until the cache is under a size.
+
+        Args:
+            target (int, optional): Size to get under. Defaults to 90% of max_bytes,
+                so eviction doesn't run again on the next store.
+        """
+        if target is None:
+            target = int(self.max_bytes * 0.9)
+        with self.lock:
+            entries = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            entries.sort()
+            self.size = sum(size for _, size, _ in entries)
+            for _, size, entry in entries:
+                if self.size <= target:
+                    break
+                entry.unlink(missing_ok=True)
+                self.size -= size
+
+    def stats(self):
+        """
+        Summarizes cache usage since the cache was opened.
+
+        Returns:
+            dict: hits, misses, stores and size in megabytes.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'size_mb': round(self.size / 1e6, 1),
+        }
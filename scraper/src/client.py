@@ -0,0 +1,199 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from config.constants import DEFAULT_RETRY_AFTER
+from config.headers import REDDIT_HEADERS
+from scraper.src import tracing
+from scraper.src.retry import FAIL, FetchError, RetryPolicy
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header.
+
+    Args:
+        value (str): Either a number of seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or malformed.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_throttled(status):
+    """Tells whether a response status means the server wants us to slow down."""
+    return status == 429 or status >= 500
+
+
+class RedditClient:
+    """
+    Fetches Reddit pages for the scraper.
+
+    Every request goes through the shared rate limiter (per endpoint) and the
+    adaptive concurrency controller, so all request sites back off together
+    when Reddit answers with a 429 or 5xx. Failed attempts are retried according
+    to the retry policy; requests that fail for good are written to the
+    dead-letter queue.
+
+    With a response cache, fresh cached pages are returned without touching the
+    network, the rate limiter or the controller, and fetched pages are stored.
+    In offline mode only the cache is used, whatever the age of its entries.
+    With an archive, every body fetched from the network is also archived.
+    """
+    def __init__(self, session, rate_limiter, controller, retry_policy=None, dead_letters=None,
+                 timeout=60, sleep=asyncio.sleep, cache=None, offline=False, archive=None,
+                 on_request=None, metrics=None, fair_share=None):
+        """
+        Args:
+            session (aiohttp.ClientSession): Session used for all requests.
+            rate_limiter (RateLimiter): Shared rate limiter.
+            controller (AdaptiveConcurrency): Shared concurrency controller.
+            retry_policy (RetryPolicy, optional): Defaults to RetryPolicy().
+            dead_letters (DeadLetterQueue, optional): Where permanent failures are recorded.
+                Defaults to None (not recorded).
+            timeout (float, optional): Per-request timeout in seconds. Defaults to 60.
+            sleep (callable, optional): Coroutine function used to back off. Defaults to asyncio.sleep.
+            cache (ResponseCache, optional): Response cache. Defaults to None (no caching).
+            offline (bool, optional): Serve only from the cache and never make a request.
+                Requires cache. Defaults to False.
+            archive (HtmlArchive, optional): Archive of fetched bodies. Defaults to None (not archived).
+            on_request (callable, optional): Called after every network attempt with the
+                endpoint, the HTTP status (None if no response) and the seconds it took.
+            metrics (CrawlMetrics, optional): Records latency, bytes, waits, retries and
+                cache hits. Defaults to None (not recorded).
+            fair_share (FairShareQueue, optional): Charged with every network attempt, by
+                the subreddit in its URL. Defaults to None.
+        """
+        if offline and cache is None:
+            raise ValueError("offline mode needs a response cache")
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.controller = controller
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dead_letters = dead_letters
+        self.timeout = timeout
+        self.sleep = sleep
+        self.cache = cache
+        self.offline = offline
+        self.archive = archive
+        self.on_request = on_request
+        self.metrics = metrics
+        self.fair_share = fair_share
+        self.requests = 0
+        self.retries = 0
+
+    async def fetch(self, url, endpoint, post_id=None):
+        """
+        Fetches a page and returns its body.
+
+        Throttled responses (429/5xx) narrow the controller's window and pause new
+        requests for the server's Retry-After. Throttled and transient failures are
+        retried with jittered exponential backoff, without holding a request slot.
+
+        Args:
+            url (str): Absolute URL to fetch.
+            endpoint (str): 'post', 'comments', 'more_replies' or 'feed', for rate limiting.
+            post_id (str, optional): The post the page belongs to, recorded on permanent failure.
+
+        Returns:
+            str: The response body.
+
+        Raises:
+            FetchError: When the request fails permanently or runs out of attempts,
+                or, offline, when the page is not cached.
+        """
+        with tracing.span(f"fetch {endpoint}", url=url):
+            return await self._fetch(url, endpoint, post_id)
+
+    async def _fetch(self, url, endpoint, post_id):
+        if self.cache is not None:
+            html = await asyncio.to_thread(self.cache.get, url, endpoint, allow_stale=self.offline)
+            if html is not None:
+                if self.metrics is not None:
+                    self.metrics.cache_hits.inc(endpoint=endpoint)
+                return html
+            if self.offline:
+                raise FetchError(url, endpoint, "Not in the response cache (offline)", 0)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            status = None
+            error = None
+            retry_after = None
+
+            limiter_start = time.perf_counter()
+            limiter_wait = await self.rate_limiter.acquire(endpoint)
+            tracing.record("rate limiter", limiter_start, time.perf_counter())
+            self.requests += 1
+            if self.fair_share is not None:
+                self.fair_share.charge(url, endpoint)
+            response_status = None
+            body_bytes = 0
+            slot_requested = request_start = time.perf_counter()
+            try:
+                async with self.controller.slot() as started_at:
+                    request_start = time.perf_counter()
+                    async with self.session.get(url, headers=REDDIT_HEADERS, timeout=self.timeout) as response:
+                        response_status = response.status
+                        if response.status < 400:
+                            body_bytes = len(await response.read())
+                            html = await response.text()
+                        else:
+                            status = response.status
+                            if is_throttled(status):
+                                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                                if retry_after is None and status == 429:
+                                    retry_after = DEFAULT_RETRY_AFTER
+                                self.controller.on_throttle(started_at, retry_after)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            request_end = time.perf_counter()
+            elapsed = request_end - request_start
+            tracing.record("slot wait", slot_requested, request_start)
+            tracing.record("request", request_start, request_end, status=response_status, attempt=attempt)
+            if self.on_request is not None:
+                self.on_request(endpoint, response_status, elapsed)
+            if self.metrics is not None:
+                self.metrics.rate_limit_wait.observe(limiter_wait, endpoint=endpoint)
+                self.metrics.slot_wait.observe(request_start - slot_requested, endpoint=endpoint)
+                self.metrics.observe_request(endpoint, response_status, elapsed, body_bytes)
+
+            if status is None and error is None:
+                self.controller.on_success()
+                if self.cache is not None:
+                    await asyncio.to_thread(self.cache.put, url, html)
+                if self.archive is not None:
+                    self.archive.add(url, endpoint, post_id, html)
+                return html
+
+            reason = f"HTTP {status}" if status is not None else (str(error) or type(error).__name__)
+            decision = self.retry_policy.classify(status=status, error=error)
+            if not self.retry_policy.should_retry(decision, attempt):
+                if self.dead_letters is not None:
+                    self.dead_letters.add(url, endpoint, post_id, reason, attempt)
+                raise FetchError(url, endpoint, reason, attempt, permanent=decision == FAIL)
+
+            delay = max(self.retry_policy.backoff(attempt), retry_after or 0)
+            self.retries += 1
+            if self.metrics is not None:
+                self.metrics.retries.inc(endpoint=endpoint)
+            print(f"{reason} for {url}, retrying in {delay:.1f}s (attempt {attempt + 1}/{self.retry_policy.max_attempts})")
+            with tracing.span("backoff", reason=reason):
+                await self.sleep(delay)
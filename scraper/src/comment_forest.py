@@ -0,0 +1,275 @@
+"""
+Compact, array-backed storage for comment trees.
+
+A nested comment list costs a dict with eight keys and a `replies` list per
+comment, which outweighs the text itself once millions of comments are held
+in memory. `CommentForest` stores the same comments in parallel arrays,
+in document (pre-)order:
+
+    parent[i]        index of the parent comment, -1 for top-level comments
+    depth[i]         the comment's `depth`
+    subtree_end[i]   the comment's replies, all levels, are i+1 .. subtree_end[i]-1
+    author_ids[i]    index into `authors`, each distinct author stored once
+    text, thing_id, action_id, more_replies
+                     UTF-8 strings packed into one buffer per field, with offsets
+
+The direct replies of comment i are `children[child_start[i]:child_start[i+1]]`,
+so their range is found in O(1), and a whole subtree is the contiguous index
+range `subtree(i)`.
+
+Iterating a forest yields its top-level comments as read-only views that
+behave like the comment dictionaries (`comment['text']`, `comment['replies']`),
+so code that only reads comments by key, such as `print_comment_tree` and
+`walk_comments`, works on a forest unchanged. Code that serializes a post
+(`json.dump`, `str(post)` as in the LLM extractor) or modifies comments needs
+the nested form back from `to_nested`.
+
+`from_nested` and `to_nested` round-trip the keys of the scraper's comment
+format (thing_id, depth, parent_id, author, text, action_id, more_replies,
+replies); any other key on a comment is dropped.
+"""
+import sys
+from array import array
+
+_KEYS = ('thing_id', 'depth', 'parent_id', 'author', 'text', 'action_id', 'more_replies', 'replies')
+
+
+class _Strings:
+    """Optional strings packed into one UTF-8 buffer, addressed by position."""
+    __slots__ = ('buffer', 'offsets', 'missing')
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array('q', [0])
+        self.missing = bytearray()
+
+    def append(self, value):
+        self.missing.append(value is None)
+        if value is not None:
+            self.buffer += value.encode('utf-8')
+        self.offsets.append(len(self.buffer))
+
+    def freeze(self):
+        self.buffer = bytes(self.buffer)
+        self.missing = bytes(self.missing)
+
+    def __getitem__(self, index):
+        if self.missing[index]:
+            return None
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def nbytes(self):
+        return len(self.buffer) + len(self.missing) + self.offsets.itemsize * len(self.offsets)
+
+
+class CommentView:
+    """
+    One comment of a forest, read like a comment dictionary.
+
+    Supports `view[key]` and `view.get(key)` for the keys of the scraper's
+    comment format; 'replies' returns the views of the direct replies.
+    """
+    __slots__ = ('forest', 'index')
+
+    def __init__(self, forest, index):
+        self.forest = forest
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.forest.field(self.index, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in _KEYS else default
+
+    def keys(self):
+        return _KEYS
+
+    def __repr__(self):
+        return f"CommentView({self['thing_id']!r}, depth={self['depth']})"
+
+
+class CommentForest:
+    """
+    The comment trees of a thread in parallel arrays.
+
+    Build one with `from_nested`. Comments are addressed by their index in
+    document order; `len(forest)` is the number of comments.
+    """
+    def __init__(self):
+        self.parent = array('i')
+        self.depth = array('i')
+        self.subtree_end = array('i')
+        self.author_ids = array('i')
+        self.authors = []
+        self.text = _Strings()
+        self.thing_id = _Strings()
+        self.action_id = _Strings()
+        self.more_replies = _Strings()
+        self.roots = array('i')
+        self.child_start = array('i')
+        self.children = array('i')
+        # parent_id of comments whose parent_id isn't their parent's thing_id,
+        # e.g. top-level comments of a "more replies" page
+        self.parent_ids = {}
+
+    @classmethod
+    def from_nested(cls, comments):
+        """
+        Builds a forest from nested comment dictionaries.
+
+        Args:
+            comments (list): Top-level comments with nested `replies`, as scraped.
+                Keys outside the scraper's comment format are not kept.
+
+        Returns:
+            CommentForest: The same comments in array form.
+        """
+        forest = cls()
+        author_index = {}
+        stack = [(comment, -1) for comment in reversed(comments)]
+        while stack:
+            comment, parent = stack.pop()
+            index = len(forest.parent)
+            forest.parent.append(parent)
+            forest.depth.append(comment['depth'])
+            author = comment['author']
+            author_id = author_index.get(author)
+            if author_id is None:
+                author_id = author_index[author] = len(forest.authors)
+                forest.authors.append(author)
+            forest.author_ids.append(author_id)
+            forest.text.append(comment['text'])
+            forest.thing_id.append(comment['thing_id'])
+            forest.action_id.append(comment['action_id'])
+            forest.more_replies.append(comment['more_replies'])
+            expected = forest.thing_id[parent] if parent >= 0 else None
+            if comment['parent_id'] != expected:
+                forest.parent_ids[index] = comment['parent_id']
+            stack.extend((reply, index) for reply in reversed(comment['replies']))
+        forest._index()
+        return forest
+
+    def _index(self):
+        """Fills in subtree ends, roots and the child ranges once every comment is added."""
+        count = len(self.parent)
+        sizes = [1] * count
+        for index in range(count - 1, -1, -1):
+            parent = self.parent[index]
+            if parent >= 0:
+                sizes[parent] += sizes[index]
+        self.subtree_end = array('i', (index + size for index, size in enumerate(sizes)))
+
+        # Children grouped by parent, in document order (counting sort on parent)
+        counts = array('i', bytes(4 * (count + 1)))
+        for parent in self.parent:
+            if parent >= 0:
+                counts[parent + 1] += 1
+        for index in range(count):
+            counts[index + 1] += counts[index]
+        self.child_start = counts
+        self.children = array('i', bytes(4 * counts[count]))
+        filled = array('i', counts)
+        for index, parent in enumerate(self.parent):
+            if parent < 0:
+                self.roots.append(index)
+            else:
+                self.children[filled[parent]] = index
+                filled[parent] += 1
+        for strings in (self.text, self.thing_id, self.action_id, self.more_replies):
+            strings.freeze()
+
+    def __len__(self):
+        return len(self.parent)
+
+    def __iter__(self):
+        """Yields views of the top-level comments, like iterating the nested list."""
+        return (CommentView(self, index) for index in self.roots)
+
+    def __reversed__(self):
+        return (CommentView(self, index) for index in reversed(self.roots))
+
+    def child_range(self, index):
+        """Returns the (start, stop) positions of a comment's direct replies in `children`."""
+        return self.child_start[index], self.child_start[index + 1]
+
+    def replies(self, index):
+        """Returns the indices of a comment's direct replies, in document order."""
+        start, stop = self.child_range(index)
+        return self.children[start:stop]
+
+    def subtree(self, index):
+        """Returns the indices of a comment and all its replies, in document order."""
+        return range(index, self.subtree_end[index])
+
+    def author(self, index):
+        return self.authors[self.author_ids[index]]
+
+    def parent_id(self, index):
+        if index in self.parent_ids:
+            return self.parent_ids[index]
+        parent = self.parent[index]
+        return self.thing_id[parent] if parent >= 0 else None
+
+    def field(self, index, key):
+        """
+        Reads one field of a comment, by its key in the nested format.
+
+        'replies' returns views of the direct replies.
+        """
+        if key == 'text':
+            return self.text[index]
+        if key == 'author':
+            return self.author(index)
+        if key == 'depth':
+            return self.depth[index]
+        if key == 'thing_id':
+            return self.thing_id[index]
+        if key == 'parent_id':
+            return self.parent_id(index)
+        if key == 'replies':
+            return [CommentView(self, child) for child in self.replies(index)]
+        if key == 'action_id':
+            return self.action_id[index]
+        if key == 'more_replies':
+            return self.more_replies[index]
+        raise KeyError(key)
+
+    def comment(self, index):
+        """Returns a comment as a dictionary of the nested format, without its replies."""
+        return {
+            'thing_id': self.thing_id[index],
+            'depth': self.depth[index],
+            'parent_id': self.parent_id(index),
+            'author': self.author(index),
+            'text': self.text[index],
+            'action_id': self.action_id[index],
+            'more_replies': self.more_replies[index],
+            'replies': [],
+        }
+
+    def to_nested(self):
+        """
+        Converts the forest back to nested comment dictionaries.
+
+        Returns:
+            list: Top-level comments with nested `replies`, equal to the list
+                the forest was built from.
+        """
+        built = [None] * len(self)
+        roots = []
+        for index in range(len(self)):
+            comment = built[index] = self.comment(index)
+            parent = self.parent[index]
+            if parent >= 0:
+                built[parent]['replies'].append(comment)
+            else:
+                roots.append(comment)
+        return roots
+
+    def nbytes(self):
+        """Returns the approximate memory held by the arrays and string buffers, in bytes."""
+        arrays = (self.parent, self.depth, self.subtree_end, self.author_ids, self.roots,
+                  self.child_start, self.children)
+        return (sum(a.itemsize * len(a) for a in arrays)
+                + sum(s.nbytes() for s in (self.text, self.thing_id, self.action_id, self.more_replies))
+                + sum(sys.getsizeof(author) for author in self.authors))
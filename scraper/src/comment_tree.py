@@ -0,0 +1,157 @@
+TEXT_ID_SUFFIX = '-post-rtjson-content'
+MISSING_TEXT = "Comment Text Missing"
+
+
+def _is_comment_part(tag):
+    """
+    Matches the elements a comment dictionary is built from.
+
+    Args:
+        tag (bs4.Tag): Candidate element.
+
+    Returns:
+        bool: True for comments, comment bodies, action rows and "more replies" links.
+    """
+    name = tag.name
+    if name == 'shreddit-comment' or name == 'shreddit-comment-action-row':
+        return True
+    if name == 'div':
+        elem_id = tag.get('id')
+        return bool(elem_id) and elem_id.endswith(TEXT_ID_SUFFIX)
+    if name == 'a':
+        return tag.get('slot') == 'more-comments-permalink'
+    return False
+
+
+def _iter_comment_parts(root):
+    """
+    Yields the comment parts under root (and root itself) in document order.
+
+    Args:
+        root (bs4.Tag): A `shreddit-comment-tree`, a `shreddit-comment` or any container.
+    """
+    if _is_comment_part(root):
+        yield root
+    yield from root.find_all(_is_comment_part)
+
+
+def new_comment(thing_id, depth, parent_id, author):
+    """
+    Creates an empty comment dictionary in the scraper's output format.
+
+    Args:
+        thing_id (str): The comment's `thingid`.
+        depth (int): The comment's nesting level.
+        parent_id (str): The `thing_id` of the parent comment, or None for top-level comments.
+        author (str): The comment author's username.
+
+    Returns:
+        dict: A comment with no text, action id, "more replies" link or replies yet.
+    """
+    return {
+        'thing_id': thing_id,
+        'depth': depth,
+        'parent_id': parent_id,
+        'author': author,
+        'text': None,
+        'action_id': None,
+        'more_replies': None,
+        'replies': []
+    }
+
+
+def link_comment(comment, stack, roots, parent_id=None):
+    """
+    Attaches a comment to its parent using a stack of open ancestors.
+
+    Comments arrive in document order, so the parent of a comment is the closest
+    preceding comment with a smaller depth. Entries at the same or a deeper level
+    are closed before the new comment is pushed.
+
+    Args:
+        comment (dict): The comment to link, as returned by `new_comment`.
+        stack (list): (depth, comment) pairs for the currently open ancestors.
+        roots (list): Receives comments that have no parent on the stack.
+        parent_id (str, optional): parent_id given to root comments. Defaults to None.
+    """
+    depth = comment['depth']
+    while stack and stack[-1][0] >= depth:
+        stack.pop()
+    if stack:
+        parent = stack[-1][1]
+        comment['parent_id'] = parent['thing_id']
+        parent['replies'].append(comment)
+    else:
+        comment['parent_id'] = parent_id
+        roots.append(comment)
+    stack.append((depth, comment))
+
+
+def build_comment_tree(root, parent_id=None):
+    """
+    Builds nested comment dictionaries from shreddit markup in a single pass.
+
+    Every `shreddit-comment` under root is visited once, in document order, and
+    linked to its parent through its `depth` attribute. Comment bodies, action rows
+    and "more replies" links are attributed to the closest enclosing comment, so the
+    cost is linear in the size of the tree instead of quadratic in the number of
+    comments. No network requests are made; "more replies" links are left in the
+    `more_replies` field for the caller to expand.
+
+    Args:
+        root (bs4.Tag): A `shreddit-comment-tree`, a single `shreddit-comment` or any
+            element containing comments.
+        parent_id (str, optional): parent_id given to the top-level comments found. Defaults to None.
+
+    Returns:
+        list: Top-level comment dictionaries with their `replies` filled in.
+    """
+    roots = []
+    stack = []
+    by_elem = {}
+
+    for elem in _iter_comment_parts(root):
+        if elem.name == 'shreddit-comment':
+            comment = new_comment(
+                elem.get('thingid'),
+                int(elem.get('depth', 0)),
+                parent_id,
+                elem.get('author')
+            )
+            link_comment(comment, stack, roots, parent_id)
+            by_elem[id(elem)] = comment
+            continue
+
+        owner = by_elem.get(id(elem.find_parent('shreddit-comment')))
+        if owner is None:
+            continue
+        if elem.name == 'div':
+            if owner['text'] is None:
+                owner['text'] = elem.get_text(strip=True)
+        elif elem.name == 'a':
+            if owner['more_replies'] is None:
+                owner['more_replies'] = elem.get('href')
+        elif owner['action_id'] is None:
+            owner['action_id'] = elem.get('comment-id')
+
+    for comment in by_elem.values():
+        if comment['text'] is None:
+            comment['text'] = MISSING_TEXT
+    return roots
+
+
+def walk_comments(comments):
+    """
+    Iterates over a nested comment list depth-first without recursion.
+
+    Args:
+        comments (list): Comment dictionaries with nested `replies`.
+
+    Yields:
+        dict: Each comment, parents before their replies, in document order.
+    """
+    stack = list(reversed(comments))
+    while stack:
+        comment = stack.pop()
+        yield comment
+        stack.extend(reversed(comment['replies']))
@@ -0,0 +1,147 @@
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+from config.constants import (
+    MAX_WORKERS, CONCURRENCY_MIN, CONCURRENCY_MAX, CONCURRENCY_INCREASE, CONCURRENCY_DECREASE
+)
+
+
+class AdaptiveConcurrency:
+    """
+    An AIMD (additive increase, multiplicative decrease) limit on requests in flight.
+
+    Every healthy response widens the window by `increase / window`, i.e. by about
+    `increase` per window's worth of responses. A 429 or 5xx multiplies it by
+    `decrease`, at most once per congestion event: responses to requests that were
+    already in flight when the window was last cut do not cut it again. A
+    `Retry-After` pause holds back every new request until it expires.
+    """
+    def __init__(self, initial=MAX_WORKERS, minimum=CONCURRENCY_MIN, maximum=CONCURRENCY_MAX,
+                 increase=CONCURRENCY_INCREASE, decrease=CONCURRENCY_DECREASE,
+                 clock=time.monotonic, sleep=asyncio.sleep):
+        """
+        Args:
+            initial (int, optional): Starting window. Defaults to MAX_WORKERS.
+            minimum (int, optional): Smallest window. Defaults to CONCURRENCY_MIN.
+            maximum (int, optional): Largest window. Defaults to CONCURRENCY_MAX.
+            increase (float, optional): Window growth per window of healthy responses.
+                Defaults to CONCURRENCY_INCREASE.
+            decrease (float, optional): Factor applied on throttling. Defaults to CONCURRENCY_DECREASE.
+            clock (callable, optional): Returns the current time in seconds. Defaults to time.monotonic.
+            sleep (callable, optional): Coroutine function used to wait. Defaults to asyncio.sleep.
+        """
+        self.window = float(min(max(initial, minimum), maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.sleep = sleep
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = float('-inf')
+        self.throttled = 0
+        self.waiters = deque()
+
+    @property
+    def limit(self):
+        """The current window as a whole number of requests."""
+        return max(self.minimum, int(self.window))
+
+    async def acquire(self):
+        """
+        Waits for a request slot.
+
+        Returns:
+            float: The clock reading when the slot was granted, for `on_throttle`.
+        """
+        while True:
+            pause = self.paused_until - self.clock()
+            if pause > 0:
+                await self.sleep(pause)
+                continue
+
+            await self._take_slot()
+            if self.paused_until <= self.clock():
+                return self.clock()
+            # A Retry-After pause started while this request was queued.
+            self.release()
+
+    async def _take_slot(self):
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self.waiters.remove(waiter)
+            raise
+
+    def release(self):
+        """Returns a slot and hands free slots to waiting requests."""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.in_flight < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self):
+        """Widens the window after a healthy response."""
+        self.window = min(self.maximum, self.window + self.increase / self.window)
+        self._wake()
+
+    def on_throttle(self, started_at, retry_after=None):
+        """
+        Narrows the window after a 429 or 5xx response.
+
+        Args:
+            started_at (float): Value returned by `acquire` for the throttled request.
+            retry_after (float, optional): Seconds the server asked us to wait.
+        """
+        self.throttled += 1
+        now = self.clock()
+        if started_at >= self.last_decrease:
+            self.window = max(self.minimum, self.window * self.decrease)
+            self.last_decrease = now
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Holds a request slot for the duration of the block.
+
+        Yields:
+            float: The clock reading when the slot was granted.
+        """
+        started_at = await self.acquire()
+        try:
+            yield started_at
+        finally:
+            self.release()
+
+    def stats(self):
+        """
+        Returns the controller's current state.
+
+        Returns:
+            dict: window, in_flight, waiting and throttled counts.
+        """
+        return {
+            'window': round(self.window, 2),
+            'in_flight': self.in_flight,
+            'waiting': len(self.waiters),
+            'throttled': self.throttled,
+        }
@@ -0,0 +1,304 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from config.constants import LEASE_BUSY_TIMEOUT
+from config.paths import CRAWL_STATE_DB
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output TEXT,
+    error TEXT,
+    updated_at REAL,
+    lease_owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS urls_status ON urls (status);
+"""
+# Columns added after the first release, for databases created before them
+LEASE_COLUMNS = {'lease_owner': 'TEXT', 'lease_expires': 'REAL'}
+
+
+class CrawlState:
+    """
+    Persistent per-URL crawl status, stored in SQLite.
+
+    Each post URL is pending, in_flight, done or failed, with an attempt count
+    and, once done, the checkpoint file holding its data. A restarted crawl only
+    scrapes URLs that are not done; URLs left in flight by a crash go back to
+    pending.
+
+    Several worker processes can share one database as a work queue: each
+    takes batches of URLs with `lease`, which marks them in flight under the
+    worker's name until the lease expires. A worker keeps its leases alive
+    with `renew` while it scrapes; the URLs of a worker that died are leased
+    again by the others once its leases run out.
+    """
+    def __init__(self, path=CRAWL_STATE_DB, busy_timeout=LEASE_BUSY_TIMEOUT, journal_mode='WAL', clock=time.time):
+        """
+        Args:
+            path (str or Path, optional): SQLite database file. Defaults to CRAWL_STATE_DB.
+            busy_timeout (float, optional): Seconds to wait for another process's
+                write lock. Defaults to LEASE_BUSY_TIMEOUT.
+            journal_mode (str, optional): SQLite journal mode. WAL only works for
+                processes on one host; use 'DELETE' when workers on several
+                machines share the file. Defaults to 'WAL'.
+            clock (callable, optional): Returns the current time in seconds; lease
+                expiry times are compared across processes, so it must be wall-clock
+                time. Defaults to time.time.
+        """
+        self.clock = clock
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=busy_timeout)
+        self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(urls)")}
+        for name, kind in LEASE_COLUMNS.items():
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE urls ADD COLUMN {name} {kind}")
+        self.conn.commit()
+
+    def add_urls(self, urls):
+        """
+        Registers URLs as pending, leaving known URLs untouched.
+
+        Args:
+            urls (iterable): Post URLs.
+
+        Returns:
+            int: Number of URLs that were new.
+        """
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, updated_at) VALUES (?, ?)",
+                ((url, self.clock()) for url in urls)
+            )
+        return self.conn.total_changes - before
+
+    def recover(self):
+        """
+        Returns URLs left in flight by an interrupted run to pending.
+
+        URLs leased by a worker are left alone until the lease expires, so a
+        run never takes back the work of a live worker.
+
+        Returns:
+            int: Number of URLs recovered.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE urls SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = ? AND (lease_expires IS NULL OR lease_expires < ?)",
+                (PENDING, self.clock(), IN_FLIGHT, self.clock())
+            )
+        return cursor.rowcount
+
+    def lease(self, owner, count, duration, max_attempts):
+        """
+        Takes up to count URLs to scrape, for duration seconds.
+
+        Pending URLs, failed URLs with attempts to spare and URLs whose lease
+        has expired are leased in the order they were added, and marked in
+        flight under owner with the attempt counted. The write lock is taken
+        before reading, so two workers never lease the same URL.
+
+        Args:
+            owner (str): Name of the leasing worker.
+            count (int): Maximum number of URLs to lease.
+            duration (float): Seconds until the lease expires unless renewed.
+            max_attempts (int): Failed URLs with this many attempts are not leased.
+
+        Returns:
+            list: The leased URLs; empty when nothing is left to lease.
+        """
+        now = self.clock()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            urls = [url for (url,) in self.conn.execute(
+                "SELECT url FROM urls WHERE status = ? OR (status = ? AND attempts < ?) "
+                "OR (status = ? AND lease_expires < ?) ORDER BY rowid LIMIT ?",
+                (PENDING, FAILED, max_attempts, IN_FLIGHT, now, count)
+            )]
+            self.conn.executemany(
+                "UPDATE urls SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, "
+                "updated_at = ? WHERE url = ?",
+                ((IN_FLIGHT, owner, now + duration, now, url) for url in urls)
+            )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return urls
+
+    def renew(self, owner, duration):
+        """
+        Extends every lease held by owner to duration seconds from now.
+
+        Returns:
+            int: Number of URLs whose lease was extended.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE urls SET lease_expires = ? WHERE status = ? AND lease_owner = ?",
+                (self.clock() + duration, IN_FLIGHT, owner)
+            )
+        return cursor.rowcount
+
+    def release(self, owner):
+        """
+        Returns the URLs still leased by owner to pending, for a worker that stops early.
+
+        Returns:
+            int: Number of URLs released.
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE urls SET status = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE status = ? AND lease_owner = ?",
+                (PENDING, self.clock(), IN_FLIGHT, owner)
+            )
+        return cursor.rowcount
+
+    def leased_elsewhere(self, owner):
+        """
+        Finds when the live leases of other workers run out.
+
+        Returns:
+            float: Seconds until the last lease held by another worker expires,
+                or None when no other worker holds a live lease.
+        """
+        now = self.clock()
+        (expires,) = self.conn.execute(
+            "SELECT MAX(lease_expires) FROM urls WHERE status = ? AND lease_owner != ? AND lease_expires >= ?",
+            (IN_FLIGHT, owner, now)
+        ).fetchone()
+        return None if expires is None else expires - now
+
+    def requeue(self, urls):
+        """
+        Marks URLs pending again, whatever their status, with a fresh attempt count.
+
+        Args:
+            urls (iterable): Post URLs.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO urls (url, updated_at) VALUES (?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET status = 'pending', attempts = 0, error = NULL, "
+                "updated_at = excluded.updated_at",
+                ((url, self.clock()) for url in urls)
+            )
+
+    def reset(self):
+        """Forgets every URL, so the next crawl starts from scratch."""
+        with self.conn:
+            self.conn.execute("DELETE FROM urls")
+
+    def todo(self, urls, max_attempts):
+        """
+        Filters URLs down to the ones that still need scraping.
+
+        Args:
+            urls (list): Post URLs, in crawl order.
+            max_attempts (int): Failed URLs with this many attempts are not retried.
+
+        Returns:
+            list: URLs that are pending, or failed with attempts to spare, in the given order.
+        """
+        rows = self.conn.execute(
+            "SELECT url FROM urls WHERE status = ? OR (status = ? AND attempts < ?)",
+            (PENDING, FAILED, max_attempts)
+        )
+        wanted = {url for (url,) in rows}
+        return [url for url in urls if url in wanted]
+
+    def mark_in_flight(self, url):
+        """Records that a URL is being scraped and counts the attempt."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE urls SET status = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                (IN_FLIGHT, self.clock(), url)
+            )
+
+    def mark_done(self, url, output):
+        """
+        Records that a URL's data is safely on disk.
+
+        Args:
+            url (str): The post URL.
+            output (str or Path): The file holding the post.
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE urls SET status = ?, output = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE url = ?",
+                (DONE, str(output), self.clock(), url)
+            )
+
+    def mark_done_many(self, urls, output):
+        """
+        Records that several URLs' data is safely on disk, in one transaction.
+
+        Args:
+            urls (iterable): Post URLs.
+            output (str or Path): The file holding the posts.
+        """
+        now = self.clock()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE urls SET status = ?, output = ?, error = NULL, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE url = ?",
+                ((DONE, str(output), now, url) for url in urls)
+            )
+
+    def mark_failed(self, url, error):
+        """Records that scraping a URL failed."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE urls SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE url = ? AND status != ?",
+                (FAILED, str(error), self.clock(), url, DONE)
+            )
+
+    def attempts(self, url):
+        """Returns the number of attempts counted for a URL, 0 if it is unknown."""
+        row = self.conn.execute("SELECT attempts FROM urls WHERE url = ?", (url,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def counts(self):
+        """
+        Counts URLs by status.
+
+        Returns:
+            dict: Status name to number of URLs, for every status.
+        """
+        counts = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0}
+        for status, count in self.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def done_outputs(self):
+        """
+        Maps the output files of done URLs to the URLs they hold.
+
+        Returns:
+            dict: Output path to a set of post URLs.
+        """
+        outputs = {}
+        for url, output in self.conn.execute("SELECT url, output FROM urls WHERE status = ?", (DONE,)):
+            outputs.setdefault(output, set()).add(url)
+        return outputs
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,89 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+from config.paths import DEAD_LETTER_FILE
+
+
+class DeadLetterQueue:
+    """
+    Append-only record of requests that failed permanently.
+
+    Each failure is one JSON line holding the URL, endpoint, owning post id,
+    reason and attempt count. Lines are flushed as they are written, so the file
+    survives a crash and a later run can replay just the affected posts.
+    """
+    def __init__(self, path=DEAD_LETTER_FILE):
+        """
+        Args:
+            path (str or Path, optional): File to append to. Defaults to DEAD_LETTER_FILE.
+        """
+        self.path = Path(path)
+        self.count = 0
+
+    def add(self, url, endpoint, post_id, reason, attempts):
+        """
+        Records a permanently failed request.
+
+        Args:
+            url (str): The URL that failed.
+            endpoint (str): 'post', 'comments', 'more_replies' or 'feed'.
+            post_id (str): The post the request belongs to (e.g. 't3_abc123'), if known.
+            reason (str): Description of the last failure.
+            attempts (int): Number of attempts made.
+        """
+        entry = {
+            'url': url,
+            'endpoint': endpoint,
+            'post_id': post_id,
+            'reason': reason,
+            'attempts': attempts,
+            'failed_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.count += 1
+
+
+def load_dead_letters(path=DEAD_LETTER_FILE):
+    """
+    Reads the entries of a dead-letter file.
+
+    Args:
+        path (str or Path, optional): The file to read. Defaults to DEAD_LETTER_FILE.
+
+    Returns:
+        list: Entry dictionaries, in the order they were written. Empty if the file is missing.
+    """
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def take_dead_letters(path=DEAD_LETTER_FILE):
+    """
+    Loads a dead-letter file for replay and moves it aside.
+
+    The file is renamed with a timestamp suffix, so failures during the replay
+    start a fresh file instead of mixing with the entries being replayed.
+
+    Args:
+        path (str or Path, optional): The file to take. Defaults to DEAD_LETTER_FILE.
+
+    Returns:
+        list: The entries that were in the file.
+    """
+    path = Path(path)
+    entries = load_dead_letters(path)
+    if path.exists():
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path.rename(path.with_name(f"{path.stem}_replayed_{timestamp}{path.suffix}"))
+    return entries
@@ -0,0 +1,217 @@
+import asyncio
+import itertools
+from collections import Counter
+
+from config.constants import MORE_REPLIES_WORKERS, MORE_REPLIES_BUDGET, MORE_REPLIES_MAX_DEPTH
+from config.urls import REDDIT_BASE_URL
+from scraper.src import tracing
+from scraper.src.comment_tree import walk_comments
+from scraper.src.parse_pool import ParsePool
+from scraper.src.retry import FetchError
+from scraper.src.utils import extract_post_id
+
+# Why a "more replies" link was not followed
+DEPTH = 'depth'  # The replies would be deeper than max_depth
+BUDGET = 'budget'  # The post used up its request budget
+FAILED = 'failed'  # The page could not be fetched
+
+
+def more_replies_url(link):
+    """Returns the URL of the partial behind a "more replies" link."""
+    return f"{REDDIT_BASE_URL}{link}?render-mode=partial&is_lit_ssr=false"
+
+
+class MoreRepliesQueue:
+    """
+    Expands "more replies" links through one queue shared by the whole crawl.
+
+    A fixed number of workers fetch the pages, so reply expansion can never
+    take more than `workers` of the requests in flight. The queue is ordered by
+    how many pages the owning post has already requested, so a huge thread
+    waits behind posts that have asked for less. Each post may request at most
+    `budget` pages, replies deeper than `max_depth` are not fetched, and a link
+    seen twice is fetched once: within a post it is followed only the first
+    time, across posts concurrent requests share one fetch.
+
+    Links that are not followed are counted by reason and, with a report
+    writer, recorded as truncated subtrees.
+
+    Use it as an async context manager, which starts and stops the workers.
+    """
+    def __init__(self, client, parser=None, workers=MORE_REPLIES_WORKERS, budget=MORE_REPLIES_BUDGET,
+                 max_depth=MORE_REPLIES_MAX_DEPTH, report=None):
+        """
+        Args:
+            client (RedditClient): Client used to fetch the pages.
+            parser (ParsePool, optional): Parses the pages. Defaults to an inline ParsePool.
+            workers (int, optional): Pages fetched at once. Defaults to MORE_REPLIES_WORKERS.
+            budget (int, optional): Pages one post may request. Defaults to MORE_REPLIES_BUDGET.
+            max_depth (int, optional): Deepest reply depth fetched. Defaults to MORE_REPLIES_MAX_DEPTH.
+            report (JsonlWriter, optional): Receives one record per truncated subtree.
+        """
+        self.client = client
+        self.parser = parser or ParsePool(workers=0)
+        self.workers = workers
+        self.budget = budget
+        self.max_depth = max_depth
+        self.report = report
+        self.queue = asyncio.PriorityQueue()
+        self.in_flight = {}
+        self.waiters = {}  # Callers still waiting for each in-flight future
+        self.requested = {}
+        self.order = itertools.count()
+        self.tasks = []
+        self.fetched = 0
+        self.shared = 0
+        self.truncated = Counter()
+
+    async def __aenter__(self):
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def _worker(self):
+        while True:
+            _, _, link, post_id, future, requester = await self.queue.get()
+            if future.done():
+                # Every caller waiting for the page was cancelled
+                self.queue.task_done()
+                continue
+            try:
+                # Traced as part of the post that queued the page
+                with tracing.adopt(requester):
+                    html = await self.client.fetch(more_replies_url(link), 'more_replies', post_id)
+                self.fetched += 1
+            except FetchError as e:
+                print(f"Error fetching more replies: {e}")
+                html = None
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            finally:
+                self._forget(link, future)
+                self.queue.task_done()
+            if not future.done():
+                future.set_result(html)
+
+    def _forget(self, link, future):
+        # The link may already belong to a newer request if this one was abandoned
+        if self.in_flight.get(link) is future:
+            del self.in_flight[link]
+
+    async def _request(self, link, post_id):
+        """
+        Queues a page for a post, or joins the request already in flight for it.
+
+        Returns:
+            list: The replies on the page, parsed for this caller, or None if it failed.
+        """
+        future = self.in_flight.get(link)
+        with tracing.span("more_replies", link=link, shared=future is not None):
+            if future is not None:
+                self.shared += 1
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self.in_flight[link] = future
+                used = self.requested.get(post_id, 0)
+                self.requested[post_id] = used + 1
+                self.queue.put_nowait((used, next(self.order), link, post_id, future, tracing.current()))
+            self.waiters[future] = self.waiters.get(future, 0) + 1
+            try:
+                # Shielded so that cancelling this caller leaves the fetch to anyone who joined it
+                html = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if self.waiters[future] == 1 and not future.done():
+                    # Nobody is left to use the page; the worker skips it if not started yet
+                    future.cancel()
+                    self._forget(link, future)
+                raise
+            finally:
+                self.waiters[future] -= 1
+                if not self.waiters[future]:
+                    del self.waiters[future]
+            if html is None:
+                return None
+            # Every caller parses its own copy, so sharing a fetch never shares comment dicts
+            return await self.parser.parse_more_replies(html)
+
+    def _truncate(self, post_id, comment, reason):
+        self.truncated[reason] += 1
+        if self.report is not None:
+            self.report.write({
+                'post_id': post_id,
+                'thing_id': comment['thing_id'],
+                'depth': comment['depth'],
+                'more_replies': comment['more_replies'],
+                'reason': reason,
+            })
+
+    async def expand(self, comments, post_id=None):
+        """
+        Fetches the "more replies" pages linked from a comment tree and attaches them.
+
+        Pages are fetched a level at a time: links found in fetched replies are
+        followed in the next round, until none are left or the budget runs out.
+
+        Args:
+            comments (list): Comment tree, expanded in place.
+            post_id (str, optional): The post the tree belongs to. Defaults to the
+                post id in the first link.
+        """
+        pending = [comment for comment in walk_comments(comments) if comment['more_replies']]
+        if not pending:
+            return
+        post_id = post_id or extract_post_id(pending[0]['more_replies'])
+        seen = set()
+        level = 0
+        try:
+            while pending:
+                level += 1
+                batch = []
+                used = self.requested.get(post_id, 0)
+                for comment in pending:
+                    link = comment['more_replies']
+                    if link in seen:
+                        continue
+                    seen.add(link)
+                    if comment['depth'] + 1 > self.max_depth:
+                        self._truncate(post_id, comment, DEPTH)
+                    elif used + len(batch) >= self.budget:
+                        self._truncate(post_id, comment, BUDGET)
+                    else:
+                        batch.append(comment)
+
+                with tracing.span("more_replies level", level=level, pages=len(batch)):
+                    results = await asyncio.gather(*(
+                        self._request(comment['more_replies'], post_id) for comment in batch
+                    ))
+                pending = []
+                for comment, additional_replies in zip(batch, results):
+                    if additional_replies is None:
+                        self._truncate(post_id, comment, FAILED)
+                        continue
+                    for reply in additional_replies:
+                        reply['parent_id'] = comment['thing_id']
+                        reply['depth'] = comment['depth'] + 1
+                        comment['replies'].append(reply)
+                    pending.extend(c for c in walk_comments(additional_replies) if c['more_replies'])
+        finally:
+            self.requested.pop(post_id, None)
+
+    def stats(self):
+        """
+        Summarizes the expansion so far.
+
+        Returns:
+            dict: Pages fetched, requests shared with another post and truncated subtrees by reason.
+        """
+        return {'fetched': self.fetched, 'shared': self.shared, **{f'truncated_{k}': v for k, v in self.truncated.items()}}
@@ -0,0 +1,212 @@
+"""
+Columnar export of scraped posts to Parquet.
+
+Posts are written to a `posts` table and their comment trees, flattened, to a
+`comments` table joined back on post_id:
+
+    posts     post_id, title, author, created_timestamp, score, upvote_ratio,
+              comment_count, content, image_url
+    comments  post_id, thing_id, parent_id, depth, author, text
+
+The attribute strings of the scraper's output (score, upvote_ratio,
+comment_count, created_timestamp) become typed columns; values that don't
+parse are null. Rows are written in row groups as they are read, so memory
+stays bounded by the row group size, and each row group keeps min/max
+statistics that readers use to skip it:
+
+    pq.read_table('comments.parquet', columns=['post_id', 'text'],
+                  filters=[('depth', '=', 0)])
+
+Needs the optional pyarrow package.
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+
+from config.constants import PARQUET_ROW_GROUP_SIZE
+from scraper.src.comment_tree import walk_comments
+from scraper.src.sink import read_jsonl
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+def posts_schema():
+    return pa.schema([
+        ('post_id', pa.string()),
+        ('title', pa.string()),
+        ('author', pa.string()),
+        ('created_timestamp', pa.timestamp('us', tz='UTC')),
+        ('score', pa.int64()),
+        ('upvote_ratio', pa.float64()),
+        ('comment_count', pa.int64()),
+        ('content', pa.string()),
+        ('image_url', pa.string()),
+    ])
+
+
+def comments_schema():
+    return pa.schema([
+        ('post_id', pa.string()),
+        ('thing_id', pa.string()),
+        ('parent_id', pa.string()),
+        ('depth', pa.int32()),
+        ('author', pa.string()),
+        ('text', pa.string()),
+    ])
+
+
+def to_int(value):
+    """Converts an attribute value such as '934' to an int, or None if it isn't a number."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value):
+    """Converts an attribute value such as '0.97' to a float, or None if it isn't a number."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# Reddit's timestamps, with or without fractional seconds; %z takes '+0000' as well
+# as '+00:00', which datetime.fromisoformat only does from Python 3.11
+TIMESTAMP_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f%z', '%Y-%m-%dT%H:%M:%S%z')
+
+
+def to_timestamp(value):
+    """Parses an ISO 8601 timestamp such as '2024-12-05T17:03:20.508000+0000', or returns None."""
+    for timestamp_format in TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, timestamp_format)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def post_row(post):
+    """
+    Converts a post to a row of the posts table.
+
+    Args:
+        post (dict): A post in the scraper's output format.
+
+    Returns:
+        dict: Column name to typed value.
+    """
+    return {
+        'post_id': post.get('post_id'),
+        'title': post.get('title'),
+        'author': post.get('author'),
+        'created_timestamp': to_timestamp(post.get('created_timestamp')),
+        'score': to_int(post.get('score')),
+        'upvote_ratio': to_float(post.get('upvote_ratio')),
+        'comment_count': to_int(post.get('comment_count')),
+        'content': post.get('content'),
+        'image_url': post.get('image_url'),
+    }
+
+
+def comment_rows(post):
+    """
+    Flattens a post's comment tree into rows of the comments table.
+
+    Yields:
+        dict: One row per comment, parents before their replies.
+    """
+    post_id = post.get('post_id')
+    for comment in walk_comments(post.get('comments') or []):
+        yield {
+            'post_id': post_id,
+            'thing_id': comment.get('thing_id'),
+            'parent_id': comment.get('parent_id'),
+            'depth': to_int(comment.get('depth')),
+            'author': comment.get('author'),
+            'text': comment.get('text'),
+        }
+
+
+def iter_posts(path):
+    """
+    Reads the posts of a posts_data_*.json file or a checkpoint_*.jsonl file.
+
+    JSON Lines files are streamed one post at a time; a JSON array has to be
+    loaded whole.
+
+    Yields:
+        dict: Each post.
+    """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        yield from read_jsonl(path)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from json.load(f)
+
+
+class _TableWriter:
+    """Buffers rows and writes them to a Parquet file one row group at a time."""
+    def __init__(self, path, schema, row_group_size, compression):
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(str(path), schema, compression=compression)
+        self.rows = []
+        self.written = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema),
+                                    row_group_size=self.row_group_size)
+            self.written += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def export_parquet(posts, output_dir, row_group_size=PARQUET_ROW_GROUP_SIZE, compression='zstd'):
+    """
+    Writes posts to posts.parquet and their flattened comments to comments.parquet.
+
+    A post_id seen before is skipped, so overlapping inputs can be exported together.
+
+    Args:
+        posts (iterable): Posts in the scraper's output format.
+        output_dir (str or Path): Directory for the two files; created if missing.
+        row_group_size (int, optional): Rows per row group. Defaults to PARQUET_ROW_GROUP_SIZE.
+        compression (str, optional): Parquet compression codec. Defaults to 'zstd'.
+
+    Returns:
+        tuple: (posts written, comments written)
+    """
+    if pa is None:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    post_table = _TableWriter(output_dir / "posts.parquet", posts_schema(), row_group_size, compression)
+    comment_table = _TableWriter(output_dir / "comments.parquet", comments_schema(), row_group_size, compression)
+    seen = set()
+    try:
+        for post in posts:
+            if post.get('post_id') in seen:
+                continue
+            seen.add(post.get('post_id'))
+            post_table.add(post_row(post))
+            for row in comment_rows(post):
+                comment_table.add(row)
+    finally:
+        post_table.close()
+        comment_table.close()
+    return post_table.written, comment_table.written
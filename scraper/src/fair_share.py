@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import deque
+
+from config.constants import URL_QUEUE_SIZE
+from scraper.src.utils import extract_subreddit
+
+
+def parse_subreddit_weights(specs):
+    """
+    Parses NAME or NAME:WEIGHT subreddit arguments.
+
+    Args:
+        specs (list): Strings such as 'ChronicPain' or 'Fibromyalgia:2'.
+
+    Returns:
+        dict: Subreddit name to weight (1 when not given), in argument order.
+    """
+    weights = {}
+    for spec in specs:
+        name, _, weight = spec.partition(':')
+        weights[name] = float(weight) if weight else 1.0
+        if weights[name] <= 0:
+            raise ValueError(f"Weight of r/{name} must be positive, got {weight}")
+    return weights
+
+
+class FairShareQueue:
+    """
+    Post URLs of several subreddits, handed to the scrape workers by weighted fair share.
+
+    Every request of the crawl is charged to its subreddit (RedditClient calls
+    `charge`). A worker asking for the next post gets one from the subreddit
+    that has used the fewest requests per unit of weight among those with
+    posts waiting, so every busy subreddit gets its weighted share of the
+    global request budget and a small community finishes without queueing
+    behind a large one. A subreddit with nothing waiting leaves its share to
+    the others, and one that starts (again) late is levelled with the busy
+    ones instead of catching up on the requests it didn't make.
+
+    Each subreddit holds at most `maxsize` waiting URLs; `put` waits while its
+    subreddit's queue is full, which holds back only that subreddit's producer.
+    Once `close` is called and every queue is drained, `get` returns None.
+    """
+    def __init__(self, weights=None, maxsize=URL_QUEUE_SIZE, clock=time.monotonic):
+        """
+        Args:
+            weights (dict, optional): Subreddit name to weight; others weigh 1. Defaults to None.
+            maxsize (int, optional): Waiting URLs per subreddit. Defaults to URL_QUEUE_SIZE.
+            clock (callable, optional): Returns the current time in seconds. Defaults to time.monotonic.
+        """
+        self.weights = {name.lower(): weight for name, weight in (weights or {}).items()}
+        self.maxsize = maxsize
+        self.queues = {}
+        self.used = {}  # Requests per subreddit for scheduling, including levelling
+        self.advanced = {}  # Post pages charged when dispatched, not yet requested
+        self.requests = {}
+        self.dispatched = {}
+        self.finished = {}
+        self.clock = clock
+        self.started = clock()
+        self.closed = False
+        self.changed = asyncio.Condition()
+
+    def _key(self, url, subreddit=None):
+        return (subreddit or extract_subreddit(url) or '').lower()
+
+    def _share(self, key):
+        return self.used.get(key, 0) / self.weights.get(key, 1.0)
+
+    def charge(self, url, endpoint=None):
+        """
+        Charges a request to the subreddit of its URL.
+
+        Args:
+            url (str): URL of the request.
+            endpoint (str, optional): The request's endpoint; post pages were charged by `get`.
+        """
+        key = self._key(url)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        if endpoint == 'post' and self.advanced.get(key):
+            self.advanced[key] -= 1
+            return
+        self.used[key] = self.used.get(key, 0) + 1
+
+    def qsize(self):
+        """Returns the number of URLs waiting, across subreddits."""
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def put(self, url, subreddit=None):
+        """
+        Queues a post URL, waiting while its subreddit's queue is full.
+
+        Args:
+            url (str): Relative post URL.
+            subreddit (str, optional): Its subreddit. Defaults to the one in the URL.
+        """
+        key = self._key(url, subreddit)
+        async with self.changed:
+            await self.changed.wait_for(lambda: len(self.queues.get(key, ())) < self.maxsize)
+            queue = self.queues.setdefault(key, deque())
+            if not queue:
+                busy = [self._share(other) for other, waiting in self.queues.items() if waiting]
+                if busy:
+                    self.used[key] = max(self.used.get(key, 0), min(busy) * self.weights.get(key, 1.0))
+            queue.append(url)
+            self.changed.notify_all()
+
+    async def get(self):
+        """
+        Takes the next post URL, from the subreddit furthest below its share.
+
+        Returns:
+            str: A relative post URL, or None once the queue is closed and drained.
+        """
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.closed or any(self.queues.values()))
+            waiting = [key for key, queue in self.queues.items() if queue]
+            if not waiting:
+                return None
+            key = min(waiting, key=self._share)
+            # The post page is charged up front, so workers starting together spread out
+            self.used[key] = self.used.get(key, 0) + 1
+            self.advanced[key] = self.advanced.get(key, 0) + 1
+            self.dispatched[key] = self.dispatched.get(key, 0) + 1
+            url = self.queues[key].popleft()
+            self.changed.notify_all()
+            return url
+
+    def task_done(self, url):
+        """Records that the post at url has been scraped."""
+        self.finished[self._key(url)] = self.clock() - self.started
+
+    async def close(self):
+        """Lets `get` return None to every worker once the waiting URLs are gone."""
+        async with self.changed:
+            self.closed = True
+            self.changed.notify_all()
+
+    def stats(self):
+        """
+        Summarizes the crawl per subreddit.
+
+        Returns:
+            dict: Subreddit to posts dispatched, requests made and seconds from the
+                start until its last post was scraped.
+        """
+        return {
+            key or '?': {
+                'posts': self.dispatched.get(key, 0),
+                'requests': self.requests.get(key, 0),
+                'finished_after': self.finished.get(key, 0.0),
+            }
+            for key in sorted(set(self.requests) | set(self.dispatched))
+        }
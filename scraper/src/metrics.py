@@ -0,0 +1,327 @@
+"""
+Counters, histograms and gauges for the crawler, with Prometheus and JSON output.
+
+A `MetricsRegistry` holds named metrics with labels. `CrawlMetrics` defines the
+crawler's own metrics and the calls the client and parse pool make to record
+them. `start_metrics_server` serves the registry on a local HTTP endpoint:
+
+    /metrics       Prometheus text format
+    /metrics.json  the same values as JSON, with a time breakdown
+"""
+import bisect
+import json
+import math
+import time
+
+from aiohttp import web
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Seconds, from a fast parse to a slow request
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labelnames, labels):
+    missing = set(labelnames) - set(labels)
+    if missing or len(labels) != len(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_bound(bound):
+    """Bucket bound for JSON, which has no infinity."""
+    return '+Inf' if bound == math.inf else bound
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+    def summary(self):
+        return {','.join(key) or 'total': value for key, value in sorted(self.values.items())}
+
+
+class Gauge:
+    """A value read from a callable whenever the metrics are collected."""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def samples(self):
+        yield self.name, '', self.read()
+
+    def summary(self):
+        return self.read()
+
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets, per label set.
+
+    Percentiles in the summary are bucket upper bounds, so they are only as
+    precise as the buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        series = self.series.get(key)
+        if series is None:
+            # Per-bucket counts, the last one for values above every bound; then count and sum
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += 1
+        series[2] += value
+
+    def total(self):
+        """Returns the sum of every observation, across label sets."""
+        return sum(series[2] for series in self.series.values())
+
+    def count(self):
+        """Returns the number of observations, across label sets."""
+        return sum(series[1] for series in self.series.values())
+
+    def samples(self):
+        for key, (counts, count, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket', labels, cumulative
+            yield f'{self.name}_count', _format_labels(self.labelnames, key), count
+            yield f'{self.name}_sum', _format_labels(self.labelnames, key), total
+
+    def _quantile(self, counts, count, fraction):
+        rank = fraction * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+    def summary(self):
+        result = {}
+        for key, (counts, count, total) in sorted(self.series.items()):
+            result[','.join(key) or 'total'] = {
+                'count': count,
+                'sum': round(total, 6),
+                'mean': round(total / count, 6) if count else 0.0,
+                'p50_le': _format_bound(self._quantile(counts, count, 0.5)),
+                'p99_le': _format_bound(self._quantile(counts, count, 0.99)),
+            }
+        return result
+
+
+class MetricsRegistry:
+    """Named metrics, rendered together as Prometheus text or a JSON-ready dict."""
+    def __init__(self, clock=time.monotonic):
+        self.metrics = {}
+        self.clock = clock
+        self.started = clock()
+
+    def _add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self._add(Gauge(name, help_text, read))
+
+    def render_prometheus(self):
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition, ending with a newline.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """
+        Summarizes every metric.
+
+        Returns:
+            dict: elapsed_seconds, then one entry per metric: counters by label
+                values, histograms as count, sum, mean and bucketed p50/p99.
+        """
+        result = {'elapsed_seconds': round(self.clock() - self.started, 3)}
+        for name, metric in self.metrics.items():
+            result[name] = metric.summary()
+        return result
+
+
+class CrawlMetrics:
+    """
+    The crawler's metrics, recorded by RedditClient and ParsePool.
+
+    Request latency is the time from getting a request slot to having the
+    body; the rate limiter and slot waits before it are recorded separately,
+    so a crawl's time can be split between network, limiter and parsing.
+    """
+    def __init__(self, registry=None):
+        """
+        Args:
+            registry (MetricsRegistry, optional): Registry to add the metrics to.
+                Defaults to a new one.
+        """
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.requests = r.counter('scraper_requests_total', "Network requests by endpoint and HTTP status "
+                                  "('error' when no response arrived)", ('endpoint', 'status'))
+        self.request_seconds = r.histogram('scraper_request_seconds', "Request latency once a slot was held",
+                                           ('endpoint',))
+        self.response_bytes = r.counter('scraper_response_bytes_total', "Decompressed response bytes downloaded",
+                                        ('endpoint',))
+        self.throttled = r.counter('scraper_throttled_total', "429 and 5xx responses", ('endpoint', 'status'))
+        self.retries = r.counter('scraper_retries_total', "Requests retried after a failed attempt", ('endpoint',))
+        self.cache_hits = r.counter('scraper_cache_hits_total', "Pages served from the response cache",
+                                    ('endpoint',))
+        self.rate_limit_wait = r.histogram('scraper_rate_limit_wait_seconds', "Time spent waiting for a rate "
+                                           "limiter token", ('endpoint',))
+        self.slot_wait = r.histogram('scraper_slot_wait_seconds', "Time spent waiting for a concurrency "
+                                     "controller slot", ('endpoint',))
+        self.parse_seconds = r.histogram('scraper_parse_seconds', "Time spent parsing a document, including "
+                                         "waiting for a parser worker", ('method',))
+
+    def watch_controller(self, controller):
+        """Adds gauges for the concurrency controller's window, requests in flight and waiting requests."""
+        self.registry.gauge('scraper_concurrency_window', "Current concurrency window", lambda: controller.limit)
+        self.registry.gauge('scraper_requests_in_flight', "Requests holding a slot", lambda: controller.in_flight)
+        self.registry.gauge('scraper_requests_waiting', "Requests queued for a slot",
+                            lambda: len(controller.waiters))
+
+    def watch_queue(self, name, help_text, queue):
+        """Adds a gauge reading the size of an asyncio.Queue."""
+        self.registry.gauge(name, help_text, queue.qsize)
+
+    def observe_request(self, endpoint, status, seconds, body_bytes=0):
+        self.requests.inc(endpoint=endpoint, status='error' if status is None else status)
+        self.request_seconds.observe(seconds, endpoint=endpoint)
+        if body_bytes:
+            self.response_bytes.inc(body_bytes, endpoint=endpoint)
+        if status is not None and (status == 429 or status >= 500):
+            self.throttled.inc(endpoint=endpoint, status=status)
+
+    def time_split(self):
+        """
+        Splits the crawl's waiting between network, rate limiter, slots and parsing.
+
+        Waits are summed over concurrent requests, so they are compared per
+        request; parse time blocks the event loop (inline parsing) and is
+        compared with the elapsed time.
+
+        Returns:
+            dict: Mean seconds per request for each wait, the share of the run
+                spent parsing, and the largest of them as `bound_by`.
+        """
+        requests = self.request_seconds.count() or 1
+        elapsed = self.registry.clock() - self.registry.started or 1
+        split = {
+            'network_per_request': self.request_seconds.total() / requests,
+            'rate_limiter_per_request': self.rate_limit_wait.total() / requests,
+            'slot_wait_per_request': self.slot_wait.total() / requests,
+            'parse_share_of_run': self.parse_seconds.total() / elapsed,
+        }
+        if split['parse_share_of_run'] > 0.8:
+            bound_by = 'cpu'
+        else:
+            waits = {
+                'network': split['network_per_request'],
+                'rate_limiter': split['rate_limiter_per_request'],
+                'concurrency': split['slot_wait_per_request'],
+            }
+            bound_by = max(waits, key=waits.get)
+        result = {name: round(value, 6) for name, value in split.items()}
+        result['bound_by'] = bound_by
+        return result
+
+    def summary(self):
+        """Returns the registry summary with the time split added."""
+        return dict(self.registry.summary(), time_split=self.time_split())
+
+    def write_summary(self, path):
+        """Writes the summary to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+async def start_metrics_server(metrics, port, host='127.0.0.1'):
+    """
+    Serves the metrics on a local HTTP endpoint until the returned runner is cleaned up.
+
+    Args:
+        metrics (CrawlMetrics): Metrics to serve.
+        port (int): Port to listen on.
+        host (str, optional): Interface to bind. Defaults to '127.0.0.1'.
+
+    Returns:
+        web.AppRunner: Call `await runner.cleanup()` to stop the server.
+    """
+    async def prometheus(request):
+        return web.Response(body=metrics.registry.render_prometheus().encode('utf-8'),
+                            headers={'Content-Type': PROMETHEUS_CONTENT_TYPE})
+
+    async def summary(request):
+        return web.json_response(metrics.summary())
+
+    app = web.Application()
+    app.router.add_get('/metrics', prometheus)
+    app.router.add_get('/metrics.json', summary)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
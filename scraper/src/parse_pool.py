@@ -0,0 +1,104 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config.constants import PARSER_BACKEND, PARSE_WORKERS, PARSE_QUEUE_SIZE
+from scraper.src import tracing
+from scraper.src.parsers import get_parser
+
+
+def _parse(backend, method, args):
+    """Runs one parser method inside a worker process and returns plain data."""
+    return getattr(get_parser(backend), method)(*args)
+
+
+def _init_worker(backend):
+    """Builds the worker's parser once so the first document doesn't pay for it."""
+    get_parser(backend)
+
+
+class ParsePool:
+    """
+    Runs HTML parsing off the asyncio event loop.
+
+    With workers > 0, raw HTML is sent to a pool of worker processes that return
+    plain post and comment dicts, so a large comment page never stalls the
+    requests in flight. At most max_pending documents are queued for the pool;
+    further callers wait for a slot, which bounds the memory held by queued HTML.
+    With workers == 0, documents are parsed inline on the event loop.
+
+    Exposes the parser backend methods (see scraper.src.parsers) as coroutines.
+    """
+    def __init__(self, backend=PARSER_BACKEND, workers=PARSE_WORKERS, max_pending=PARSE_QUEUE_SIZE, metrics=None):
+        """
+        Args:
+            backend (str, optional): Parser backend name. Defaults to PARSER_BACKEND.
+            workers (int, optional): Number of worker processes, 0 to parse inline. Defaults to PARSE_WORKERS.
+            max_pending (int, optional): Maximum documents queued for the workers. Defaults to PARSE_QUEUE_SIZE.
+            metrics (CrawlMetrics, optional): Records parse times. Defaults to None (not recorded).
+        """
+        self.backend = backend
+        self.metrics = metrics
+        self.workers = workers
+        self.parser = get_parser(backend)
+        self.executor = None
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.parser.name,)
+            )
+        self.slots = asyncio.Semaphore(max(1, max_pending))
+
+    async def run(self, method, *args):
+        """
+        Calls a parser backend method, in a worker process when the pool has any.
+
+        Args:
+            method (str): Name of the backend method, e.g. 'parse_comments'.
+            *args: Arguments for the method.
+
+        Returns:
+            The method's result.
+        """
+        start = time.perf_counter()
+        with tracing.span(method):
+            if self.executor is None:
+                result = getattr(self.parser, method)(*args)
+            else:
+                async with self.slots:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self.executor, _parse, self.parser.name, method, args)
+        if self.metrics is not None:
+            self.metrics.parse_seconds.observe(time.perf_counter() - start, method=method)
+        return result
+
+    async def parse_post(self, html, post_id=None):
+        return await self.run('parse_post', html, post_id)
+
+    async def parse_post_page(self, html, post_id=None):
+        return await self.run('parse_post_page', html, post_id)
+
+    async def parse_comments(self, html):
+        return await self.run('parse_comments', html)
+
+    async def parse_more_replies(self, html):
+        return await self.run('parse_more_replies', html)
+
+    async def parse_feed(self, html):
+        return await self.run('parse_feed', html)
+
+    async def parse_feed_posts(self, html):
+        return await self.run('parse_feed_posts', html)
+
+    def close(self):
+        """Shuts the worker processes down."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
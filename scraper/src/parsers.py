@@ -0,0 +1,365 @@
+"""
+HTML parser backends for the scraper's extraction paths.
+
+Every backend turns the same pages into the same plain dictionaries:
+
+    parse_post(html, post_id)  -> post dict (without comments), or None
+    parse_post_page(html, post_id)
+                               -> (post dict or None, comments embedded in the
+                                   post page, or None if it has none usable)
+    parse_comments(html)       -> nested comments from a comment-tree partial
+    parse_more_replies(html)   -> nested comments from a "more replies" page
+    parse_feed(html)           -> (post links, next page URL)
+    parse_feed_posts(html)     -> (post summaries, next page URL)
+
+`html.parser` is pure Python and always available. `lxml` (BeautifulSoup on
+lxml) and `selectolax` (lexbor) are C-backed and much faster, but optional.
+"""
+import warnings
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+
+from config.constants import PARSER_BACKEND
+from config.urls import REDDIT_BASE_URL
+from scraper.src.comment_tree import (
+    MISSING_TEXT, TEXT_ID_SUFFIX, build_comment_tree, link_comment, new_comment
+)
+
+try:
+    import lxml  # noqa: F401
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+BASE_URL = REDDIT_BASE_URL
+FALLBACK_BACKEND = 'html.parser'
+
+
+def new_post(post_id, title, author, created_timestamp, score, upvote_ratio, content, image_url, comment_count):
+    """
+    Creates a post dictionary in the scraper's output format, with no comments yet.
+
+    Returns:
+        dict: The post, with keys in the order they are written to disk.
+    """
+    return {
+        'title': title,
+        'author': author,
+        'created_timestamp': created_timestamp,
+        'score': score,
+        'upvote_ratio': upvote_ratio,
+        'content': content,
+        'post_id': post_id,
+        'comments': [],
+        'image_url': image_url,
+        'comment_count': comment_count
+    }
+
+
+def embedded_comments(post, comments):
+    """
+    Decides whether a post page's own comment tree can stand in for the comment partial.
+
+    Args:
+        post (dict): The post parsed from the page, or None.
+        comments (list): Comments of the page's comment tree, or None if it has none.
+
+    Returns:
+        list: The comments, or None when the partial must be fetched: the page
+            has no comment tree, or an empty one while the post has comments.
+    """
+    if post is None or comments is None:
+        return None
+    if not comments and str(post['comment_count']) not in ('', '0'):
+        return None
+    return comments
+
+
+def new_feed_post(url, post_id, score, comment_count):
+    """
+    Creates the summary of a post as listed in a feed.
+
+    Returns:
+        dict: url (relative permalink), post_id, score and comment_count, with the
+            attribute values as strings, like the full post dictionary.
+    """
+    return {'url': url, 'post_id': post_id, 'score': score, 'comment_count': comment_count}
+
+
+class SoupParser:
+    """
+    BeautifulSoup-based backend.
+
+    Args:
+        features (str): The BeautifulSoup tree builder, 'html.parser' or 'lxml'.
+    """
+    def __init__(self, features='html.parser'):
+        self.name = features
+        self.features = features
+
+    def soup(self, html):
+        """Parses html into a BeautifulSoup document."""
+        return BeautifulSoup(html, self.features)
+
+    def parse_post(self, html, post_id=None):
+        return self._post(self.soup(html).find('shreddit-post'), post_id)
+
+    def parse_post_page(self, html, post_id=None):
+        soup = self.soup(html)
+        post = self._post(soup.find('shreddit-post'), post_id)
+        comment_tree = soup.find('shreddit-comment-tree')
+        comments = build_comment_tree(comment_tree) if comment_tree else None
+        return post, embedded_comments(post, comments)
+
+    def _post(self, post_container, post_id):
+        if not post_container:
+            return None
+
+        content_elem = post_container.find('div', {'slot': 'text-body'})
+        return new_post(
+            post_id,
+            post_container.get('post-title', ''),
+            post_container.get('author', ''),
+            post_container.get('created-timestamp', ''),
+            post_container.get('score', 0),
+            post_container.get('upvote-ratio', 0),
+            content_elem.get_text(strip=True) if content_elem else '',
+            post_container.get('content-href', ''),
+            post_container.get('comment-count', 0)
+        )
+
+    def parse_comments(self, html):
+        comment_tree = self.soup(html).find('shreddit-comment-tree')
+        if not comment_tree:
+            return []
+        return build_comment_tree(comment_tree)
+
+    def parse_more_replies(self, html):
+        comments = []
+        for tree in self.soup(html).find_all('shreddit-comment-tree'):
+            comments.extend(build_comment_tree(tree))
+        return comments
+
+    def parse_feed(self, html):
+        soup = self.soup(html)
+        links = [link['href'] for link in soup.select('shreddit-post a[slot="full-post-link"]')]
+
+        next_url = None
+        load_after_tag = soup.find('faceplate-partial', attrs={'slot': 'load-after'})
+        if load_after_tag and 'src' in load_after_tag.attrs:
+            next_url = f'{BASE_URL}{load_after_tag["src"]}'
+        return links, next_url
+
+    def parse_feed_posts(self, html):
+        soup = self.soup(html)
+        posts = []
+        for post in soup.find_all('shreddit-post'):
+            link = post.find('a', attrs={'slot': 'full-post-link'})
+            if link is None or not link.get('href'):
+                continue
+            posts.append(new_feed_post(link['href'], post.get('id'), post.get('score', 0), post.get('comment-count', 0)))
+
+        next_url = None
+        load_after_tag = soup.find('faceplate-partial', attrs={'slot': 'load-after'})
+        if load_after_tag and 'src' in load_after_tag.attrs:
+            next_url = f'{BASE_URL}{load_after_tag["src"]}'
+        return posts, next_url
+
+
+def _lexbor_attr(node, name, default):
+    """Reads an attribute the way BeautifulSoup does: valueless attributes are ''."""
+    attributes = node.attributes
+    if name not in attributes:
+        return default
+    value = attributes[name]
+    return '' if value is None else value
+
+
+def _lexbor_text(node):
+    """Equivalent of BeautifulSoup's get_text(strip=True)."""
+    return node.text(deep=True, separator='', strip=True)
+
+
+COMMENT_PARTS_SELECTOR = (
+    f'shreddit-comment, shreddit-comment-action-row, '
+    f'div[id$="{TEXT_ID_SUFFIX}"], a[slot="more-comments-permalink"]'
+)
+
+
+def _lexbor_owner(node):
+    """Returns the closest `shreddit-comment` ancestor of node, or None."""
+    parent = node.parent
+    while parent is not None and parent.tag != 'shreddit-comment':
+        parent = parent.parent
+    return parent
+
+
+def build_lexbor_comment_tree(root, parent_id=None):
+    """
+    selectolax counterpart of `comment_tree.build_comment_tree`.
+
+    Args:
+        root (LexborNode): A `shreddit-comment-tree` node.
+        parent_id (str, optional): parent_id given to top-level comments. Defaults to None.
+
+    Returns:
+        list: Top-level comment dictionaries with their `replies` filled in.
+    """
+    roots = []
+    stack = []
+    by_node = {}
+
+    for node in root.css(COMMENT_PARTS_SELECTOR):
+        tag = node.tag
+        if tag == 'shreddit-comment':
+            comment = new_comment(
+                _lexbor_attr(node, 'thingid', None),
+                int(_lexbor_attr(node, 'depth', 0) or 0),
+                parent_id,
+                _lexbor_attr(node, 'author', None)
+            )
+            link_comment(comment, stack, roots, parent_id)
+            by_node[node.mem_id] = comment
+            continue
+
+        owner_node = _lexbor_owner(node)
+        owner = by_node.get(owner_node.mem_id) if owner_node is not None else None
+        if owner is None:
+            continue
+        if tag == 'div':
+            if owner['text'] is None:
+                owner['text'] = _lexbor_text(node)
+        elif tag == 'a':
+            if owner['more_replies'] is None:
+                owner['more_replies'] = _lexbor_attr(node, 'href', None)
+        elif owner['action_id'] is None:
+            owner['action_id'] = _lexbor_attr(node, 'comment-id', None)
+
+    for comment in by_node.values():
+        if comment['text'] is None:
+            comment['text'] = MISSING_TEXT
+    return roots
+
+
+class SelectolaxParser:
+    """selectolax (lexbor) backend."""
+    name = 'selectolax'
+
+    def parse_post(self, html, post_id=None):
+        return self._post(LexborHTMLParser(html).css_first('shreddit-post'), post_id)
+
+    def parse_post_page(self, html, post_id=None):
+        tree = LexborHTMLParser(html)
+        post = self._post(tree.css_first('shreddit-post'), post_id)
+        comment_tree = tree.css_first('shreddit-comment-tree')
+        comments = build_lexbor_comment_tree(comment_tree) if comment_tree is not None else None
+        return post, embedded_comments(post, comments)
+
+    def _post(self, post_container, post_id):
+        if post_container is None:
+            return None
+
+        content_elem = post_container.css_first('div[slot="text-body"]')
+        return new_post(
+            post_id,
+            _lexbor_attr(post_container, 'post-title', ''),
+            _lexbor_attr(post_container, 'author', ''),
+            _lexbor_attr(post_container, 'created-timestamp', ''),
+            _lexbor_attr(post_container, 'score', 0),
+            _lexbor_attr(post_container, 'upvote-ratio', 0),
+            _lexbor_text(content_elem) if content_elem is not None else '',
+            _lexbor_attr(post_container, 'content-href', ''),
+            _lexbor_attr(post_container, 'comment-count', 0)
+        )
+
+    def parse_comments(self, html):
+        comment_tree = LexborHTMLParser(html).css_first('shreddit-comment-tree')
+        if comment_tree is None:
+            return []
+        return build_lexbor_comment_tree(comment_tree)
+
+    def parse_more_replies(self, html):
+        comments = []
+        for tree in LexborHTMLParser(html).css('shreddit-comment-tree'):
+            comments.extend(build_lexbor_comment_tree(tree))
+        return comments
+
+    def parse_feed(self, html):
+        tree = LexborHTMLParser(html)
+        links = [
+            _lexbor_attr(link, 'href', None)
+            for link in tree.css('shreddit-post a[slot="full-post-link"]')
+        ]
+
+        next_url = None
+        load_after_tag = tree.css_first('faceplate-partial[slot="load-after"]')
+        if load_after_tag is not None and 'src' in load_after_tag.attributes:
+            next_url = f'{BASE_URL}{_lexbor_attr(load_after_tag, "src", "")}'
+        return links, next_url
+
+    def parse_feed_posts(self, html):
+        tree = LexborHTMLParser(html)
+        posts = []
+        for post in tree.css('shreddit-post'):
+            link = post.css_first('a[slot="full-post-link"]')
+            href = _lexbor_attr(link, 'href', None) if link is not None else None
+            if not href:
+                continue
+            posts.append(new_feed_post(
+                href,
+                _lexbor_attr(post, 'id', None),
+                _lexbor_attr(post, 'score', 0),
+                _lexbor_attr(post, 'comment-count', 0)
+            ))
+
+        next_url = None
+        load_after_tag = tree.css_first('faceplate-partial[slot="load-after"]')
+        if load_after_tag is not None and 'src' in load_after_tag.attributes:
+            next_url = f'{BASE_URL}{_lexbor_attr(load_after_tag, "src", "")}'
+        return posts, next_url
+
+
+def available_backends():
+    """
+    Lists the parser backends whose dependencies are installed.
+
+    Returns:
+        list: Backend names usable with `get_parser`.
+    """
+    backends = ['html.parser']
+    if lxml is not None:
+        backends.append('lxml')
+    if LexborHTMLParser is not None:
+        backends.append('selectolax')
+    return backends
+
+
+@lru_cache(maxsize=None)
+def get_parser(name=PARSER_BACKEND):
+    """
+    Returns the parser backend called name.
+
+    Falls back to the pure-Python 'html.parser' backend when the requested
+    backend's dependency is not installed.
+
+    Args:
+        name (str, optional): 'html.parser', 'lxml' or 'selectolax'. Defaults to PARSER_BACKEND.
+
+    Returns:
+        SoupParser or SelectolaxParser: The parser backend.
+    """
+    if name not in ('html.parser', 'lxml', 'selectolax'):
+        raise ValueError(f"Unknown parser backend {name!r}, expected one of html.parser, lxml, selectolax")
+    if name not in available_backends():
+        # Warned once per backend name, as the result is cached
+        warnings.warn(f"Parser backend {name!r} is not installed, falling back to {FALLBACK_BACKEND!r}",
+                      RuntimeWarning, stacklevel=2)
+        name = FALLBACK_BACKEND
+    if name == 'selectolax':
+        return SelectolaxParser()
+    return SoupParser(name)
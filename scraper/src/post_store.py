@@ -0,0 +1,301 @@
+"""
+SQLite storage for scraped posts and comments, with a full-text index.
+
+Posts and their flattened comments go into `posts` and `comments` tables
+(numeric score, upvote_ratio and comment_count, as in the Parquet export).
+FTS5 indexes post titles and content and comment text, kept in sync by
+triggers, so term searches, author lookups and whole threads are answered
+from indexes instead of scanning the JSON dump:
+
+    store = PostStore()
+    store.ingest(iter_posts('posts_data_20250101_120000.json'))
+    store.search_comments('nerve block', limit=10)
+    store.by_author('some_user')
+    store.thread('t3_1h7dyt8')
+
+Ingest is incremental: each post's content hash is stored with it, and a post
+that is ingested again unchanged is skipped, while a changed one (say from a
+refresh) replaces the stored post and comments.
+"""
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+from config.constants import POST_STORE_BATCH_SIZE
+from config.paths import POST_STORE_DB
+from scraper.src.comment_tree import walk_comments
+from scraper.src.export import to_float, to_int
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_id TEXT PRIMARY KEY,
+    title TEXT,
+    author TEXT,
+    created_timestamp TEXT,
+    score INTEGER,
+    upvote_ratio REAL,
+    comment_count INTEGER,
+    content TEXT,
+    image_url TEXT,
+    digest TEXT
+);
+CREATE INDEX IF NOT EXISTS posts_author ON posts (author);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    post_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    thing_id TEXT,
+    parent_id TEXT,
+    depth INTEGER,
+    author TEXT,
+    text TEXT,
+    action_id TEXT,
+    more_replies TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_post ON comments (post_id, position);
+CREATE INDEX IF NOT EXISTS comments_author ON comments (author);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, content, content='posts', content_rowid='rowid', tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+    text, content='comments', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+    INSERT INTO posts_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments BEGIN
+    INSERT INTO comments_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+POST_COLUMNS = ('post_id', 'title', 'author', 'created_timestamp', 'score', 'upvote_ratio',
+                'comment_count', 'content', 'image_url')
+
+
+def post_digest(post):
+    """Returns a hash of a post's full content, comments included."""
+    encoded = json.dumps(post, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def fts_query(text):
+    """
+    Turns plain search text into an FTS5 query matching every word.
+
+    Each word is quoted, so punctuation and FTS5 operators in the text are
+    searched for literally instead of failing to parse. Blank text gives an
+    empty query, which matches nothing.
+    """
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class PostStore:
+    """
+    Posts and comments in SQLite, searchable by term, author and thread.
+
+    Args:
+        path (str or Path, optional): Database file. Defaults to POST_STORE_DB.
+    """
+    def __init__(self, path=POST_STORE_DB):
+        self.path = Path(path)
+        if str(path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def ingest(self, posts, batch_size=POST_STORE_BATCH_SIZE, progress=None):
+        """
+        Adds posts and their comments, one transaction per batch.
+
+        Args:
+            posts (iterable): Posts in the scraper's output format.
+            batch_size (int, optional): Posts per transaction. Defaults to POST_STORE_BATCH_SIZE.
+            progress (tqdm, optional): Progress bar advanced per post. Defaults to None.
+
+        Returns:
+            dict: Numbers of posts added, updated and unchanged, and comments written.
+        """
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'comments': 0}
+        batch = []
+        for post in posts:
+            batch.append(post)
+            if len(batch) >= batch_size:
+                self._ingest_batch(batch, stats)
+                if progress is not None:
+                    progress.update(len(batch))
+                batch = []
+        if batch:
+            self._ingest_batch(batch, stats)
+            if progress is not None:
+                progress.update(len(batch))
+        return stats
+
+    def _ingest_batch(self, posts, stats):
+        # The last copy of a post in the batch wins
+        by_id = {post['post_id']: post for post in posts if post.get('post_id')}
+        digests = {post_id: post_digest(post) for post_id, post in by_id.items()}
+        placeholders = ','.join('?' * len(by_id))
+        stored = dict(self.conn.execute(
+            f"SELECT post_id, digest FROM posts WHERE post_id IN ({placeholders})", list(by_id)
+        ).fetchall())
+        changed = [post_id for post_id in by_id if stored.get(post_id) != digests[post_id]]
+        stats['unchanged'] += len(by_id) - len(changed)
+        if not changed:
+            return
+
+        with self.conn:
+            replaced = [(post_id,) for post_id in changed if post_id in stored]
+            self.conn.executemany("DELETE FROM comments WHERE post_id = ?", replaced)
+            self.conn.executemany(
+                f"INSERT INTO posts ({', '.join(POST_COLUMNS)}, digest) VALUES ({', '.join('?' * 10)}) "
+                "ON CONFLICT (post_id) DO UPDATE SET "
+                + ', '.join(f"{column} = excluded.{column}" for column in POST_COLUMNS[1:] + ('digest',)),
+                (self._post_row(by_id[post_id], digests[post_id]) for post_id in changed)
+            )
+            rows = [row for post_id in changed for row in self._comment_rows(by_id[post_id])]
+            self.conn.executemany(
+                "INSERT INTO comments (post_id, position, thing_id, parent_id, depth, author, text, "
+                "action_id, more_replies) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        stats['updated'] += len(replaced)
+        stats['added'] += len(changed) - len(replaced)
+        stats['comments'] += len(rows)
+
+    @staticmethod
+    def _post_row(post, digest):
+        return (
+            post['post_id'], post.get('title'), post.get('author'), post.get('created_timestamp'),
+            to_int(post.get('score')), to_float(post.get('upvote_ratio')), to_int(post.get('comment_count')),
+            post.get('content'), post.get('image_url'), digest,
+        )
+
+    @staticmethod
+    def _comment_rows(post):
+        for position, comment in enumerate(walk_comments(post.get('comments') or [])):
+            yield (
+                post['post_id'], position, comment.get('thing_id'), comment.get('parent_id'),
+                to_int(comment.get('depth')), comment.get('author'), comment.get('text'),
+                comment.get('action_id'), comment.get('more_replies'),
+            )
+
+    def search_posts(self, text, limit=20, raw=False):
+        """
+        Finds posts whose title or content match every word of text, best matches first.
+
+        Args:
+            text (str): Words to search for; stemmed, so 'injection' also finds 'injections'.
+            limit (int, optional): Maximum results. Defaults to 20.
+            raw (bool, optional): Treat text as an FTS5 query (phrases, OR, NEAR, prefix*).
+                Defaults to False.
+
+        Returns:
+            list: Dicts with post_id, title, author, score and a highlighted snippet.
+        """
+        query = text if raw else fts_query(text)
+        if not query.strip():
+            return []
+        rows = self.conn.execute(
+            "SELECT p.post_id, p.title, p.author, p.score, "
+            "snippet(posts_fts, -1, '[', ']', '...', 16) AS snippet "
+            "FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid "
+            "WHERE posts_fts MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def search_comments(self, text, limit=20, raw=False):
+        """
+        Finds comments whose text matches every word of text, best matches first.
+
+        Args:
+            text (str): Words to search for; stemmed like `search_posts`.
+            limit (int, optional): Maximum results. Defaults to 20.
+            raw (bool, optional): Treat text as an FTS5 query. Defaults to False.
+
+        Returns:
+            list: Dicts with post_id, thing_id, author, depth and a highlighted snippet.
+        """
+        query = text if raw else fts_query(text)
+        if not query.strip():
+            return []
+        rows = self.conn.execute(
+            "SELECT c.post_id, c.thing_id, c.author, c.depth, "
+            "snippet(comments_fts, 0, '[', ']', '...', 16) AS snippet "
+            "FROM comments_fts JOIN comments c ON c.id = comments_fts.rowid "
+            "WHERE comments_fts MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def by_author(self, author, limit=100):
+        """
+        Lists an author's posts and comments.
+
+        Returns:
+            dict: 'posts' (post_id, title, score) and 'comments' (post_id,
+                thing_id, text), up to limit of each.
+        """
+        posts = self.conn.execute(
+            "SELECT post_id, title, score FROM posts WHERE author = ? LIMIT ?", (author, limit)
+        )
+        comments = self.conn.execute(
+            "SELECT post_id, thing_id, text FROM comments WHERE author = ? LIMIT ?", (author, limit)
+        )
+        return {'posts': [dict(row) for row in posts], 'comments': [dict(row) for row in comments]}
+
+    def thread(self, post_id):
+        """
+        Fetches a post with its comment tree, in the scraper's output format.
+
+        Score, upvote_ratio and comment_count come back as numbers.
+
+        Returns:
+            dict: The post with nested comments, or None if it isn't stored.
+        """
+        row = self.conn.execute(
+            f"SELECT {', '.join(POST_COLUMNS)} FROM posts WHERE post_id = ?", (post_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        post = dict(row)
+        post['comments'] = []
+        by_thing_id = {}
+        for comment in self.conn.execute(
+            "SELECT thing_id, depth, parent_id, author, text, action_id, more_replies "
+            "FROM comments WHERE post_id = ? ORDER BY position", (post_id,)
+        ):
+            comment = dict(comment, replies=[])
+            parent = by_thing_id.get(comment['parent_id']) if comment['parent_id'] is not None else None
+            (parent['replies'] if parent is not None else post['comments']).append(comment)
+            # A comment without an id can't be anyone's parent
+            if comment['thing_id'] is not None:
+                by_thing_id[comment['thing_id']] = comment
+        return post
+
+    def counts(self):
+        """Returns the number of stored posts and comments."""
+        (posts,) = self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()
+        (comments,) = self.conn.execute("SELECT COUNT(*) FROM comments").fetchone()
+        return {'posts': posts, 'comments': comments}
+
+    def close(self):
+        self.conn.close()
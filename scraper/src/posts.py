@@ -1,8 +1,15 @@
-import requests
+import asyncio
 import json
 import time
-from bs4 import BeautifulSoup
+import aiohttp
 from tqdm import tqdm
+from config.constants import PARSER_BACKEND
+from config.urls import get_discovery_feed_urls, valid_time_filters
+from scraper.src.client import RedditClient
+from scraper.src.concurrency import AdaptiveConcurrency
+from scraper.src.parse_pool import ParsePool
+from scraper.src.retry import FetchError, RetryPolicy
+from scraper.src.session import RateLimiter
 
 def load_existing_urls(filename='reddit_posts.json'):
     """
@@ -30,83 +37,205 @@ def save_urls(urls, filename='reddit_posts.json'):
     with open(filename, 'w') as f:
         json.dump(list(urls), f, indent=2)
 
+class FeedDiscovery:
+    """
+    Collects new post URLs from several subreddit feeds at once.
+
+    Every feed is paginated by its own task; all of them share one set of known
+    URLs and one budget of new posts, and their requests go through the shared
+    client, so the rate limiter and concurrency controller pace discovery
+    together with any scraping running alongside it.
+    """
+    def __init__(self, client, num_posts, known_urls=(), parser=None, on_new_url=None):
+        """
+        Args:
+            client (RedditClient): Client used to fetch feed pages.
+            num_posts (int): Number of new posts to find across all feeds.
+            known_urls (iterable, optional): URLs that don't count as new.
+            parser (ParsePool, optional): Parses feed pages. Defaults to an inline ParsePool.
+            on_new_url (callable, optional): Coroutine function awaited with each new URL
+                as soon as it is found; discovery of that feed waits for it.
+        """
+        self.client = client
+        self.num_posts = num_posts
+        self.known_urls = set(known_urls)
+        self.parser = parser or ParsePool(workers=0)
+        self.on_new_url = on_new_url
+        self.new_urls = []
+        self.urls_processed = 0
+        self.pages = 0
+        self.progress = None
+
+    @property
+    def done(self):
+        return len(self.new_urls) >= self.num_posts
+
+    async def walk(self, name, feed_url):
+        """
+        Paginates one feed until it ends, fails or the budget is used up.
+
+        Args:
+            name (str): Feed name for messages, e.g. 'top/WEEK'.
+            feed_url (str): URL of the feed's first page.
+
+        Returns:
+            int: Number of new posts this feed contributed.
+        """
+        found = 0
+        current_url = feed_url
+        while current_url and not self.done:
+            try:
+                html_content = await self.client.fetch(current_url, 'feed')
+            except FetchError as e:
+                print(f"Stopping {name} feed early: {e}")
+                break
+            self.pages += 1
+            post_links, current_url = await self.parser.parse_feed(html_content)
+
+            for url in post_links:
+                self.urls_processed += 1
+                if url in self.known_urls or self.done:
+                    continue
+                self.known_urls.add(url)
+                self.new_urls.append(url)
+                found += 1
+                if self.progress is not None:
+                    self.progress.update(1)
+                if self.on_new_url is not None:
+                    await self.on_new_url(url)
+
+            if current_url is None and not self.done:
+                print(f"Reached the end of the {name} feed")
+        return found
+
+    async def run(self, feeds, desc="Discovering Posts"):
+        """
+        Walks all feeds concurrently.
+
+        Args:
+            feeds (list): (feed name, first-page URL) tuples.
+            desc (str, optional): Progress bar label. Defaults to "Discovering Posts".
+
+        Returns:
+            dict: Feed name to number of new posts it contributed.
+        """
+        with tqdm(total=self.num_posts, desc=desc) as self.progress:
+            found = await asyncio.gather(*(self.walk(name, url) for name, url in feeds))
+        self.progress = None
+        return dict(zip((name for name, _ in feeds), found))
+
+
+async def discover_posts(
+    client,
+    subreddit="ChronicPain",
+    num_posts=3000,
+    time_filters=valid_time_filters,
+    feed_length=25,
+    filename='data/reddit_posts.json',
+    parser=None,
+    on_new_url=None
+):
+    """
+    Collects new post URLs from every sort order and time filter of one or more subreddits.
+
+    Several subreddits are discovered concurrently through the shared client,
+    each with its own budget of num_posts. URLs already in the file are
+    skipped. The file is read once before and written once after discovery,
+    with the old and new URLs together.
+
+    Args:
+        client (RedditClient): Client used to fetch feed pages.
+        subreddit (str or list): Name of the subreddit, or a list of names.
+        num_posts (int): Number of new posts to find per subreddit.
+        time_filters (iterable): Time filters for the time-filtered sorts (e.g. 'top').
+        feed_length (int): Posts per feed page.
+        filename (str): Name of the file to save URLs to.
+        parser (ParsePool, optional): Parses feed pages. Defaults to an inline ParsePool.
+        on_new_url (callable, optional): Coroutine function awaited with each new URL
+            as soon as it is found.
+    Returns:
+        List of new links added in this run, in discovery order
+    """
+    subreddits = [subreddit] if isinstance(subreddit, str) else list(subreddit)
+    existing_urls = load_existing_urls(filename)
+    discoveries = {}
+    feeds = {}
+    for name in subreddits:
+        feeds[name] = get_discovery_feed_urls(name, time_filters=time_filters, feed_length=feed_length)
+        discoveries[name] = FeedDiscovery(client, num_posts, existing_urls, parser=parser, on_new_url=on_new_url)
+
+    start_time = time.time()
+    for name in subreddits:
+        print(f"Discovering posts in r/{name} from {len(feeds[name])} feeds")
+    try:
+        found = await asyncio.gather(*(
+            discoveries[name].run(feeds[name], desc=f"Discovering r/{name}") for name in subreddits
+        ))
+    finally:
+        # Save all URLs (both existing and new), even if discovery was interrupted
+        known_urls = set(existing_urls)
+        for discovery in discoveries.values():
+            known_urls |= discovery.known_urls
+        save_urls(known_urls, filename)
+
+    new_urls = []
+    for name, feed_counts in zip(subreddits, found):
+        discovery = discoveries[name]
+        for feed, count in feed_counts.items():
+            print(f"Found {count} posts in r/{name} using {feed} feed")
+        print(f"Processed {discovery.urls_processed} URLs from {discovery.pages} pages of r/{name} - "
+              f"{len(discovery.new_urls)} new")
+        new_urls.extend(discovery.new_urls)
+    elapsed_time = time.time() - start_time
+    print(f"Found {len(new_urls)} new posts in {elapsed_time:.2f} seconds")
+
+    return new_urls
+
+
 def get_reddit_posts(
     initial_url,
     num_posts=20,
     session=None,
     delay=2,
-    filename='data/reddit_posts.json'
+    filename='data/reddit_posts.json',
+    parser=None,
+    on_new_url=None
 ):
     """
-    Fetches Reddit posts from a community, handling pagination
-    and session cookies. Saves unique URLs to a file.
+    Fetches new post URLs from one feed, following its pagination, and saves
+    them together with the URLs already in the file.
+
+    Kept for callers of the old synchronous API; `discover_posts` walks every
+    feed of a subreddit concurrently through a shared client.
 
     Args:
         initial_url (str): The starting URL for the Reddit feed.
         num_posts (int): The number of posts to fetch (total).
-        session (requests.Session): Session object to persist cookies.
+        session: Unused; requests go through aiohttp now.
         delay (float): Time to wait between requests in seconds.
         filename (str): Name of the file to save URLs to.
+        parser (optional): Parser backend from scraper.src.parsers. Defaults to the configured backend.
+        on_new_url (callable, optional): Called with each new URL as soon as it is found.
     Returns:
         List of new links added in this run
     """
-    # Load existing URLs
-    existing_urls = load_existing_urls(filename)
-    new_urls = set()
-    
-    current_url = initial_url
-    posts_fetched = 0
-    urls_processed = 0
-    if session is None:
-        session = requests.Session()
+    async def notify(url):
+        on_new_url(url)
 
-    start_time = time.time()
-
-    with tqdm(total=num_posts, desc="Fetching Reddit Posts") as progress_bar:
-        while posts_fetched < num_posts and current_url:
+    async def run():
+        existing_urls = load_existing_urls(filename)
+        rate_limiter = RateLimiter(1, delay, endpoint_limits={}, burst=1)
+        async with aiohttp.ClientSession() as aiohttp_session:
+            client = RedditClient(aiohttp_session, rate_limiter, AdaptiveConcurrency(), RetryPolicy())
+            discovery = FeedDiscovery(
+                client, num_posts, existing_urls,
+                parser=ParsePool(parser.name if parser is not None else PARSER_BACKEND, workers=0),
+                on_new_url=notify if on_new_url is not None else None
+            )
             try:
-                response = session.get(current_url)
-                response.raise_for_status()
-                html_content = response.text
-
-                soup = BeautifulSoup(html_content, 'html.parser')
-                post_links = soup.select('shreddit-post a[slot="full-post-link"]')
-
-                # Extract post URLs
-                for link in post_links:
-                    url = link['href']
-                    urls_processed += 1
-                    if url not in existing_urls:
-                        print(f"New post found: {url}")
-                        new_urls.add(url)
-                        existing_urls.add(url)
-                        posts_fetched += 1
-                        progress_bar.update(1)
-
-                # If we haven't reached the limit, check for next page URL
-                if posts_fetched < num_posts:
-                    load_after_tag = soup.find('faceplate-partial', attrs={'slot': 'load-after'})
-                    if load_after_tag and 'src' in load_after_tag.attrs:
-                        current_url = f'https://www.reddit.com{load_after_tag["src"]}'
-                    else:
-                        current_url = None
-                        print("Stopping early: Could not find a 'next page' URL.")
-
-                # Add delay before next request
-                if current_url:  # Only delay if there's going to be another request
-                    time.sleep(delay)
-
-            except requests.RequestException as e:
-                print(f"Error during request: {e}")
-                print("Stopping early due to request error.")
-                break
-
-        # Save all URLs (both existing and new)
-        save_urls(existing_urls, filename)
-        
-        end_time = time.time()
-        elapsed_time = end_time - start_time
-        print(f"Found {len(new_urls)} new posts in {elapsed_time:.2f} seconds")
-        print(f"Processed {urls_processed} URLs - {len(new_urls)} new")
+                await discovery.run([('feed', initial_url)], desc="Fetching Reddit Posts")
+            finally:
+                save_urls(discovery.known_urls, filename)
+        return discovery.new_urls
 
-        return list(new_urls)
\ No newline at end of file
+    return asyncio.run(run())
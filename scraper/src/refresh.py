@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+
+from scraper.src.comment_tree import walk_comments
+from scraper.src.retry import FetchError
+from scraper.src.sink import read_jsonl
+from scraper.src.utils import extract_post_id
+
+# Outcomes of refreshing one post
+UNCHANGED = 'unchanged'  # Feed listing matched the snapshot; no request made
+METADATA = 'metadata'  # Post page re-fetched, comment count unchanged
+COMMENTS = 'comments'  # Comment count changed; comment tree re-fetched and merged
+FAILED = 'failed'  # Post page could not be fetched; snapshot kept
+
+
+def load_snapshot(path):
+    """
+    Loads the posts of an earlier scrape.
+
+    Args:
+        path (str or Path): A posts_data_*.json file or a checkpoint_*.jsonl file.
+
+    Returns:
+        list: Post dictionaries, one per post_id (the last copy wins).
+    """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        posts = list(read_jsonl(path))
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            posts = json.load(f)
+    return list({post['post_id']: post for post in posts}.values())
+
+
+def merge_comment_trees(stored, fresh):
+    """
+    Merges a freshly scraped comment tree into the stored one, by thing_id.
+
+    The fresh tree wins for every comment it contains, so edited text and new
+    replies come from it. Stored comments missing from it (deleted, or hidden
+    behind a "more replies" page that failed) are kept under their parent, or
+    as top-level comments when the parent is gone too.
+
+    Args:
+        stored (list): Comment tree from the snapshot.
+        fresh (list): Comment tree just scraped.
+
+    Returns:
+        tuple: (merged comment tree, number of stored comments carried over)
+    """
+    by_id = {comment['thing_id']: comment for comment in walk_comments(fresh)}
+    merged = list(fresh)
+    kept = 0
+    # Preorder, so a carried-over parent is in place before its replies
+    for comment in walk_comments(stored):
+        if comment['thing_id'] in by_id:
+            continue
+        copy = dict(comment, replies=[])
+        parent = by_id.get(comment['parent_id'])
+        if parent is not None:
+            parent['replies'].append(copy)
+        else:
+            merged.append(copy)
+        by_id[comment['thing_id']] = copy
+        kept += 1
+    return merged, kept
+
+
+async def collect_feed_posts(client, parser, feeds, wanted_ids, max_pages):
+    """
+    Reads post summaries (score and comment count) from subreddit feeds.
+
+    Feeds are walked one after another and stop early once every wanted post
+    has been listed, so a refresh costs one request per feed page rather than
+    one per post.
+
+    Args:
+        client (RedditClient): Client used to fetch feed pages.
+        parser (ParsePool): Parses feed pages.
+        feeds (list): (feed name, first-page URL) tuples.
+        wanted_ids (set): Post ids to look for.
+        max_pages (int): Pages read per feed at most.
+
+    Returns:
+        dict: Post id to the summary from the first feed listing it.
+    """
+    summaries = {}
+    for name, url in feeds:
+        pages = 0
+        while url and pages < max_pages and not wanted_ids <= summaries.keys():
+            try:
+                html = await client.fetch(url, 'feed')
+            except FetchError as e:
+                print(f"Stopping {name} feed early: {e}")
+                break
+            pages += 1
+            posts, url = await parser.parse_feed_posts(html)
+            for post in posts:
+                post_id = post['post_id'] or extract_post_id(post['url'])
+                summaries.setdefault(post_id, post)
+    return summaries
+
+
+def same_count(a, b):
+    """Compares two comment counts that may be strings or ints."""
+    return str(a) == str(b)
@@ -0,0 +1,93 @@
+import asyncio
+import random
+
+import aiohttp
+
+from config.constants import RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+
+# Decisions returned by RetryPolicy.classify
+RETRY = 'retry'  # Transient failure: back off and try again
+THROTTLE = 'throttle'  # Server overloaded (429/5xx): slow everything down, then try again
+FAIL = 'fail'  # Permanent failure: retrying cannot help
+
+
+class FetchError(Exception):
+    """
+    Raised when a request fails permanently or runs out of attempts.
+
+    Attributes:
+        url (str): The URL that failed.
+        endpoint (str): The endpoint the URL belongs to.
+        reason (str): Description of the last failure.
+        attempts (int): Number of attempts made.
+        permanent (bool): Whether the failure was not worth retrying, e.g. a 404,
+            as opposed to one that ran out of attempts.
+    """
+    def __init__(self, url, endpoint, reason, attempts, permanent=False):
+        super().__init__(f"{reason} after {attempts} attempt(s): {url}")
+        self.url = url
+        self.endpoint = endpoint
+        self.reason = reason
+        self.attempts = attempts
+        self.permanent = permanent
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed request is retried.
+
+    Attempts are capped at max_attempts. Delays grow exponentially from
+    base_delay up to max_delay, with full jitter so that requests that failed
+    together don't retry together.
+    """
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY,
+                 max_delay=RETRY_MAX_DELAY, rng=random):
+        """
+        Args:
+            max_attempts (int, optional): Attempts per request, including the first. Defaults to RETRY_MAX_ATTEMPTS.
+            base_delay (float, optional): Backoff ceiling after the first failure. Defaults to RETRY_BASE_DELAY.
+            max_delay (float, optional): Largest backoff ceiling. Defaults to RETRY_MAX_DELAY.
+            rng (random.Random, optional): Source of jitter. Defaults to the random module.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng
+
+    def classify(self, status=None, error=None):
+        """
+        Classifies a failed attempt.
+
+        Args:
+            status (int, optional): HTTP status of the response, if one was received.
+            error (Exception, optional): Exception raised by the attempt, if any.
+
+        Returns:
+            str: RETRY, THROTTLE or FAIL.
+        """
+        if status is not None:
+            if status == 429 or status >= 500:
+                return THROTTLE
+            if status == 408:
+                return RETRY
+            return FAIL
+        if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+            return RETRY
+        return FAIL
+
+    def backoff(self, attempt):
+        """
+        Returns how long to wait before the next attempt.
+
+        Args:
+            attempt (int): Number of the attempt that just failed, starting at 1.
+
+        Returns:
+            float: Seconds to wait, drawn uniformly from [0, min(max_delay, base_delay * 2**(attempt - 1))].
+        """
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return self.rng.uniform(0, ceiling)
+
+    def should_retry(self, decision, attempt):
+        """Tells whether another attempt is allowed after a failure."""
+        return decision != FAIL and attempt < self.max_attempts
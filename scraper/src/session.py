@@ -1,55 +1,114 @@
 import time
 import asyncio
-from config.constants import REQUEST_DELAY
+from config.constants import RATE_LIMIT_BURST, ENDPOINT_RATE_LIMITS
+
+
+class TokenBucket:
+    """
+    A continuously refilling token bucket.
+
+    Tokens accrue at `rate` per second up to `capacity`. Taking a token never
+    blocks: the balance may go negative, and the caller is told how long to wait
+    before its token becomes valid. Waiters are therefore served in the order
+    they reserved, and the long-run rate never exceeds `rate`.
+    """
+    def __init__(self, rate, capacity, now):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum number of tokens the bucket can hold (the burst size).
+            now (float): Current clock reading.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def reserve(self, now):
+        """
+        Takes a token.
+
+        Args:
+            now (float): Current clock reading.
+
+        Returns:
+            float: Seconds to wait before using the token (0 if it is available now).
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def refund(self):
+        """Gives back a reserved token that will not be used, e.g. when its waiter was cancelled."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
 
 class RateLimiter:
     """
     A rate limiter class that controls the frequency of requests.
 
-    This class uses a token bucket algorithm to limit the number of requests
-    made within a certain time frame. It ensures that the scraper does not
-    exceed the allowed request rate, preventing potential issues with the
-    target website.
+    Requests draw from a global token bucket refilled continuously at
+    max_tokens per refresh_rate seconds, and, when an endpoint is given, from
+    that endpoint's own bucket as well (post pages, comment partials and
+    more-replies pages are limited separately). The global token is reserved
+    once the endpoint's token is due, so a request held back by its endpoint
+    doesn't take global capacity from requests that could go sooner. Waiting
+    happens outside any lock, so concurrent requests are spaced out instead
+    of serialized.
     """
-    def __init__(self, max_tokens, refresh_rate):
+    def __init__(self, max_tokens, refresh_rate, endpoint_limits=None, burst=RATE_LIMIT_BURST,
+                 clock=time.monotonic, sleep=asyncio.sleep):
         """
         Initializes the RateLimiter with a maximum number of tokens and a refresh rate.
 
         Args:
-            max_tokens (int): The maximum number of tokens the bucket can hold.
-            refresh_rate (float): The time in seconds it takes to refill the bucket to max_tokens.
+            max_tokens (int): The number of requests allowed per refresh_rate seconds.
+            refresh_rate (float): The time window in seconds for max_tokens.
+            endpoint_limits (dict, optional): Requests per refresh_rate seconds for each endpoint.
+                Defaults to ENDPOINT_RATE_LIMITS.
+            burst (int, optional): Requests allowed back-to-back before the steady rate applies.
+                Defaults to RATE_LIMIT_BURST.
+            clock (callable, optional): Returns the current time in seconds. Defaults to time.monotonic.
+            sleep (callable, optional): Coroutine function used to wait. Defaults to asyncio.sleep.
         """
-        self.max_tokens = max_tokens
-        self.tokens = max_tokens
-        self.refresh_rate = refresh_rate
-        self.last_refresh = time.time()
-        self.lock = asyncio.Lock()
+        if endpoint_limits is None:
+            endpoint_limits = ENDPOINT_RATE_LIMITS
+        self.clock = clock
+        self.sleep = sleep
+        now = clock()
+        self.bucket = TokenBucket(max_tokens / refresh_rate, min(burst, max_tokens), now)
+        self.endpoints = {
+            endpoint: TokenBucket(limit / refresh_rate, min(burst, limit), now)
+            for endpoint, limit in endpoint_limits.items()
+        }
 
-    async def acquire(self):
+    async def acquire(self, endpoint=None):
         """
         Acquires a token from the bucket, waiting if necessary.
 
-        This method will block until a token is available, ensuring that the
-        request rate is within the defined limits. It also adds a delay after
-        acquiring a token to further control the request rate.
-        """
-        async with self.lock:
-            current_time = time.time()
-            time_passed = current_time - self.last_refresh
-            
-            # Refresh tokens if enough time has passed
-            if time_passed >= self.refresh_rate:
-                self.tokens = self.max_tokens
-                self.last_refresh = current_time
-            
-            # Wait if no tokens available
-            while self.tokens <= 0:
-                await asyncio.sleep(0.1)
-                current_time = time.time()
-                time_passed = current_time - self.last_refresh
-                if time_passed >= self.refresh_rate:
-                    self.tokens = self.max_tokens
-                    self.last_refresh = current_time
-            
-            self.tokens -= 1
-            await asyncio.sleep(REQUEST_DELAY)  # Add delay between requests
+        Args:
+            endpoint (str, optional): 'post', 'comments' or 'more_replies' to also
+                draw from that endpoint's bucket.
+
+        Returns:
+            float: The time spent waiting, in seconds.
+        """
+        buckets = [self.bucket]
+        if endpoint in self.endpoints:
+            buckets.insert(0, self.endpoints[endpoint])
+        waited = 0.0
+        for i, bucket in enumerate(buckets):
+            delay = bucket.reserve(self.clock())
+            if delay > 0:
+                try:
+                    await self.sleep(delay)
+                except asyncio.CancelledError:
+                    # The request will not be made; its tokens go to the next callers
+                    for reserved in buckets[:i + 1]:
+                        reserved.refund()
+                    raise
+            waited += delay
+        return waited
@@ -0,0 +1,135 @@
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from config.constants import CHECKPOINT_FLUSH_INTERVAL
+
+_CLOSE = object()
+
+
+class JsonlWriter:
+    """
+    Appends records to a JSON Lines file from a background thread.
+
+    `write` only enqueues the record; serialization, writing and syncing happen
+    on the writer thread, so the event loop never waits on disk. Each record is
+    written exactly once, and the file is flushed and fsynced at most every
+    flush_interval seconds and on close. `synced` counts the records known to be
+    on disk; records are written in order, so those are the first `synced` ones.
+    """
+    def __init__(self, path, flush_interval=CHECKPOINT_FLUSH_INTERVAL, fsync=True):
+        """
+        Args:
+            path (str or Path): File to append to; created if missing.
+            flush_interval (float, optional): Seconds between flushes. Defaults to CHECKPOINT_FLUSH_INTERVAL.
+            fsync (bool, optional): Whether flushes also fsync the file. Defaults to True.
+        """
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.written = 0
+        self.synced = 0
+        self.error = None
+        self.queue = queue.Queue()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name=f"jsonl-writer:{self.path.name}", daemon=True)
+        self.thread.start()
+
+    def write(self, record):
+        """
+        Queues a record to be appended as one JSON line.
+
+        Args:
+            record (dict): JSON-serializable record. It must not be modified afterwards.
+        """
+        self.queue.put(record)
+
+    def _sync(self, f):
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        self.synced = self.written
+
+    def _run(self):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                next_flush = time.monotonic() + self.flush_interval
+                dirty = False
+                while True:
+                    timeout = max(0.0, next_flush - time.monotonic()) if dirty else None
+                    try:
+                        record = self.queue.get(timeout=timeout)
+                    except queue.Empty:
+                        record = None
+                    if record is _CLOSE:
+                        break
+                    if record is not None:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        self.written += 1
+                        if not dirty:
+                            next_flush = time.monotonic() + self.flush_interval
+                        dirty = True
+                    if dirty and time.monotonic() >= next_flush:
+                        self._sync(f)
+                        dirty = False
+                self._sync(f)
+        except (IOError, TypeError, ValueError) as e:
+            self.error = e
+            print(f"Error writing to {self.path}: {e}")
+
+    def close(self):
+        """Writes everything still queued, syncs the file and stops the thread."""
+        self.queue.put(_CLOSE)
+        self.thread.join()
+
+
+def read_jsonl(path):
+    """
+    Reads the records of a JSON Lines file.
+
+    A truncated last line, left by a crash mid-write, is skipped.
+
+    Args:
+        path (str or Path): The file to read.
+
+    Yields:
+        dict: Each record in file order.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping malformed line in {path}")
+
+
+def write_json_array(path, records, indent=2):
+    """
+    Writes records as one JSON array, one record at a time.
+
+    The output is the same as `json.dump(list(records), f, indent=indent)`, but
+    only one record is held in memory at a time.
+
+    Args:
+        path (str or Path): The file to write.
+        records (iterable): JSON-serializable records.
+        indent (int, optional): Indentation, as for json.dump. Defaults to 2.
+
+    Returns:
+        int: Number of records written.
+    """
+    pad = ' ' * indent
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(',\n' if count else '[\n')
+            f.write(pad + json.dumps(record, indent=indent, ensure_ascii=False).replace('\n', '\n' + pad))
+            count += 1
+        f.write('\n]' if count else '[]')
+    return count
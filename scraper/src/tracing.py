@@ -0,0 +1,232 @@
+"""
+Opt-in span tracing, written as a Chrome trace (chrome://tracing, ui.perfetto.dev).
+
+Code marks the work it does with `span`:
+
+    with tracing.span('parse_comments'):
+        ...
+
+Spans nest through a context variable, so they follow asyncio tasks: a span
+opened in a coroutine is the parent of spans opened by the tasks it gathers.
+Each post traced with `post_span` gets its own process row in the viewer,
+named after the post; spans running side by side within a post go on separate
+lanes (threads) of that row. Spans outside any post go to the "crawler" row.
+
+Until `start_tracing` is called, `span` returns a shared no-op context
+manager, so instrumented code costs next to nothing when tracing is off.
+"""
+import contextvars
+import heapq
+import json
+import time
+from contextlib import nullcontext
+
+_current = contextvars.ContextVar('trace_span', default=None)
+_tracer = None
+_NO_SPAN = nullcontext()
+
+
+class _Group:
+    """A process row of the trace, handing out lanes that are not in use."""
+    __slots__ = ('pid', 'free_lanes', 'next_lane')
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.free_lanes = []
+        self.next_lane = 0
+
+    def take_lane(self):
+        if self.free_lanes:
+            return heapq.heappop(self.free_lanes)
+        self.next_lane += 1
+        return self.next_lane - 1
+
+    def release_lane(self, lane):
+        heapq.heappush(self.free_lanes, lane)
+
+
+class Span:
+    """
+    One traced piece of work; use it as a context manager.
+
+    A span runs on its parent's lane unless another child already occupies
+    it, in which case it takes a free lane of the same group, so spans on a
+    lane always nest properly.
+    """
+    __slots__ = ('tracer', 'name', 'args', 'group', 'parent', 'lane', 'own_lane', 'child_on_lane',
+                 'start', 'token')
+
+    def __init__(self, tracer, name, args, parent=None, group=None):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.parent = parent
+        self.group = group or (parent.group if parent is not None else tracer.crawler)
+        self.child_on_lane = False
+        self.token = None
+        if parent is not None and group is None and not parent.child_on_lane:
+            parent.child_on_lane = True
+            self.lane = parent.lane
+            self.own_lane = False
+        else:
+            self.lane = self.group.take_lane()
+            self.own_lane = True
+        self.start = tracer.clock()
+
+    def finish(self, end=None):
+        """Writes the span to the trace and frees its lane."""
+        self.tracer.write_span(self, self.start, self.tracer.clock() if end is None else end)
+        if self.own_lane:
+            self.group.release_lane(self.lane)
+        else:
+            self.parent.child_on_lane = False
+
+    def __enter__(self):
+        self.token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current.reset(self.token)
+        self.finish()
+
+
+class Tracer:
+    """
+    Writes spans to a trace file in the Chrome JSON array format as they finish.
+
+    Args:
+        path (str or Path): Trace file to write.
+        clock (callable, optional): Returns the time in seconds. Defaults to time.perf_counter.
+    """
+    def __init__(self, path, clock=time.perf_counter):
+        self.path = path
+        self.clock = clock
+        self.origin = clock()
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write('[\n')
+        self.next_pid = 0
+        self.spans = 0
+        self.crawler = self.new_group("crawler")
+
+    def new_group(self, label):
+        """Starts a new process row called label."""
+        group = _Group(self.next_pid)
+        self.next_pid += 1
+        self._write({'name': 'process_name', 'ph': 'M', 'pid': group.pid, 'args': {'name': label}})
+        return group
+
+    def write_span(self, span, start, end):
+        self.spans += 1
+        # Rounded ends, so spans that meet in time also meet in the file
+        ts = round((start - self.origin) * 1e6, 1)
+        self._write({
+            'name': span.name,
+            'cat': 'scraper',
+            'ph': 'X',
+            'ts': ts,
+            'dur': round(round((end - self.origin) * 1e6, 1) - ts, 1),
+            'pid': span.group.pid,
+            'tid': span.lane,
+            'args': span.args,
+        })
+
+    def _write(self, event):
+        self.file.write(json.dumps(event, default=str))
+        self.file.write(',\n')
+
+    def close(self):
+        """Ends the JSON array and closes the file."""
+        self.file.write(json.dumps({'name': 'trace_end', 'ph': 'i', 's': 'g', 'pid': 0, 'tid': 0,
+                                    'ts': round((self.clock() - self.origin) * 1e6, 1)}))
+        self.file.write('\n]\n')
+        self.file.close()
+
+
+def start_tracing(path):
+    """
+    Starts recording spans to a trace file.
+
+    Returns:
+        Tracer: The active tracer.
+    """
+    global _tracer
+    _tracer = Tracer(path)
+    return _tracer
+
+
+def stop_tracing():
+    """Stops recording and closes the trace file, if tracing was started."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def span(name, **args):
+    """
+    Returns a context manager tracing the block as a span of the current span.
+
+    Args:
+        name (str): Span name shown in the viewer.
+        **args: Values shown with the span.
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return Span(_tracer, name, args, _current.get())
+
+
+def post_span(post_id, name='scrape_post', **args):
+    """
+    Returns a context manager tracing the block as the root span of a post's row.
+
+    Args:
+        post_id (str): The post, used as the row label.
+        name (str, optional): Span name. Defaults to 'scrape_post'.
+        **args: Values shown with the span.
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return Span(_tracer, name, dict(args, post_id=post_id), group=_tracer.new_group(post_id or "post"))
+
+
+def record(name, start, end, **args):
+    """
+    Adds an already finished span, timed by the caller with time.perf_counter, to the current span.
+
+    Use it for waits measured around code that can't be wrapped in a block.
+    """
+    if _tracer is None:
+        return
+    finished = Span(_tracer, name, args, _current.get())
+    finished.start = start
+    finished.finish(end)
+
+
+def current():
+    """Returns the current span, or None, to hand over to another task with `adopt`."""
+    return _current.get()
+
+
+def adopt(parent):
+    """
+    Returns a context manager making parent the current span for the block.
+
+    Lets a long-lived worker task trace work it does on behalf of another task.
+    """
+    if parent is None:
+        return _NO_SPAN
+    return _Adopted(parent)
+
+
+class _Adopted:
+    __slots__ = ('parent', 'token')
+
+    def __init__(self, parent):
+        self.parent = parent
+
+    def __enter__(self):
+        self.token = _current.set(self.parent)
+        return self.parent
+
+    def __exit__(self, *exc_info):
+        _current.reset(self.token)
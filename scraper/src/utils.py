@@ -1,3 +1,6 @@
+from urllib.parse import unquote
+
+
 def extract_post_id(url):
     """
     Extracts the post ID from a Reddit URL.
@@ -17,6 +20,29 @@ def extract_post_id(url):
         return None
     
 
+def extract_subreddit(url):
+    """
+    Extracts the subreddit name from a Reddit URL.
+
+    Works for permalinks (/r/NAME/...), comment-tree partials
+    (/svc/shreddit/comments/r/NAME/...) and feed URLs (name=NAME in the query).
+
+    Args:
+        url (str): Absolute or relative Reddit URL.
+
+    Returns:
+        str: The subreddit name as written in the URL, or None if there is none.
+    """
+    path, _, query = url.partition('?')
+    if '/r/' in path:
+        return path.split('/r/', 1)[1].split('/', 1)[0] or None
+    for param in query.split('&'):
+        key, _, value = param.partition('=')
+        if key == 'name' and value:
+            return unquote(value)
+    return None
+
+
 def print_comment_tree(comments, level=0, max_comments=3, current_count=0):
     """
     Recursively prints a tree-like structure of comments, with a limit on the number of comments displayed.
@@ -25,7 +51,8 @@ def print_comment_tree(comments, level=0, max_comments=3, current_count=0):
     It limits the number of comments displayed at each level to avoid overwhelming the output.
 
     Args:
-        comments (list): A list of comment dictionaries, each containing 'author', 'text', and 'replies'.
+        comments (list or CommentForest): A list of comment dictionaries, each containing 'author', 'text',
+            and 'replies', or a CommentForest of them.
         level (int, optional): The current level of indentation (0 for top-level comments). Defaults to 0.
         max_comments (int, optional): The maximum number of comments to display at each level. Defaults to 3.
         current_count (int, optional): The current count of comments displayed at the current level. Defaults to 0.
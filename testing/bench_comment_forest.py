@@ -0,0 +1,70 @@
+"""
+Compares the memory and traversal time of nested comment dictionaries with
+CommentForest, on threads scaled up from the `examples/` fixtures.
+
+Usage:
+    python testing/bench_comment_forest.py [--copies 10 100 400]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.comment_forest import CommentForest
+from scraper.src.comment_tree import walk_comments
+from testing.fixtures import load_example_comments, scale_comments
+
+
+def traced_bytes(build):
+    """Returns (result, bytes allocated by build() that are still alive)."""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def nested_text_bytes(comments):
+    return sum(len(comment['text']) for comment in walk_comments(comments))
+
+
+def forest_text_bytes(forest):
+    return sum(len(forest.text[index]) for index in range(len(forest)))
+
+
+def main(copies):
+    print(f"{'comments':>9}{'nested MB':>11}{'forest MB':>11}{'ratio':>7}"
+          f"{'build s':>9}{'to_nested s':>13}{'walk nested s':>15}{'walk forest s':>15}")
+    for count in copies:
+        text = json.dumps(scale_comments(load_example_comments(), count))
+        nested, nested_bytes = traced_bytes(lambda: json.loads(text))
+        (forest, build_seconds), forest_bytes = traced_bytes(lambda: timed(CommentForest.from_nested, nested))
+        back, back_seconds = timed(forest.to_nested)
+        assert back == nested
+        total, walk_nested = timed(nested_text_bytes, nested)
+        assert timed(forest_text_bytes, forest)[0] == total
+        walk_forest = timed(forest_text_bytes, forest)[1]
+        print(f"{len(forest):>9}{nested_bytes / 1e6:>11.2f}{forest_bytes / 1e6:>11.2f}"
+              f"{nested_bytes / forest_bytes:>7.1f}{build_seconds:>9.3f}{back_seconds:>13.3f}"
+              f"{walk_nested:>15.3f}{walk_forest:>15.3f}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Nested comment dictionaries vs. CommentForest")
+    arg_parser.add_argument('--copies', type=int, nargs='+', default=[10, 100, 400],
+                            help="Copies of the example thread per measurement")
+    args = arg_parser.parse_args()
+    main(args.copies)
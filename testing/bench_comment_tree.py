@@ -0,0 +1,130 @@
+"""
+Benchmarks the single-pass comment tree builder against the previous
+recursive `process_comment` on threads rendered from the `examples/` fixtures.
+Both run on the same pre-parsed document, so only tree building is timed.
+
+Usage:
+    python testing/bench_comment_tree.py [--repeat N]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.comment_tree import build_comment_tree
+from testing.fixtures import (
+    count_comments, load_example_comments, load_example_posts, render_comment_tree, scale_comments
+)
+
+
+async def legacy_process_comment(comment_elem, depth=0, parent_id=None):
+    """The recursive process_comment this builder replaced, minus the network calls."""
+    if comment_elem is None:
+        return None
+
+    thing_id = comment_elem.get('thingid')
+    author = comment_elem.get('author')
+    text_elem = comment_elem.find('div', id=lambda x: x and x.endswith('-post-rtjson-content'))
+    text = text_elem.get_text(strip=True) if text_elem else "Comment Text Missing"
+
+    action_row = comment_elem.find('shreddit-comment-action-row')
+    comment_action_id = action_row.get('comment-id') if action_row else None
+
+    more_replies = comment_elem.find('a', {'slot': "more-comments-permalink"})
+    more_replies_link = more_replies.get('href') if more_replies else None
+
+    comment = {
+        'thing_id': thing_id,
+        'depth': int(comment_elem.get('depth', 0)),
+        'parent_id': parent_id,
+        'author': author,
+        'text': text,
+        'action_id': comment_action_id,
+        'more_replies': more_replies_link,
+        'replies': []
+    }
+
+    child_comments = []
+    children_slot = comment_elem.find('div', {'slot': 'children'})
+    if children_slot:
+        child_comments.extend(children_slot.find_all('shreddit-comment', recursive=True))
+    child_comments.extend(comment_elem.find_all('shreddit-comment', recursive=True))
+
+    seen = set()
+    child_comments = [x for x in child_comments if not (x.get('thingid') in seen or seen.add(x.get('thingid')))]
+
+    child_tasks = []
+    for child_elem in child_comments:
+        if int(child_elem.get('depth', 0)) == depth + 1:
+            child_tasks.append(legacy_process_comment(child_elem, depth + 1, thing_id))
+
+    if child_tasks:
+        child_comments = await asyncio.gather(*child_tasks)
+        comment['replies'].extend(c for c in child_comments if c is not None)
+
+    return comment
+
+
+async def legacy_extract(soup):
+    comment_tree = soup.find('shreddit-comment-tree')
+    top_level_comments = comment_tree.find_all('shreddit-comment', attrs={'depth': '0'}, recursive=False)
+    comments = await asyncio.gather(*(legacy_process_comment(c) for c in top_level_comments))
+    return [c for c in comments if c is not None]
+
+
+def single_pass_extract(soup):
+    return build_comment_tree(soup.find('shreddit-comment-tree'))
+
+
+def shape(comments):
+    """Everything but `more_replies`, whose attribution the builder fixes."""
+    return [
+        (c['thing_id'], c['depth'], c['parent_id'], c['author'], c['text'], c['action_id'], shape(c['replies']))
+        for c in comments
+    ]
+
+
+def best_of(repeat, func, *args):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the best time is reported")
+    args = parser.parse_args()
+
+    posts = load_example_posts()
+    largest = max(posts, key=lambda p: count_comments(p['comments']))['comments']
+    cases = [
+        ("comment_example", load_example_comments()),
+        ("largest post", largest),
+        ("largest post x5", scale_comments(largest, 5)),
+        ("largest post x12", scale_comments(largest, 12)),
+    ]
+
+    print(f"{'thread':<20}{'comments':>10}{'legacy (s)':>14}{'single-pass (s)':>18}{'speedup':>10}")
+    for name, comments in cases:
+        soup = BeautifulSoup(render_comment_tree(comments), 'html.parser')
+        legacy_time, legacy = best_of(args.repeat, lambda s: asyncio.run(legacy_extract(s)), soup)
+        new_time, new = best_of(args.repeat, single_pass_extract, soup)
+        if shape(legacy) != shape(new):
+            print(f"{name}: builder output differs from the legacy implementation")
+            sys.exit(1)
+        print(f"{name:<20}{count_comments(comments):>10}{legacy_time:>14.4f}{new_time:>18.4f}"
+              f"{legacy_time / new_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+End-to-end throughput benchmark for the crawler, against the local mock server.
+
+Starts testing/mock_server.py in a child process, then runs scrape_posts.main
+in this process with a throwaway data directory: feed discovery, post pages,
+comment partials and "more replies" pages, exactly as against Reddit, but
+without its rate limits. Reports posts/sec, requests/sec, requests per post
+and request latency percentiles per endpoint.
+
+    python testing/bench_crawler.py --posts 2000 --latency 20 --throttle-rate 0.01
+
+To count the requests saved by single-request extraction, let the mock embed
+comment trees in (some) post pages and compare both modes under one budget:
+
+    python testing/bench_crawler.py --no-discover --embed-rate 0.9 --rate-limit 30000
+    python testing/bench_crawler.py --no-discover --embed-rate 0.9 --rate-limit 30000 --single-request
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from testing.bench_memory import free_port, wait_for_port
+from testing.mock_server import synthetic_post_urls
+
+MOCK_SERVER = PROJECT_ROOT / "testing" / "mock_server.py"
+
+
+def percentile(sorted_values, fraction):
+    """Returns the value at a fraction (0-1) of a sorted list, or 0 for an empty one."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class RequestLog:
+    """Collects (status, seconds) per endpoint from RedditClient's on_request hook."""
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(int)
+
+    def __call__(self, endpoint, status, seconds):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[status] += 1
+
+    def summary(self):
+        rows = {}
+        every = []
+        for endpoint, values in sorted(self.latencies.items()):
+            values.sort()
+            every.extend(values)
+            rows[endpoint] = (len(values), percentile(values, 0.5), percentile(values, 0.99))
+        every.sort()
+        rows['all'] = (len(every), percentile(every, 0.5), percentile(every, 0.99))
+        return rows
+
+
+def run_crawl(base_url, posts, discover, parse_workers, single_request=False, rate_limit=100_000_000):
+    """
+    Runs the crawler once in this process.
+
+    Returns:
+        tuple: (seconds, posts saved, RequestLog)
+    """
+    workdir = tempfile.mkdtemp(prefix="bench_crawler_")
+    data_dir = Path(workdir) / "data"
+    data_dir.mkdir()
+    # Read by config at import time, so set before importing the scraper
+    os.environ['REDDIT_BASE_URL'] = base_url
+    os.environ['SCRAPER_DATA_DIR'] = str(data_dir)
+    from scraper import scrape_posts
+
+    if not discover:
+        with open(data_dir / "reddit_posts.json", 'w') as f:
+            json.dump(synthetic_post_urls(posts), f)
+
+    log = RequestLog()
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            asyncio.run(scrape_posts.main(
+                parse_workers=parse_workers,
+                discover=discover,
+                num_posts=posts,
+                use_cache=False,
+                rate_limit=rate_limit,
+                on_request=log,
+                single_request=single_request,
+            ))
+        elapsed = time.perf_counter() - start
+        outputs = list(Path(workdir).glob("posts_data_*.json"))
+        saved = sum(len(json.load(open(p))) for p in outputs)
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return elapsed, saved, log
+
+
+def main(posts=1000, latency=0.0, throttle_rate=0.0, reply_depth=3, discover=True, parse_workers=0,
+         embed_rate=0.0, single_request=False, rate_limit=100_000_000):
+    port = free_port()
+    server = subprocess.Popen([
+        sys.executable, str(MOCK_SERVER), '--port', str(port),
+        '--feed-posts', str(posts), '--latency', str(latency),
+        '--throttle-rate', str(throttle_rate), '--retry-after', '0.5',
+        '--reply-depth', str(reply_depth), '--embed-rate', str(embed_rate),
+    ])
+    try:
+        wait_for_port(port)
+        elapsed, saved, log = run_crawl(f"http://127.0.0.1:{port}", posts, discover, parse_workers,
+                                        single_request, rate_limit)
+    finally:
+        server.terminate()
+        server.wait()
+
+    summary = log.summary()
+    total_requests = summary['all'][0]
+    print(f"Mock server: {posts} posts, latency {latency:g} ms, 429 rate {throttle_rate:g}, "
+          f"reply depth {reply_depth}, {embed_rate:.0%} of post pages embed comments")
+    print(f"{saved} posts in {elapsed:.1f}s: {saved / elapsed:.1f} posts/s, "
+          f"{total_requests} requests, {total_requests / elapsed:.1f} req/s, "
+          f"{log.statuses.get(429, 0)} throttled")
+    post_requests = sum(summary[endpoint][0] for endpoint in ('post', 'comments') if endpoint in summary)
+    print(f"{total_requests / max(saved, 1):.2f} requests per post, {post_requests / max(saved, 1):.2f} of them "
+          f"for the post page and comment partial ({'single' if single_request else 'two'}-request extraction)")
+    print(f"\n{'endpoint':<14} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for endpoint, (count, p50, p99) in summary.items():
+        print(f"{endpoint:<14} {count:>9} {p50 * 1000:>8.1f} {p99 * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Crawler throughput against the local mock server")
+    arg_parser.add_argument('--posts', type=int, default=1000, help="Posts to discover and scrape")
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="Mean mock response delay in milliseconds")
+    arg_parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of requests answered with 429")
+    arg_parser.add_argument('--reply-depth', type=int, default=3,
+                            help="Comment levels per partial before \"more replies\" pages")
+    arg_parser.add_argument('--no-discover', action='store_true',
+                            help="Scrape a synthetic URL list instead of discovering posts from feeds")
+    arg_parser.add_argument('--parse-workers', type=int, default=0, help="Parser worker processes")
+    arg_parser.add_argument('--embed-rate', type=float, default=0.0,
+                            help="Share of mock post pages embedding their first comment tree")
+    arg_parser.add_argument('--single-request', action='store_true',
+                            help="Use comment trees embedded in post pages instead of the comment partial")
+    arg_parser.add_argument('--rate-limit', type=int, default=100_000_000,
+                            help="Crawler requests per minute (default: effectively unlimited)")
+    args = arg_parser.parse_args()
+    main(posts=args.posts, latency=args.latency, throttle_rate=args.throttle_rate,
+         reply_depth=args.reply_depth, discover=not args.no_discover, parse_workers=args.parse_workers,
+         embed_rate=args.embed_rate, single_request=args.single_request, rate_limit=args.rate_limit)
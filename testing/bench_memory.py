@@ -0,0 +1,108 @@
+"""
+Measures the scraper's peak memory for growing URL lists.
+
+For each size, scrape_posts.py runs as a child process against the local mock
+server (testing/mock_server.py) with a throwaway data directory, and the peak
+RSS of that process is read from its resource usage. With a bounded queue and
+posts streamed to and from the checkpoint, peak RSS should stay roughly flat
+as the number of URLs grows.
+
+    python testing/bench_memory.py --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from testing.mock_server import synthetic_post_urls
+
+SCRAPER = PROJECT_ROOT / "scraper" / "scrape_posts.py"
+MOCK_SERVER = PROJECT_ROOT / "testing" / "mock_server.py"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"mock server did not start on port {port}")
+
+
+def run_scraper(base_url, num_urls, parse_workers=0):
+    """
+    Scrapes num_urls synthetic posts in a child process.
+
+    Returns:
+        dict: urls, seconds, peak RSS in MB, output size in MB and exit code.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        data_dir = Path(workdir) / "data"
+        data_dir.mkdir()
+        with open(data_dir / "reddit_posts.json", 'w') as f:
+            json.dump(synthetic_post_urls(num_urls), f)
+
+        env = dict(os.environ, REDDIT_BASE_URL=base_url, SCRAPER_DATA_DIR=str(data_dir))
+        command = [sys.executable, str(SCRAPER), '--rate-limit', '100000000',
+                   '--parse-workers', str(parse_workers)]
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=workdir, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        elapsed = time.perf_counter() - start
+
+        outputs = list(Path(workdir).glob("posts_data_*.json"))
+        return {
+            'urls': num_urls,
+            'seconds': elapsed,
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_mb': usage.ru_maxrss / 1024,
+            'output_mb': sum(p.stat().st_size for p in outputs) / 1e6,
+            'exit_code': process.returncode,
+        }
+
+
+def main(sizes, parse_workers=0):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, str(MOCK_SERVER), '--port', str(port), '--reply-depth', '0'])
+    try:
+        wait_for_port(port)
+        print(f"{'URLs':>8} {'seconds':>9} {'posts/s':>9} {'peak RSS MB':>12} {'output MB':>10}")
+        for size in sizes:
+            result = run_scraper(f"http://127.0.0.1:{port}", size, parse_workers)
+            if result['exit_code'] != 0:
+                print(f"{size:>8} scraper exited with code {result['exit_code']}")
+                continue
+            print(f"{result['urls']:>8} {result['seconds']:>9.1f} {result['urls'] / result['seconds']:>9.0f} "
+                  f"{result['peak_rss_mb']:>12.1f} {result['output_mb']:>10.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Measure scraper peak RSS against the mock server")
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help="Numbers of synthetic URLs to scrape")
+    arg_parser.add_argument('--parse-workers', type=int, default=0,
+                            help="Parser worker processes for the scraper")
+    args = arg_parser.parse_args()
+    main(args.sizes, args.parse_workers)
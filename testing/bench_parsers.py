@@ -0,0 +1,303 @@
+"""
+Parser micro-benchmarks with a regression gate.
+
+Times every extraction path (post pages, comment-tree partials, "more replies"
+pages, feed pages, and comment tree building on its own) on a fixed corpus of
+small, medium and huge documents rendered from the `examples/` fixtures, and
+measures the peak Python memory allocated while parsing each document.
+
+Results are compared with a stored baseline (testing/parser_baseline.json):
+a document that got slower or allocates more than the tolerances allow is a
+regression, and the script exits with status 1. A document that looks slower
+is timed again before it counts, and slowdowns under TIME_NOISE_FLOOR are
+ignored, so run-to-run noise doesn't fail the gate. Timings depend on the
+machine, so refresh the baseline with --update-baseline when moving to a new one.
+
+Usage:
+    python testing/bench_parsers.py [--backend NAME] [--update-baseline]
+"""
+import argparse
+import gc
+import hashlib
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from config.constants import PARSER_BACKEND
+from scraper.src.comment_tree import build_comment_tree
+from scraper.src.parsers import LexborHTMLParser, available_backends, build_lexbor_comment_tree, get_parser
+from testing.fixtures import (
+    count_comments, load_example_posts, render_comment_tree, render_feed_page, render_post_page, scale_comments
+)
+
+BASELINE_FILE = PROJECT_ROOT / "testing" / "parser_baseline.json"
+TIME_TOLERANCE = 0.25  # Allowed slowdown before a document counts as a regression
+ALLOC_TOLERANCE = 0.10  # Allowed growth in peak allocations
+TIME_NOISE_FLOOR = 0.0002  # Slowdowns of fewer seconds per call never count as regressions
+MIN_SAMPLE_SECONDS = 0.05  # Each timing sample repeats a document for at least this long
+RECHECK_REPEAT = 3  # A document that looks slower is timed again with this many times the samples
+EMPTY_DOCUMENT = '<shreddit-comment-tree></shreddit-comment-tree>'  # Measures a backend's fixed allocations
+
+
+def feed_posts(posts, count):
+    """Lists `count` posts for a feed page, cycling through the examples with distinct ids."""
+    listed = []
+    for n in range(count):
+        post = dict(posts[n % len(posts)])
+        post['post_id'] = f"t3_bench{n:05d}"
+        listed.append(post)
+    return listed
+
+
+def build_corpus():
+    """
+    Renders the benchmark documents.
+
+    The corpus only depends on the fixtures, so it is the same on every run;
+    each document's checksum is kept in the baseline to notice when it changes.
+
+    Returns:
+        list: (name, method, html) triples, where method is a parser method or 'comment_tree'.
+    """
+    posts = load_example_posts()
+    by_size = sorted((p for p in posts if p['comments']), key=lambda p: count_comments(p['comments']))
+    small, medium = by_size[0], by_size[-1]
+    huge_comments = scale_comments(medium['comments'], 40)
+    long_post = dict(max(posts, key=lambda p: len(p['content'])))
+    long_post['content'] = ' '.join([long_post['content']] * 200)
+
+    threads = {
+        'small': small['comments'],
+        'medium': medium['comments'],
+        'huge': huge_comments,
+    }
+    corpus = [
+        ('post/small', 'parse_post', render_post_page(min(posts, key=lambda p: len(p['content'])))),
+        ('post/medium', 'parse_post', render_post_page(max(posts, key=lambda p: len(p['content'])))),
+        ('post/huge', 'parse_post', render_post_page(long_post)),
+    ]
+    for size, comments in threads.items():
+        corpus.append((f'comments/{size}', 'parse_comments', render_comment_tree(comments)))
+    for size, comments in threads.items():
+        # A "more replies" page holds one tree per reply chain
+        corpus.append((f'more_replies/{size}', 'parse_more_replies',
+                       ''.join(render_comment_tree([c]) for c in comments)))
+    for size, comments in threads.items():
+        corpus.append((f'comment_tree/{size}', 'comment_tree', render_comment_tree(comments)))
+    next_src = "/svc/shreddit/community-more-posts/hot/?after=bench&feedLength=25"
+    for size, count in (('small', 25), ('medium', 100), ('huge', 1000)):
+        html = render_feed_page(feed_posts(posts, count), next_src)
+        corpus.append((f'feed/{size}', 'parse_feed', html))
+        corpus.append((f'feed_posts/{size}', 'parse_feed_posts', html))
+    return corpus
+
+
+def make_job(backend, method, html):
+    """
+    Returns a no-argument callable running one extraction on html.
+
+    'comment_tree' pre-parses the document and only times building the tree.
+    """
+    if method == 'comment_tree':
+        if backend.name == 'selectolax':
+            root = LexborHTMLParser(html).css_first('shreddit-comment-tree')
+            return lambda: build_lexbor_comment_tree(root)
+        root = BeautifulSoup(html, backend.features).find('shreddit-comment-tree')
+        return lambda: build_comment_tree(root)
+    if method == 'parse_post':
+        return lambda: backend.parse_post(html, 't3_bench')
+    return lambda: getattr(backend, method)(html)
+
+
+def time_job(job, repeat):
+    """
+    Times a job as the best of `repeat` samples.
+
+    The garbage collector is paused while sampling, so a collection
+    triggered by an earlier document isn't charged to this one.
+
+    Returns:
+        float: Seconds per call.
+    """
+    start = time.perf_counter()
+    job()
+    once = time.perf_counter() - start
+    calls = max(1, int(MIN_SAMPLE_SECONDS / once) if once else 1000)
+    best = float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(calls):
+                job()
+            best = min(best, (time.perf_counter() - start) / calls)
+    finally:
+        gc.enable()
+    return best
+
+
+def peak_allocation(job):
+    """
+    Measures the peak Python memory allocated by one call.
+
+    Memory allocated inside C libraries (lxml's and lexbor's trees) is not
+    traced, only the Python objects built from them.
+
+    Returns:
+        int: Peak traced bytes.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = job()
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def run(backend, corpus, repeat):
+    """
+    Benchmarks every document in the corpus.
+
+    Peak allocations are counted above those of the same extraction on an
+    empty document, which are fixed costs of the backend (about 1.3 MB for
+    selectolax) and would otherwise dwarf the small documents.
+
+    Returns:
+        dict: Per document name: checksum, size in bytes, seconds per call and peak bytes.
+    """
+    results = {}
+    fixed = {}
+    for name, method, html in corpus:
+        job = make_job(backend, method, html)
+        if method not in fixed:
+            empty_job = make_job(backend, method, EMPTY_DOCUMENT)
+            empty_job()
+            fixed[method] = peak_allocation(empty_job)
+        results[name] = {
+            'sha256': hashlib.sha256(html.encode('utf-8')).hexdigest(),
+            'bytes': len(html.encode('utf-8')),
+            'seconds': time_job(job, repeat),
+            'peak_bytes': max(0, peak_allocation(job) - fixed[method]),
+        }
+    return results
+
+
+def is_slower(result, base, time_tolerance):
+    return (result['seconds'] > base['seconds'] * (1 + time_tolerance)
+            and result['seconds'] - base['seconds'] > TIME_NOISE_FLOOR)
+
+
+def recheck_slower(backend, corpus, results, baseline, repeat, time_tolerance):
+    """
+    Times the documents that look slower than the baseline again, keeping the better time.
+
+    A single slow run (a busy machine, a page fault storm) then doesn't count
+    as a regression; a real slowdown shows up in both runs.
+    """
+    for name, method, html in corpus:
+        base = baseline.get(name)
+        result = results[name]
+        if base is None or base['sha256'] != result['sha256'] or not is_slower(result, base, time_tolerance):
+            continue
+        retimed = time_job(make_job(backend, method, html), repeat * RECHECK_REPEAT)
+        result['seconds'] = min(result['seconds'], retimed)
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(results, baseline, time_tolerance, alloc_tolerance):
+    """
+    Prints results next to the baseline and flags regressions.
+
+    Returns:
+        int: Number of regressed documents.
+    """
+    regressions = 0
+    print(f"{'document':<22}{'KB':>8}{'ms':>10}{'base ms':>10}{'time':>8}"
+          f"{'peak KB':>10}{'base KB':>10}{'alloc':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        line = f"{name:<22}{result['bytes'] / 1024:>8.1f}{result['seconds'] * 1000:>10.3f}"
+        if base is None:
+            print(f"{line}{'-':>10}{'':>8}{result['peak_bytes'] / 1024:>10.1f}{'-':>10}   (new)")
+            continue
+        if base['sha256'] != result['sha256']:
+            print(f"{line}{'':>36}   (corpus changed, not compared)")
+            continue
+        time_change = result['seconds'] / base['seconds'] - 1
+        alloc_change = result['peak_bytes'] / base['peak_bytes'] - 1 if base['peak_bytes'] else 0.0
+        flags = []
+        if is_slower(result, base, time_tolerance):
+            flags.append("SLOWER")
+        if alloc_change > alloc_tolerance:
+            flags.append("MORE MEMORY")
+        regressions += bool(flags)
+        print(f"{line}{base['seconds'] * 1000:>10.3f}{time_change:>+8.0%}"
+              f"{result['peak_bytes'] / 1024:>10.1f}{base['peak_bytes'] / 1024:>10.1f}{alloc_change:>+8.0%}"
+              f"{'   ' + ', '.join(flags) if flags else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--backend', default=PARSER_BACKEND, choices=['html.parser', 'lxml', 'selectolax'],
+                        help="Parser backend to benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Timing samples per document; the best is kept")
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help="Baseline JSON file")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store these results as the backend's baseline instead of comparing")
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE,
+                        help="Allowed slowdown, as a fraction of the baseline time")
+    parser.add_argument('--alloc-tolerance', type=float, default=ALLOC_TOLERANCE,
+                        help="Allowed growth in peak allocations, as a fraction of the baseline")
+    args = parser.parse_args()
+
+    if args.backend not in available_backends():
+        print(f"Parser backend {args.backend!r} is not installed")
+        sys.exit(2)
+    backend = get_parser(args.backend)
+    corpus = build_corpus()
+    print(f"Backend: {backend.name}; corpus: {len(corpus)} documents")
+    results = run(backend, corpus, args.repeat)
+
+    baselines = load_baseline(args.baseline)
+    if args.update_baseline:
+        baselines[backend.name] = results
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        compare(results, {}, args.time_tolerance, args.alloc_tolerance)
+        print(f"\nBaseline for {backend.name} written to {args.baseline}")
+        return
+
+    if backend.name not in baselines:
+        print(f"No baseline for {backend.name} in {args.baseline}; run with --update-baseline first")
+    baseline = baselines.get(backend.name, {})
+    recheck_slower(backend, corpus, results, baseline, args.repeat, args.time_tolerance)
+    regressions = compare(results, baseline, args.time_tolerance, args.alloc_tolerance)
+    if regressions:
+        print(f"\n{regressions} documents regressed")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Times ingest and lookups of the SQLite post store on a corpus built by
+repeating the posts in `examples/posts_example.json` with fresh ids.
+
+Usage:
+    python testing/bench_post_store.py [--copies 2000] [--db /tmp/bench_posts.sqlite]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.comment_tree import walk_comments
+from scraper.src.post_store import PostStore
+from testing.fixtures import load_example_posts
+
+
+def corpus(posts, copies):
+    """Yields `copies` copies of posts, with unique post, comment and author ids per copy."""
+    text = json.dumps(posts)
+    for i in range(copies):
+        for post in json.loads(text):
+            post['post_id'] = f"{post['post_id']}_{i}"
+            post['author'] = f"{post['author']}_{i % 100}"
+            for comment in walk_comments(post['comments']):
+                comment['thing_id'] = f"{comment['thing_id']}_{i}"
+                comment['author'] = f"{comment['author']}_{i % 100}"
+                for reply in comment['replies']:
+                    reply['parent_id'] = comment['thing_id']
+            yield post
+
+
+def median_ms(func, *args, repeat=20):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main(copies, db):
+    for path in (Path(db), Path(f"{db}-wal"), Path(f"{db}-shm")):
+        path.unlink(missing_ok=True)
+    posts = load_example_posts()
+    store = PostStore(db)
+
+    start = time.perf_counter()
+    stats = store.ingest(corpus(posts, copies))
+    ingest_seconds = time.perf_counter() - start
+    counts = store.counts()
+    print(f"Ingested {counts['posts']} posts and {counts['comments']} comments in {ingest_seconds:.1f}s "
+          f"({counts['comments'] / ingest_seconds:,.0f} comments/s); {Path(db).stat().st_size / 1e6:.0f} MB")
+
+    start = time.perf_counter()
+    again = store.ingest(corpus(posts, copies))
+    print(f"Re-ingest of the same posts: {again['unchanged']} unchanged in {time.perf_counter() - start:.1f}s")
+
+    author = posts[1]['comments'][0]['author'] + '_7'
+    post_id = max(posts, key=lambda post: len(list(walk_comments(post['comments']))))['post_id']
+    lookups = [
+        ("search_comments('heat pain', 20)", store.search_comments, 'heat pain', 20),
+        ("search_comments('gabapentin', 20)", store.search_comments, 'gabapentin', 20),
+        ("search_posts('nerve block', 20)", store.search_posts, 'nerve block', 20),
+        (f"by_author('{author}')", store.by_author, author),
+        (f"thread('{post_id}_{copies // 2}')", store.thread, f"{post_id}_{copies // 2}"),
+    ]
+    for label, func, *args in lookups:
+        print(f"{label:<50}{median_ms(func, *args):>8.2f} ms")
+    store.close()
+    assert stats['added'] == counts['posts']
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Ingest and query timings of the SQLite post store")
+    arg_parser.add_argument('--copies', type=int, default=2000, help="Copies of the example posts")
+    arg_parser.add_argument('--db', default='/tmp/bench_posts.sqlite', help="Database file, replaced on each run")
+    args = arg_parser.parse_args()
+    main(args.copies, args.db)
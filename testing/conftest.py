@@ -0,0 +1,2 @@
+# test_scrape.py is a manual check against the live site, not a test module
+collect_ignore = ['test_scrape.py']
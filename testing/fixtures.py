@@ -0,0 +1,176 @@
+"""
+Renders the JSON examples in `examples/` back into shreddit markup.
+
+The scraper only ever sees HTML, so benchmarks and offline checks need pages that
+look like the ones Reddit serves. These helpers rebuild post pages, comment-tree
+partials and feed pages from the scraper's own output format.
+"""
+import copy
+import json
+from html import escape
+from pathlib import Path
+
+EXAMPLES_DIR = Path(__file__).parent.parent / "examples"
+
+
+def load_example_posts():
+    """Loads the posts in examples/posts_example.json."""
+    with open(EXAMPLES_DIR / "posts_example.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_example_comments():
+    """Loads the comment thread in examples/comment_example.json."""
+    with open(EXAMPLES_DIR / "comment_example.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _owns_more_replies(comment):
+    """
+    Tells whether a comment's "more replies" link belongs to the comment itself.
+
+    Older scrapes copied a reply's link onto its ancestors, so a link that also
+    appears on a direct reply is treated as belonging to that reply.
+    """
+    link = comment.get('more_replies')
+    if not link:
+        return False
+    return all(reply.get('more_replies') != link for reply in comment.get('replies', []))
+
+
+def render_comment(comment, out):
+    """
+    Appends the markup for a comment and its replies to out.
+
+    Args:
+        comment (dict): A comment in the scraper's output format.
+        out (list): List of HTML fragments to append to.
+    """
+    thing_id = escape(comment['thing_id'] or '')
+    slot = ' slot="children"' if comment['depth'] else ''
+    out.append(
+        f'<shreddit-comment thingid="{thing_id}" depth="{comment["depth"]}" '
+        f'author="{escape(comment["author"] or "")}"{slot}>'
+        f'<div slot="comment"><div id="{thing_id}-post-rtjson-content" class="md">'
+        f'<p>{escape(comment["text"])}</p></div></div>'
+        f'<shreddit-comment-action-row comment-id="{escape(comment["action_id"] or "")}" slot="actionRow">'
+        f'</shreddit-comment-action-row>'
+    )
+    for reply in comment['replies']:
+        render_comment(reply, out)
+    if _owns_more_replies(comment):
+        out.append(
+            f'<a slot="more-comments-permalink" href="{escape(comment["more_replies"])}">'
+            f'More replies</a>'
+        )
+    out.append('</shreddit-comment>')
+
+
+def render_comment_tree(comments):
+    """
+    Renders a comment-tree partial as served by /svc/shreddit/comments/.
+
+    Args:
+        comments (list): Top-level comments in the scraper's output format.
+
+    Returns:
+        str: HTML containing a single `shreddit-comment-tree`.
+    """
+    out = ['<shreddit-comment-tree>']
+    for comment in comments:
+        render_comment(comment, out)
+    out.append('</shreddit-comment-tree>')
+    return ''.join(out)
+
+
+def render_post_page(post, comment_tree=None):
+    """
+    Renders a full post page with its `shreddit-post` element.
+
+    Args:
+        post (dict): A post in the scraper's output format.
+        comment_tree (str, optional): Comment-tree partial HTML to embed below the
+            post, as Reddit does for the first comments. Defaults to None.
+
+    Returns:
+        str: HTML for the post page.
+    """
+    return (
+        '<html><head><title>reddit</title></head><body>'
+        f'<shreddit-post post-title="{escape(post["title"])}" author="{escape(post["author"])}" '
+        f'created-timestamp="{escape(str(post["created_timestamp"]))}" score="{escape(str(post["score"]))}" '
+        f'upvote-ratio="{escape(str(post["upvote_ratio"]))}" content-href="{escape(post.get("image_url", ""))}" '
+        f'comment-count="{escape(str(post.get("comment_count", 0)))}" id="{escape(post["post_id"])}">'
+        f'<a slot="full-post-link" href="{escape(post_path(post))}"></a>'
+        f'<div slot="text-body"><div class="md"><p>{escape(post["content"])}</p></div></div>'
+        f'</shreddit-post>{comment_tree or ""}</body></html>'
+    )
+
+
+def render_feed_page(posts, next_src=None, subreddit="ChronicPain"):
+    """
+    Renders a community-more-posts feed page.
+
+    Args:
+        posts (list): Posts to list on the page.
+        next_src (str, optional): `src` of the "load-after" partial pointing at the next page.
+        subreddit (str, optional): Subreddit in the post permalinks. Defaults to "ChronicPain".
+
+    Returns:
+        str: HTML for the feed page.
+    """
+    out = []
+    for post in posts:
+        out.append(
+            f'<shreddit-post post-title="{escape(post["title"])}" author="{escape(post["author"])}" '
+            f'score="{escape(str(post["score"]))}" comment-count="{escape(str(post.get("comment_count", 0)))}" '
+            f'id="{escape(post["post_id"])}">'
+            f'<a slot="full-post-link" href="{escape(post_path(post, subreddit))}"></a></shreddit-post>'
+        )
+    if next_src:
+        out.append(f'<faceplate-partial slot="load-after" src="{escape(next_src)}"></faceplate-partial>')
+    return ''.join(out)
+
+
+def post_path(post, subreddit="ChronicPain"):
+    """Returns the relative permalink for a post."""
+    return f"/r/{subreddit}/comments/{post['post_id'][3:]}/post/"
+
+
+def scale_comments(comments, copies):
+    """
+    Builds a larger thread by repeating a comment list with fresh thing_ids.
+
+    Args:
+        comments (list): Top-level comments to repeat.
+        copies (int): Number of copies of the thread to concatenate.
+
+    Returns:
+        list: `copies` times as many top-level comments, each with unique ids.
+    """
+    scaled = []
+    for i in range(copies):
+        for comment in copy.deepcopy(comments):
+            stack = [comment]
+            while stack:
+                current = stack.pop()
+                current['thing_id'] = f"{current['thing_id']}_{i}"
+                current['action_id'] = current['thing_id']
+                if current['more_replies']:
+                    current['more_replies'] = f"{current['more_replies']}{i}/"
+                for reply in current['replies']:
+                    reply['parent_id'] = current['thing_id']
+                    stack.append(reply)
+            scaled.append(comment)
+    return scaled
+
+
+def count_comments(comments):
+    """Counts the comments in a nested comment list."""
+    total = 0
+    stack = list(comments)
+    while stack:
+        comment = stack.pop()
+        total += 1
+        stack.extend(comment['replies'])
+    return total
@@ -0,0 +1,247 @@
+"""
+Local stand-in for the parts of Reddit the scraper talks to.
+
+Serves synthetic pages built from the `examples/` fixtures:
+
+    /r/{sub}/comments/{id}/...                   post page
+    /svc/shreddit/comments/r/{sub}/t3_{id}       comment-tree partial
+    /r/{sub}/comments/{id}/comment/{comment}/    "more replies" page
+    /svc/shreddit/community-more-posts/{sort}/   paginated feed
+
+Any post id works: the id picks one of the example posts, whose markup is
+served under the requested id. Comment partials stop at `reply_depth` levels
+and link the rest through "more replies" pages, so a crawl reproduces the
+example threads in full while exercising reply expansion. Feeds list
+`feed_posts` synthetic posts, or a per-subreddit number of them, so
+communities of different sizes can be crawled together. Post pages can
+embed the first comment tree, as Reddit's do. Every response can
+be delayed by a random latency, and a share of them answered with 429.
+
+Point the scraper at it with the REDDIT_BASE_URL environment variable:
+
+    python testing/mock_server.py --port 8765
+    REDDIT_BASE_URL=http://127.0.0.1:8765 python scraper/scrape_posts.py --rate-limit 1000000
+
+`synthetic_post_urls(n, subreddit)` gives permalinks for n distinct posts.
+"""
+import argparse
+import asyncio
+import copy
+import random
+import zlib
+from pathlib import Path
+import sys
+
+from aiohttp import web
+
+# Add project root to Python path to enable absolute imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from testing.fixtures import load_example_posts, render_comment_tree, render_feed_page, render_post_page
+
+
+def synthetic_post_urls(count, subreddit="ChronicPain"):
+    """
+    Builds permalinks for synthetic posts the mock server can serve.
+
+    Args:
+        count (int): Number of posts.
+        subreddit (str, optional): Subreddit in the permalinks. Defaults to "ChronicPain".
+
+    Returns:
+        list: Relative post URLs with distinct post ids.
+    """
+    return [f"/r/{subreddit}/comments/{synthetic_id(n, subreddit)}/post/" for n in range(count)]
+
+
+def synthetic_id(number, subreddit="ChronicPain"):
+    """Returns the short post id of the number-th synthetic post of a subreddit."""
+    if subreddit.lower() == "chronicpain":
+        return f"mock{number:07d}"
+    return f"{subreddit.lower()}{number:07d}"
+
+
+def _clear_more_replies(comments):
+    stack = list(comments)
+    while stack:
+        comment = stack.pop()
+        comment['more_replies'] = None
+        stack.extend(comment['replies'])
+
+
+def _truncate(comments, levels, link):
+    """
+    Copies a comment list down to `levels` levels.
+
+    Comments whose replies are cut off get a "more replies" link built by link(comment).
+    """
+    copies = []
+    for comment in comments:
+        clone = dict(comment)
+        if levels <= 1 and comment['replies']:
+            clone['replies'] = []
+            clone['more_replies'] = link(comment)
+        else:
+            clone['replies'] = _truncate(comment['replies'], levels - 1, link)
+        copies.append(clone)
+    return copies
+
+
+class MockReddit:
+    """
+    Renders the mock server's pages and applies latency and throttling.
+
+    Args:
+        reply_depth (int, optional): Comment levels per partial before replies move
+            to a "more replies" page; 0 serves whole threads in one partial. Defaults to 3.
+        feed_posts (int, optional): Synthetic posts listed by every feed. Defaults to 1000.
+        subreddit_posts (dict, optional): Posts listed by the feeds of particular
+            subreddits, overriding feed_posts. Defaults to None.
+        latency (float, optional): Mean response delay in seconds. Defaults to 0.
+        throttle_rate (float, optional): Share of requests answered with 429. Defaults to 0.
+        retry_after (float, optional): Retry-After sent with a 429. Defaults to 1.
+        seed (int, optional): Seed for latency and throttling draws. Defaults to 0.
+        embed_rate (float, optional): Share of post pages that embed the comment tree
+            also served by the comment partial; the pick is fixed per post id. Defaults to 0.
+    """
+    def __init__(self, reply_depth=3, feed_posts=1000, latency=0.0, throttle_rate=0.0, retry_after=1.0, seed=0,
+                 subreddit_posts=None, embed_rate=0.0):
+        self.posts = load_example_posts()
+        self.comments_by_id = []
+        for post in self.posts:
+            # The examples' own links point at pages the mock doesn't have
+            _clear_more_replies(post['comments'])
+            index = {}
+            stack = list(post['comments'])
+            while stack:
+                comment = stack.pop()
+                index[comment['thing_id']] = comment
+                stack.extend(comment['replies'])
+            self.comments_by_id.append(index)
+        self.reply_depth = reply_depth
+        self.embed_rate = embed_rate
+        self.feed_posts = feed_posts
+        self.subreddit_posts = {name.lower(): count for name, count in (subreddit_posts or {}).items()}
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.throttled = 0
+
+    def example_index(self, short_id):
+        """Picks the example post served for a post id."""
+        return zlib.crc32(short_id.encode('utf-8')) % len(self.posts)
+
+    def synthetic_post(self, short_id):
+        post = copy.copy(self.posts[self.example_index(short_id)])
+        post['post_id'] = f"t3_{short_id}"
+        return post
+
+    def _partial(self, subreddit, short_id, comments):
+        if self.reply_depth <= 0:
+            return render_comment_tree(comments)
+        subreddit_path = f"/r/{subreddit}/comments"
+        truncated = _truncate(
+            comments, self.reply_depth,
+            lambda comment: f"{subreddit_path}/{short_id}/comment/{comment['thing_id'][3:]}/"
+        )
+        return render_comment_tree(truncated)
+
+    def post_page(self, subreddit, short_id):
+        embed = zlib.crc32(f"embed:{short_id}".encode('utf-8')) % 1000 < self.embed_rate * 1000
+        comment_tree = self.comment_tree(subreddit, short_id) if embed else None
+        return render_post_page(self.synthetic_post(short_id), comment_tree)
+
+    def comment_tree(self, subreddit, short_id):
+        return self._partial(subreddit, short_id, self.posts[self.example_index(short_id)]['comments'])
+
+    def more_replies(self, subreddit, short_id, comment_id):
+        comment = self.comments_by_id[self.example_index(short_id)].get(f"t1_{comment_id}")
+        return self._partial(subreddit, short_id, comment['replies'] if comment else [])
+
+    def feed_page(self, path, subreddit, after, feed_length):
+        total = self.subreddit_posts.get(subreddit.lower(), self.feed_posts)
+        numbers = range(after, min(after + feed_length, total))
+        posts = [self.synthetic_post(synthetic_id(n, subreddit)) for n in numbers]
+        next_src = None
+        if after + feed_length < total:
+            next_src = f"{path}?name={subreddit}&after={after + feed_length}&feedLength={feed_length}"
+        return render_feed_page(posts, next_src, subreddit)
+
+    async def handle(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.rng.expovariate(1 / self.latency))
+        if self.throttle_rate and self.rng.random() < self.throttle_rate:
+            self.throttled += 1
+            return web.Response(status=429, headers={'Retry-After': str(self.retry_after)})
+
+        path = request.path
+        if path.startswith('/svc/shreddit/community-more-posts/'):
+            after = int(request.query.get('after') or 0)
+            feed_length = int(request.query.get('feedLength') or 25)
+            subreddit = request.query.get('name') or "ChronicPain"
+            return web.Response(text=self.feed_page(path, subreddit, after, feed_length), content_type='text/html')
+        if path.startswith('/svc/shreddit/comments/'):
+            # /svc/shreddit/comments/r/{subreddit}/t3_{id}
+            _, subreddit, post_id = path.rstrip('/').rsplit('/', 2)
+            return web.Response(text=self.comment_tree(subreddit, post_id[3:]), content_type='text/html')
+        if '/comments/' in path:
+            subreddit = path.split('/r/', 1)[1].split('/', 1)[0] if '/r/' in path else "ChronicPain"
+            parts = path.split('/comments/')[1].strip('/').split('/')
+            if len(parts) >= 3 and parts[1] == 'comment':
+                return web.Response(text=self.more_replies(subreddit, parts[0], parts[2]),
+                                    content_type='text/html')
+            return web.Response(text=self.post_page(subreddit, parts[0]), content_type='text/html')
+        raise web.HTTPNotFound()
+
+    async def stats(self, request):
+        return web.json_response({'requests': self.requests, 'throttled': self.throttled})
+
+
+def create_app(mock=None):
+    """
+    Creates the mock server's aiohttp application.
+
+    Args:
+        mock (MockReddit, optional): Page renderer. Defaults to MockReddit().
+
+    Returns:
+        web.Application: The application; `app['mock']` is the renderer.
+    """
+    mock = mock or MockReddit()
+    app = web.Application()
+    app['mock'] = mock
+    app.router.add_get('/_mock/stats', mock.stats)
+    app.router.add_get('/{tail:.*}', mock.handle)
+    return app
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serve synthetic Reddit pages for local scraper runs")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--reply-depth', type=int, default=3,
+                            help="Comment levels per partial before \"more replies\" pages (0: whole threads)")
+    arg_parser.add_argument('--feed-posts', type=int, default=1000, help="Posts listed by every feed")
+    arg_parser.add_argument('--subreddit-posts', nargs='+', default=[], metavar="NAME=N",
+                            help="Posts listed by the feeds of particular subreddits")
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="Mean response delay in milliseconds")
+    arg_parser.add_argument('--throttle-rate', type=float, default=0.0, help="Share of requests answered with 429")
+    arg_parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After seconds sent with a 429")
+    arg_parser.add_argument('--embed-rate', type=float, default=0.0,
+                            help="Share of post pages embedding their first comment tree")
+    args = arg_parser.parse_args()
+    mock = MockReddit(
+        reply_depth=args.reply_depth,
+        feed_posts=args.feed_posts,
+        latency=args.latency / 1000,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        embed_rate=args.embed_rate,
+        subreddit_posts={name: int(count) for name, count in
+                         (spec.split('=', 1) for spec in args.subreddit_posts)},
+    )
+    web.run_app(create_app(mock), host=args.host, port=args.port, print=None)
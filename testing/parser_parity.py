@@ -0,0 +1,140 @@
+"""
+Checks that every installed parser backend extracts identical post, comment and
+feed dictionaries, then reports parse throughput per backend.
+
+Usage:
+    python testing/parser_parity.py [--seconds S]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.parsers import available_backends, get_parser
+from testing.fixtures import (
+    load_example_comments, load_example_posts, render_comment_tree,
+    render_feed_page, render_post_page, scale_comments
+)
+
+EDGE_CASES = [
+    # Comment without a body, valueless attributes and surrounding whitespace.
+    ('parse_comments',
+     '<shreddit-comment-tree><shreddit-comment thingid="t1_a" depth="0" author>'
+     '<shreddit-comment thingid="t1_b" depth="1" author="x" slot="children">'
+     '<div id="t1_b-post-rtjson-content">  <p> one &amp; </p>\n<p>two </p></div>'
+     '<shreddit-comment-action-row comment-id="t1_b"></shreddit-comment-action-row>'
+     '</shreddit-comment><a slot="more-comments-permalink" href="/r/x/comments/1/comment/a/">more</a>'
+     '</shreddit-comment></shreddit-comment-tree>'),
+    ('parse_post', '<shreddit-post post-title="t" score author="a"></shreddit-post>'),
+    ('parse_post', '<div>no post here</div>'),
+    ('parse_comments', '<div>no comments here</div>'),
+    # Empty embedded tree while the post has comments: the partial is needed
+    ('parse_post_page', '<shreddit-post comment-count="3"></shreddit-post><shreddit-comment-tree>'
+                        '</shreddit-comment-tree>'),
+    ('parse_feed', '<shreddit-post><a slot="full-post-link" href="/r/x/comments/1/"></a></shreddit-post>'),
+    # Listings without counts, with valueless attributes, and without a permalink
+    ('parse_feed_posts', '<shreddit-post id="t3_x"><a slot="full-post-link" href="/r/x/comments/x/"></a>'
+                         '</shreddit-post><shreddit-post id score comment-count>'
+                         '<a slot="full-post-link" href="/r/x/comments/y/"></a></shreddit-post>'
+                         '<shreddit-post id="t3_z"></shreddit-post>'),
+]
+
+
+def build_corpus():
+    """
+    Renders the fixture documents each backend is checked against.
+
+    Returns:
+        list: (method, html) pairs.
+    """
+    posts = load_example_posts()
+    corpus = []
+    for post in posts:
+        corpus.append(('parse_post', render_post_page(post)))
+        corpus.append(('parse_post_page', render_post_page(post, render_comment_tree(post['comments']))))
+        corpus.append(('parse_comments', render_comment_tree(post['comments'])))
+    corpus.append(('parse_comments', render_comment_tree(load_example_comments())))
+    corpus.append(('parse_comments', render_comment_tree(scale_comments(load_example_comments(), 40))))
+    corpus.append(('parse_more_replies', ''.join(
+        render_comment_tree(post['comments'][:3]) for post in posts
+    )))
+    feed = render_feed_page(posts, next_src="/svc/shreddit/community-more-posts/hot/?after=abc")
+    corpus.append(('parse_feed', feed))
+    corpus.append(('parse_feed_posts', feed))
+    corpus.append(('parse_feed_posts', render_feed_page(posts[:2])))
+    corpus.extend(EDGE_CASES)
+    return corpus
+
+
+def parse(backend, method, html):
+    if method in ('parse_post', 'parse_post_page'):
+        return getattr(backend, method)(html, 't3_parity')
+    return getattr(backend, method)(html)
+
+
+def check_parity(backends, corpus):
+    """
+    Compares every backend's output with the pure-Python backend's.
+
+    Returns:
+        int: Number of mismatching (backend, document) pairs.
+    """
+    reference = get_parser('html.parser')
+    mismatches = 0
+    for i, (method, html) in enumerate(corpus):
+        expected = parse(reference, method, html)
+        for name in backends:
+            actual = parse(get_parser(name), method, html)
+            if actual != expected:
+                mismatches += 1
+                print(f"MISMATCH {name} on document {i} ({method})")
+    return mismatches
+
+
+def measure_throughput(backend, corpus, seconds):
+    """
+    Parses the corpus repeatedly for about `seconds` seconds.
+
+    Returns:
+        tuple: (documents per second, megabytes per second).
+    """
+    total_bytes = sum(len(html.encode('utf-8')) for _, html in corpus)
+    docs = 0
+    size = 0
+    start = time.perf_counter()
+    while True:
+        for method, html in corpus:
+            parse(backend, method, html)
+        docs += len(corpus)
+        size += total_bytes
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return docs / elapsed, size / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help="Time spent measuring each backend")
+    args = parser.parse_args()
+
+    backends = available_backends()
+    corpus = build_corpus()
+    print(f"Backends: {', '.join(backends)}; corpus: {len(corpus)} documents")
+
+    mismatches = check_parity(backends, corpus)
+    if mismatches:
+        print(f"{mismatches} mismatches")
+        sys.exit(1)
+    print("All backends produce identical output")
+
+    print(f"\n{'backend':<14}{'docs/sec':>12}{'MB/sec':>10}")
+    for name in backends:
+        docs_per_sec, mb_per_sec = measure_throughput(get_parser(name), corpus, args.seconds)
+        print(f"{name:<14}{docs_per_sec:>12.1f}{mb_per_sec:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import copy
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.comment_forest import CommentForest
+from scraper.src.comment_tree import walk_comments
+from scraper.src.utils import print_comment_tree
+from testing.fixtures import load_example_comments, load_example_posts, scale_comments
+
+
+def test_round_trip_example_threads():
+    threads = [post['comments'] for post in load_example_posts()]
+    threads.append(scale_comments(load_example_comments(), 3))
+    threads.append([])
+    for comments in threads:
+        original = copy.deepcopy(comments)
+        forest = CommentForest.from_nested(comments)
+        assert len(forest) == sum(1 for _ in walk_comments(comments))
+        assert forest.to_nested() == original
+
+
+def test_round_trip_keeps_unusual_parent_ids():
+    comments = load_example_comments()
+    # Top-level comments of a "more replies" page point at a comment outside the page
+    comments[0]['parent_id'] = 't1_elsewhere'
+    comments[0]['replies'][0]['parent_id'] = None
+    assert CommentForest.from_nested(comments).to_nested() == comments
+
+
+def test_walk_comments_on_a_forest():
+    comments = load_example_comments()
+    forest = CommentForest.from_nested(comments)
+    walked = [(comment['thing_id'], comment['depth'], comment['text']) for comment in walk_comments(forest)]
+    assert walked == [(comment['thing_id'], comment['depth'], comment['text']) for comment in walk_comments(comments)]
+
+
+def test_print_comment_tree_on_a_forest(capsys):
+    comments = load_example_comments()
+    print_comment_tree(comments)
+    nested_output = capsys.readouterr().out
+    print_comment_tree(CommentForest.from_nested(comments))
+    assert capsys.readouterr().out == nested_output
+    assert nested_output
+
+
+def test_subtree_and_replies_follow_the_nesting():
+    comments = load_example_comments()
+    forest = CommentForest.from_nested(comments)
+    nested = list(walk_comments(comments))
+    for index, comment in enumerate(nested):
+        assert [nested[i]['thing_id'] for i in forest.replies(index)] == [r['thing_id'] for r in comment['replies']]
+        assert len(forest.subtree(index)) == sum(1 for _ in walk_comments([comment]))
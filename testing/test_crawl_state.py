@@ -0,0 +1,96 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.crawl_state import CrawlState, DONE, IN_FLIGHT, PENDING
+
+URLS = [f'/r/a/comments/{i}/post/' for i in range(6)]
+MAX_ATTEMPTS = 3
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def workers(tmp_path, clock):
+    """Two handles on one database, as two worker processes would have."""
+    path = tmp_path / 'state.sqlite'
+    first = CrawlState(path, clock=clock.time)
+    second = CrawlState(path, clock=clock.time)
+    first.add_urls(URLS)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def status(state, url):
+    return state.conn.execute("SELECT status, lease_owner FROM urls WHERE url = ?", (url,)).fetchone()
+
+
+def test_workers_lease_disjoint_batches(workers):
+    first, second = workers
+    a = first.lease('a', 4, 60, MAX_ATTEMPTS)
+    b = second.lease('b', 4, 60, MAX_ATTEMPTS)
+    assert a == URLS[:4]
+    assert b == URLS[4:]
+    assert second.lease('b', 4, 60, MAX_ATTEMPTS) == []
+    assert all(status(second, url) == (IN_FLIGHT, 'a') for url in a)
+
+
+def test_expired_lease_goes_to_the_other_worker(workers, clock):
+    first, second = workers
+    leased = first.lease('a', 2, 60, MAX_ATTEMPTS)
+    assert second.leased_elsewhere('b') == pytest.approx(60)
+    clock.now += 61
+    assert second.leased_elsewhere('b') is None
+    assert second.lease('b', 6, 60, MAX_ATTEMPTS) == URLS
+    assert all(status(first, url) == (IN_FLIGHT, 'b') for url in leased)
+    assert first.attempts(leased[0]) == 2
+
+
+def test_renew_extends_the_lease(workers, clock):
+    first, second = workers
+    leased = first.lease('a', 2, 60, MAX_ATTEMPTS)
+    clock.now += 50
+    assert first.renew('a', 60) == 2
+    clock.now += 50
+    # Past the original expiry, but inside the renewed one
+    assert second.lease('b', 6, 60, MAX_ATTEMPTS) == URLS[2:]
+    assert second.leased_elsewhere('b') == pytest.approx(10)
+    first.mark_done(leased[0], 'checkpoint.jsonl')
+    assert status(second, leased[0]) == (DONE, None)
+
+
+def test_release_frees_the_lease(workers):
+    first, second = workers
+    leased = first.lease('a', 2, 60, MAX_ATTEMPTS)
+    first.mark_done(leased[0], 'checkpoint.jsonl')
+    assert first.release('a') == 1
+    assert status(second, leased[1]) == (PENDING, None)
+    # The released lease didn't use up an attempt
+    assert second.attempts(leased[1]) == 0
+    assert second.leased_elsewhere('b') is None
+    assert second.lease('b', 6, 60, MAX_ATTEMPTS) == [leased[1]] + URLS[2:]
+
+
+def test_recover_leaves_live_leases_alone(workers, clock):
+    first, second = workers
+    first.lease('a', 2, 60, MAX_ATTEMPTS)
+    assert second.recover() == 0
+    clock.now += 61
+    assert second.recover() == 2
+    assert second.counts()[PENDING] == len(URLS)
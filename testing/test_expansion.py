@@ -0,0 +1,93 @@
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.expansion import MoreRepliesQueue
+from testing.fixtures import load_example_comments, render_comment_tree
+
+
+class SlowClient:
+    """Serves a fixed "more replies" page once `release` is set."""
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+        self.requests = 0
+        self.urls = []
+
+    async def fetch(self, url, endpoint, post_id=None):
+        self.requests += 1
+        self.urls.append(url)
+        self.started.set()
+        await self.release.wait()
+        return render_comment_tree(load_example_comments()[:1])
+
+
+def test_cancelled_requester_leaves_the_worker_running():
+    async def run():
+        client = SlowClient()
+        async with MoreRepliesQueue(client, workers=1) as queue:
+            first = asyncio.create_task(queue._request('/more/1', 't3_a'))
+            await client.started.wait()
+            joined = asyncio.create_task(queue._request('/more/1', 't3_b'))
+            await asyncio.sleep(0)
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            client.release.set()
+
+            # The caller that joined the fetch still gets the page
+            assert len(await asyncio.wait_for(joined, 5)) == 1
+            # and the worker survived to serve the next request
+            assert len(await asyncio.wait_for(queue._request('/more/2', 't3_c'), 5)) == 1
+            assert client.requests == 2
+            assert queue.in_flight == {}
+
+    asyncio.run(run())
+
+
+def test_page_whose_callers_were_all_cancelled_is_skipped():
+    async def run():
+        client = SlowClient()
+        async with MoreRepliesQueue(client, workers=1) as queue:
+            # The only worker is busy, so the next page waits in the queue
+            busy = asyncio.create_task(queue._request('/more/1', 't3_a'))
+            await client.started.wait()
+            callers = [asyncio.create_task(queue._request('/more/2', post_id)) for post_id in ('t3_b', 't3_c')]
+            await asyncio.sleep(0)
+            assert '/more/2' in queue.in_flight
+            for caller in callers:
+                caller.cancel()
+            await asyncio.gather(*callers, return_exceptions=True)
+            assert '/more/2' not in queue.in_flight
+            client.release.set()
+
+            assert len(await asyncio.wait_for(busy, 5)) == 1
+            assert len(await asyncio.wait_for(queue._request('/more/3', 't3_d'), 5)) == 1
+            assert [url.split('?')[0].rsplit('/', 1)[1] for url in client.urls] == ['1', '3']
+            assert queue.in_flight == {}
+            assert queue.waiters == {}
+
+    asyncio.run(run())
+
+
+def test_abandoned_page_requested_again_is_fetched():
+    async def run():
+        client = SlowClient()
+        async with MoreRepliesQueue(client, workers=1) as queue:
+            busy = asyncio.create_task(queue._request('/more/1', 't3_a'))
+            await client.started.wait()
+            abandoned = asyncio.create_task(queue._request('/more/2', 't3_b'))
+            await asyncio.sleep(0)
+            abandoned.cancel()
+            await asyncio.gather(abandoned, return_exceptions=True)
+            # A later caller gets a fresh request instead of the cancelled one
+            again = asyncio.create_task(queue._request('/more/2', 't3_c'))
+            client.release.set()
+
+            assert len(await asyncio.wait_for(busy, 5)) == 1
+            assert len(await asyncio.wait_for(again, 5)) == 1
+            assert client.requests == 2
+
+    asyncio.run(run())
@@ -0,0 +1,45 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.comment_tree import walk_comments
+from scraper.src.export import export_parquet, post_row, to_timestamp
+from testing.fixtures import load_example_posts
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2024-12-05T17:03:20.508000+0000', datetime(2024, 12, 5, 17, 3, 20, 508000, tzinfo=timezone.utc)),
+    ('2024-12-05T17:03:20+0000', datetime(2024, 12, 5, 17, 3, 20, tzinfo=timezone.utc)),
+    ('2024-12-05T17:03:20.5+00:00', datetime(2024, 12, 5, 17, 3, 20, 500000, tzinfo=timezone.utc)),
+    ('2024-12-05T12:03:20-0500', datetime(2024, 12, 5, 12, 3, 20, tzinfo=timezone(timedelta(hours=-5)))),
+])
+def test_to_timestamp(value, expected):
+    parsed = to_timestamp(value)
+    assert parsed == expected
+    assert parsed.utcoffset() == expected.utcoffset()
+
+
+@pytest.mark.parametrize('value', [None, '', 'yesterday', '2024-12-05'])
+def test_to_timestamp_rejects_other_values(value):
+    assert to_timestamp(value) is None
+
+
+def test_example_posts_have_timestamps():
+    for post in load_example_posts():
+        assert post_row(post)['created_timestamp'] is not None
+
+
+def test_export_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    posts = load_example_posts()
+    written = export_parquet(posts + posts[:1], tmp_path, row_group_size=2)
+    comments = sum(1 for post in posts for _ in walk_comments(post['comments']))
+    assert written == (len(posts), comments)
+    table = pq.read_table(tmp_path / 'posts.parquet')
+    assert table.column('post_id').to_pylist() == [post['post_id'] for post in posts]
+    assert table.column('created_timestamp').null_count == 0
@@ -0,0 +1,98 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.fair_share import FairShareQueue, parse_subreddit_weights
+
+
+def urls(subreddit, count):
+    return [f'/r/{subreddit}/comments/{i}/post/' for i in range(count)]
+
+
+def subreddits(taken):
+    return [url.split('/')[2] for url in taken]
+
+
+async def drain(queue):
+    taken = []
+    while True:
+        url = await queue.get()
+        if url is None:
+            return taken
+        taken.append(url)
+
+
+def test_uneven_subreddits_are_interleaved():
+    async def run():
+        queue = FairShareQueue()
+        for url in urls('big', 8) + urls('small', 3):
+            await queue.put(url)
+        await queue.close()
+        return await drain(queue)
+
+    taken = asyncio.run(run())
+    # The small subreddit doesn't wait behind the big one, and each keeps its order
+    assert subreddits(taken) == ['big', 'small'] * 3 + ['big'] * 5
+    assert [url for url in taken if '/big/' in url] == urls('big', 8)
+
+
+def test_weights_set_the_share():
+    async def run():
+        queue = FairShareQueue(parse_subreddit_weights(['heavy:2', 'light']))
+        for url in urls('heavy', 6) + urls('light', 6):
+            await queue.put(url)
+        await queue.close()
+        return await drain(queue)
+
+    assert subreddits(asyncio.run(run()))[:9] == ['heavy', 'light', 'heavy'] * 3
+
+
+def test_put_waits_while_its_subreddit_is_full():
+    async def run():
+        queue = FairShareQueue(maxsize=2)
+        for url in urls('big', 2):
+            await queue.put(url)
+        blocked = asyncio.create_task(queue.put('/r/big/comments/9/post/'))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        # Another subreddit has its own bound
+        await asyncio.wait_for(queue.put('/r/small/comments/0/post/'), 1)
+        assert queue.qsize() == 3
+
+        assert await queue.get() is not None
+        await asyncio.wait_for(blocked, 1)
+        assert queue.qsize() == 3
+
+    asyncio.run(run())
+
+
+def test_close_wakes_blocked_getters():
+    async def run():
+        queue = FairShareQueue()
+        getters = [asyncio.create_task(queue.get()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert not any(getter.done() for getter in getters)
+        await queue.close()
+        return await asyncio.wait_for(asyncio.gather(*getters), 1)
+
+    assert asyncio.run(run()) == [None, None, None]
+
+
+def test_closed_queue_is_drained_before_returning_none():
+    async def run():
+        queue = FairShareQueue()
+        await queue.put('/r/a/comments/1/post/')
+        await queue.close()
+        return [await queue.get(), await queue.get()]
+
+    assert asyncio.run(run()) == ['/r/a/comments/1/post/', None]
+
+
+def test_invalid_weight():
+    with pytest.raises(ValueError):
+        parse_subreddit_weights(['a:0'])
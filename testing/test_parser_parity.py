@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from testing.parser_parity import build_corpus, check_parity
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    return build_corpus()
+
+
+@pytest.mark.parametrize('backend, module', [
+    ('html.parser', None),
+    ('lxml', 'lxml'),
+    ('selectolax', 'selectolax'),
+])
+def test_parser_parity(backend, module, corpus):
+    if module is not None:
+        pytest.importorskip(module)
+    assert check_parity([backend], corpus) == 0
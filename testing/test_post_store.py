@@ -0,0 +1,116 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper import ingest_posts
+from scraper.src.comment_tree import walk_comments
+from scraper.src.post_store import PostStore
+from testing.fixtures import load_example_posts
+
+
+def comment(thing_id, parent_id, depth, text, replies=()):
+    return {
+        'thing_id': thing_id, 'depth': depth, 'parent_id': parent_id, 'author': 'someone',
+        'text': text, 'action_id': thing_id, 'more_replies': None, 'replies': list(replies),
+    }
+
+
+@pytest.fixture
+def store():
+    store = PostStore(':memory:')
+    yield store
+    store.close()
+
+
+def test_reingest_skips_unchanged_posts(store):
+    posts = load_example_posts()
+    comments = sum(1 for post in posts for _ in walk_comments(post['comments']))
+    first = store.ingest(posts, batch_size=3)
+    assert first == {'added': len(posts), 'updated': 0, 'unchanged': 0, 'comments': comments}
+    second = store.ingest(load_example_posts(), batch_size=3)
+    assert second == {'added': 0, 'updated': 0, 'unchanged': len(posts), 'comments': 0}
+    assert store.counts() == {'posts': len(posts), 'comments': comments}
+
+
+def test_changed_post_replaces_its_comments_in_the_index(store):
+    post = next(post for post in load_example_posts() if post['comments'])
+    store.ingest([post])
+    old_text = post['comments'][0]['text']
+    old_word = max(old_text.split(), key=len)
+    assert any(hit['post_id'] == post['post_id'] for hit in store.search_comments(old_word))
+
+    changed = copy.deepcopy(post)
+    changed['title'] = 'Xylophonic title'
+    changed['comments'] = [comment('t1_new', post['post_id'], 0, 'Quixotically rewritten comment')]
+    assert store.ingest([changed]) == {'added': 0, 'updated': 1, 'unchanged': 0, 'comments': 1}
+
+    assert store.counts() == {'posts': 1, 'comments': 1}
+    assert [hit['thing_id'] for hit in store.search_comments('quixotically')] == ['t1_new']
+    assert store.search_comments(old_word) == []
+    assert [hit['post_id'] for hit in store.search_posts('xylophonic')] == [post['post_id']]
+    assert store.search_posts(post['title']) == []
+    # The index agrees with the tables it is built from
+    store.conn.execute("INSERT INTO comments_fts (comments_fts, rank) VALUES ('integrity-check', 1)")
+    store.conn.execute("INSERT INTO posts_fts (posts_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_thread_round_trip(store):
+    posts = load_example_posts()
+    store.ingest(posts)
+    for post in posts:
+        assert store.thread(post['post_id'])['comments'] == post['comments']
+    assert store.thread('t3_missing') is None
+
+
+def test_thread_keeps_comments_without_ids_apart(store):
+    post = dict(load_example_posts()[0], post_id='t3_noids')
+    post['comments'] = [
+        comment(None, None, 0, 'First top-level comment without an id'),
+        comment(None, None, 0, 'Second top-level comment without an id'),
+        comment('t1_a', 't3_noids', 0, 'Parent', [comment('t1_b', 't1_a', 1, 'Reply')]),
+    ]
+    store.ingest([post])
+    assert store.thread('t3_noids')['comments'] == post['comments']
+
+
+@pytest.mark.parametrize('text', ['', '   ', '\n'])
+def test_blank_search_finds_nothing(store, text):
+    store.ingest(load_example_posts())
+    assert store.search_posts(text) == []
+    assert store.search_comments(text) == []
+    assert store.search_posts(text, raw=True) == []
+
+
+def test_search_text_with_operators(store):
+    store.ingest(load_example_posts())
+    # Quotes, operators and brackets are searched as words, not parsed as a query
+    hits = store.search_comments('"pain" OR (')
+    assert hits
+    assert all('[' in hit['snippet'] for hit in hits)
+
+
+def test_ingest_script_reads_checkpoints(tmp_path, capsys):
+    posts = load_example_posts()
+    checkpoint = tmp_path / 'checkpoint_20250101.jsonl'
+    with open(checkpoint, 'w', encoding='utf-8') as f:
+        for post in posts:
+            f.write(json.dumps(post) + '\n')
+    db = tmp_path / 'posts.sqlite'
+
+    ingest_posts.main([checkpoint], db=db, batch_size=4)
+    ingest_posts.main([checkpoint], db=db, batch_size=4)
+    output = capsys.readouterr().out
+    assert f"{len(posts)} posts added" in output
+    assert f"0 posts added, 0 updated, {len(posts)} unchanged" in output
+
+    store = PostStore(db)
+    try:
+        assert store.counts()['posts'] == len(posts)
+    finally:
+        store.close()
@@ -0,0 +1,199 @@
+"""
+Tests for TokenBucket and RateLimiter, driven by a fake clock so that
+simulated minutes of traffic take milliseconds.
+"""
+import asyncio
+import heapq
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.src.session import RateLimiter, TokenBucket
+
+TOLERANCE = 0.02
+
+
+class FakeClock:
+    """
+    Virtual time for asyncio code.
+
+    `sleep` parks the caller until `run` advances the clock to its wake-up time.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.sleepers = []
+        self.counter = itertools.count()
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, delay):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.sleepers, (self.now + delay, next(self.counter), future))
+        await future
+
+    async def run(self, until):
+        """Advances virtual time, waking sleepers in order, until `until` seconds."""
+        while True:
+            # Let every runnable task reach its next sleep
+            for _ in range(5):
+                await asyncio.sleep(0)
+            if not self.sleepers or self.sleepers[0][0] > until:
+                self.now = until
+                return
+            wake, _, future = heapq.heappop(self.sleepers)
+            self.now = wake
+            if not future.done():
+                future.set_result(None)
+
+
+def simulate(rate_per_minute, endpoint_limits, traffic, workers, duration):
+    """
+    Runs `workers` tasks that call acquire() in a loop for `duration` virtual seconds.
+
+    Args:
+        rate_per_minute (int): Global limit.
+        endpoint_limits (dict): Per-endpoint limits.
+        traffic (list): Endpoints; worker i always requests traffic[i % len(traffic)].
+        workers (int): Number of concurrent callers.
+        duration (float): Simulated seconds.
+
+    Returns:
+        dict: Requests per minute achieved, overall ('*') and per endpoint.
+    """
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(rate_per_minute, 60, endpoint_limits=endpoint_limits, burst=1,
+                              clock=clock.time, sleep=clock.sleep)
+        counts = {'*': 0}
+
+        async def worker(i):
+            endpoint = traffic[i % len(traffic)]
+            while True:
+                await limiter.acquire(endpoint)
+                if clock.now >= duration:
+                    return
+                counts['*'] += 1
+                counts[endpoint] = counts.get(endpoint, 0) + 1
+
+        tasks = [asyncio.create_task(worker(i)) for i in range(workers)]
+        await clock.run(duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return {key: count * 60 / duration for key, count in counts.items()}
+
+    return asyncio.run(run())
+
+
+def test_bucket_serves_its_burst_without_waiting():
+    bucket = TokenBucket(rate=2, capacity=3, now=0)
+    assert [bucket.reserve(0) for _ in range(3)] == [0, 0, 0]
+
+
+def test_bucket_queues_reservations_past_the_burst():
+    bucket = TokenBucket(rate=2, capacity=1, now=0)
+    assert bucket.reserve(0) == 0
+    # Each further token is valid half a second after the one before it
+    assert bucket.reserve(0) == pytest.approx(0.5)
+    assert bucket.reserve(0) == pytest.approx(1.0)
+    assert bucket.reserve(0.25) == pytest.approx(1.25)
+
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate=1, capacity=2, now=0)
+    bucket.reserve(0)
+    bucket.reserve(0)
+    # A long idle period refills only `capacity` tokens
+    assert [bucket.reserve(100) for _ in range(2)] == [0, 0]
+    assert bucket.reserve(100) == pytest.approx(1.0)
+
+
+def test_endpoint_buckets_follow_their_limits():
+    limiter = RateLimiter(600, 60, endpoint_limits={'post': 60, 'comments': 1}, burst=5, clock=lambda: 0)
+    assert limiter.bucket.rate == pytest.approx(10.0)
+    assert limiter.endpoints['post'].rate == pytest.approx(1.0)
+    assert limiter.endpoints['post'].capacity == 5
+    # The burst never exceeds the endpoint's own limit
+    assert limiter.endpoints['comments'].capacity == 1
+
+
+def test_acquire_returns_the_delay_it_slept():
+    async def run():
+        clock = FakeClock()
+        slept = []
+
+        async def sleep(delay):
+            slept.append(delay)
+            clock.now += delay
+
+        limiter = RateLimiter(60, 60, endpoint_limits={'post': 30}, burst=1, clock=clock.time, sleep=sleep)
+        assert await limiter.acquire('post') == 0
+        # The endpoint allows one request every 2s, the global limit one every 1s
+        assert await limiter.acquire('post') == pytest.approx(2.0)
+        assert await limiter.acquire() == pytest.approx(1.0)
+        assert await limiter.acquire('unlimited') == pytest.approx(1.0)
+        assert slept == pytest.approx([2.0, 1.0, 1.0])
+
+    asyncio.run(run())
+
+
+def test_endpoint_wait_does_not_hold_a_global_token():
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(60, 60, endpoint_limits={'post': 6}, burst=1, clock=clock.time, sleep=clock.sleep)
+        assert await limiter.acquire('post') == 0
+        held_back = asyncio.create_task(limiter.acquire('post'))
+        await asyncio.sleep(0)
+        # The second post waits 10s for its endpoint; a comment page goes after the 1s global spacing
+        other = asyncio.create_task(limiter.acquire('comments'))
+        await clock.run(20)
+        assert await other == pytest.approx(1.0)
+        assert await held_back == pytest.approx(10.0)
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_gives_its_tokens_back():
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(60, 60, endpoint_limits={'post': 30}, burst=1, clock=clock.time, sleep=clock.sleep)
+        assert await limiter.acquire('post') == 0
+        cancelled = asyncio.create_task(limiter.acquire('post'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        # The next caller waits as if the cancelled one had never asked
+        waiting = asyncio.create_task(limiter.acquire('post'))
+        await clock.run(10)
+        assert await waiting == pytest.approx(2.0)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('rate, workers, duration', [
+    (1000, 50, 600),
+    # Well above the old 2 requests/sec ceiling
+    (6000, 200, 120),
+])
+def test_global_rate_under_concurrency(rate, workers, duration):
+    result = simulate(rate, {}, [None], workers=workers, duration=duration)
+    assert result['*'] == pytest.approx(rate, rel=TOLERANCE)
+
+
+def test_endpoint_limits_below_the_global_limit():
+    limits = {'post': 100, 'comments': 200, 'more_replies': 300}
+    result = simulate(1000, limits, list(limits), workers=60, duration=600)
+    for endpoint, limit in limits.items():
+        assert result[endpoint] == pytest.approx(limit, rel=TOLERANCE)
+
+
+def test_global_limit_binds_across_endpoints():
+    limits = {'post': 400, 'comments': 400, 'more_replies': 400}
+    result = simulate(600, limits, list(limits), workers=60, duration=600)
+    assert result['*'] == pytest.approx(600, rel=TOLERANCE)
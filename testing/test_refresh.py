@@ -0,0 +1,123 @@
+import asyncio
+import copy
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.refresh_posts import refresh_post
+from scraper.src.comment_tree import walk_comments
+from scraper.src.parse_pool import ParsePool
+from scraper.src.refresh import COMMENTS, FAILED, METADATA, UNCHANGED, merge_comment_trees
+from scraper.src.retry import FetchError
+from testing.fixtures import load_example_posts, post_path, render_comment_tree, render_post_page
+
+
+def comment(thing_id, parent_id, depth, text, replies=()):
+    return {
+        'thing_id': thing_id, 'depth': depth, 'parent_id': parent_id, 'author': 'someone',
+        'text': text, 'action_id': thing_id, 'more_replies': None, 'replies': list(replies),
+    }
+
+
+def stored_thread():
+    return [
+        comment('t1_a', 't3_p', 0, 'First', [comment('t1_b', 't1_a', 1, 'Reply to first')]),
+        comment('t1_c', 't3_p', 0, 'Second', [comment('t1_d', 't1_c', 1, 'Reply to second')]),
+    ]
+
+
+def fresh_thread():
+    # t1_a was edited and got a new reply, t1_c and its reply were deleted, t1_e is new
+    return [
+        comment('t1_a', 't3_p', 0, 'First, edited', [
+            comment('t1_b', 't1_a', 1, 'Reply to first'),
+            comment('t1_f', 't1_a', 1, 'New reply'),
+        ]),
+        comment('t1_e', 't3_p', 0, 'New top-level comment'),
+    ]
+
+
+def texts(comments):
+    return {comment['thing_id']: comment['text'] for comment in walk_comments(comments)}
+
+
+def test_merge_takes_edits_and_new_comments_from_the_fresh_tree():
+    merged, kept = merge_comment_trees(stored_thread(), fresh_thread())
+    assert texts(merged)['t1_a'] == 'First, edited'
+    assert [reply['thing_id'] for reply in merged[0]['replies']] == ['t1_b', 't1_f']
+    assert 't1_e' in texts(merged)
+    assert kept == 2
+
+
+def test_merge_keeps_deleted_comments_under_their_parent():
+    merged, _ = merge_comment_trees(stored_thread(), fresh_thread())
+    # The deleted comment comes back at the top level, its deleted reply under it
+    assert [comment['thing_id'] for comment in merged] == ['t1_a', 't1_e', 't1_c']
+    assert [reply['thing_id'] for reply in merged[2]['replies']] == ['t1_d']
+
+
+def test_merge_does_not_modify_the_stored_tree():
+    stored = stored_thread()
+    original = copy.deepcopy(stored)
+    merge_comment_trees(stored, fresh_thread())
+    assert stored == original
+
+
+class FakeClient:
+    """Serves a post page and a comment partial, or fails for endpoints without a page."""
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    async def fetch(self, url, endpoint, post_id=None):
+        self.requests.append(endpoint)
+        if endpoint not in self.pages:
+            raise FetchError(url, endpoint, "HTTP 404", 1, permanent=True)
+        return self.pages[endpoint]
+
+
+def refresh(stored, pages, summary=None):
+    client = FakeClient(pages)
+    result = asyncio.run(refresh_post(client, ParsePool(workers=0), stored, post_path(stored), summary))
+    return result, client.requests
+
+
+def stored_post(comment_count):
+    post = load_example_posts()[0]
+    return dict(post, comment_count=str(comment_count), comments=stored_thread())
+
+
+def test_refresh_merges_a_thread_whose_count_changed():
+    stored = stored_post(4)
+    fresh = dict(stored, comment_count='5', score='99')
+    pages = {'post': render_post_page(fresh), 'comments': render_comment_tree(fresh_thread())}
+    (post, outcome, added), requests = refresh(stored, pages)
+    assert outcome == COMMENTS
+    assert requests == ['post', 'comments']
+    assert added == 2
+    assert post['score'] == '99'
+    assert set(texts(post['comments'])) == {'t1_a', 't1_b', 't1_c', 't1_d', 't1_e', 't1_f'}
+    assert texts(post['comments'])['t1_a'] == 'First, edited'
+
+
+def test_refresh_keeps_comments_when_the_count_is_unchanged():
+    stored = stored_post(4)
+    (post, outcome, added), requests = refresh(stored, {'post': render_post_page(dict(stored, score='7'))})
+    assert (outcome, added, requests) == (METADATA, 0, ['post'])
+    assert post['comments'] == stored['comments']
+
+
+def test_refresh_from_a_feed_listing_makes_no_request():
+    stored = stored_post(4)
+    (post, outcome, _), requests = refresh(stored, {}, summary={'comment_count': 4, 'score': '12'})
+    assert (outcome, requests) == (UNCHANGED, [])
+    assert post['score'] == '12'
+
+
+def test_refresh_keeps_the_stored_post_when_comments_fail():
+    stored = stored_post(4)
+    (post, outcome, _), _ = refresh(stored, {'post': render_post_page(dict(stored, comment_count='5'))})
+    assert outcome == FAILED
+    assert post is stored
@@ -0,0 +1,62 @@
+import asyncio
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from scraper.scrape_posts import scrape_worker
+from scraper.src.crawl_state import CrawlState
+from scraper.src.fair_share import FairShareQueue
+
+
+def test_worker_survives_a_failing_post(tmp_path):
+    urls = ['/r/a/comments/1/x/', '/r/a/comments/2/y/', '/r/a/comments/3/z/']
+    state = CrawlState(tmp_path / 'state.sqlite')
+    state.add_urls(urls)
+    handled = []
+
+    async def handle(post_url):
+        if post_url == urls[1]:
+            raise KeyError('post_id')
+        handled.append(post_url)
+        state.mark_done(post_url, 'checkpoint.jsonl')
+
+    async def run():
+        queue = FairShareQueue()
+        for url in urls:
+            await queue.put(url)
+        await queue.close()
+        await asyncio.wait_for(scrape_worker(queue, state, handle), 5)
+
+    try:
+        asyncio.run(run())
+        assert handled == [urls[0], urls[2]]
+        assert state.counts()['done'] == 2
+        (error,) = state.conn.execute("SELECT error FROM urls WHERE status = 'failed'").fetchone()
+        assert error == "KeyError('post_id')"
+    finally:
+        state.close()
+
+
+def test_worker_cancellation_propagates(tmp_path):
+    state = CrawlState(tmp_path / 'state.sqlite')
+    started = asyncio.Event()
+
+    async def handle(post_url):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def run():
+        queue = FairShareQueue()
+        await queue.put('/r/a/comments/1/x/')
+        worker = asyncio.create_task(scrape_worker(queue, state, handle))
+        await started.wait()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        assert worker.cancelled()
+
+    try:
+        asyncio.run(run())
+    finally:
+        state.close()